@@ -136,14 +136,16 @@ task_dbt_test = BashOperator(
 task_features = PythonOperator(
     task_id='create_ml_features',
     python_callable=create_features,
+    op_kwargs={'mode': 'dbt'},
     on_failure_callback=notify_failure,
     sla=timedelta(minutes=20),
     dag=dag,
     doc_md="""
     ### Feature Engineering
-    - Crée des features pour le Machine Learning
-    - Calcule des métriques dérivées
-    - Sauvegarde dans la table features_ml
+    - Les features sont calculées dans PostgreSQL par le modèle dbt features_ml
+      (construit par dbt_run_models dans staging.features_ml)
+    - Valide les features requises en base, sans transfert des données
+    - Mode 'pandas' disponible en standalone (feature_engineering.py --mode pandas)
     """
 )
 
@@ -0,0 +1,137 @@
+"""
+Benchmark des noyaux de features vectorisés (feature_kernels.compute_features)
+face à l'ancienne implémentation ligne à ligne de create_features
+
+Les données sont synthétiques (mêmes colonnes et types que
+analytics_marts.fct_supply_chain), aucune base n'est nécessaire. Pour chaque
+taille, les deux implémentations sont chronométrées et leurs sorties
+comparées (assert_frame_equal).
+
+Usage:
+    python benchmarks/bench_feature_kernels.py
+    python benchmarks/bench_feature_kernels.py --rows 100000 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from dataco_schema import FACT_DTYPES, FEATURE_DTYPES, apply_schema  # noqa: E402
+from feature_kernels import compute_features  # noqa: E402
+
+
+def synthetic_facts(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Table de faits aléatoire de n_rows lignes, types de FACT_DTYPES"""
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 1100, n_rows), unit='D')
+    shipping_real = rng.integers(0, 7, n_rows)
+    scheduled = rng.integers(0, 5, n_rows)
+    delay = shipping_real - scheduled
+    df = pd.DataFrame({
+        'order_id': np.arange(n_rows) // 2 + 1,
+        'order_item_id': np.arange(n_rows) + 1,
+        'order_date': dates,
+        'customer_id': rng.integers(1, max(n_rows // 10, 2), n_rows),
+        'order_year': dates.year,
+        'order_month': dates.month,
+        'order_quarter': dates.quarter,
+        'order_day': dates.day,
+        'days_for_shipping_real': shipping_real,
+        'days_for_shipment_scheduled': scheduled,
+        'shipping_delay_days': delay,
+        'late_delivery_risk': (delay > 0).astype(int),
+        'delivery_status': rng.choice(['Late delivery', 'Advance shipping', 'Shipping on time', 'Shipping canceled'], n_rows),
+        'order_region': rng.choice([f'Region {i}' for i in range(23)], n_rows),
+        'order_country': rng.choice(['France', 'Mexico', 'Estados Unidos'], n_rows),
+        'market': rng.choice(['Europe', 'LATAM', 'USCA', 'Africa', 'Pacific Asia'], n_rows),
+        'sales': np.round(rng.gamma(2, 100, n_rows), 2),
+        'order_profit_per_order': np.round(rng.normal(20, 50, n_rows), 2),
+    })
+    df['benefit_per_order'] = df['order_profit_per_order']
+    df['is_on_time'] = (delay <= 0).astype(int)
+    df['is_profitable'] = (df['order_profit_per_order'] > 0).astype(int)
+    df['performance_score'] = rng.choice(['Excellent', 'Good', 'Average', 'Poor'], n_rows)
+    return apply_schema(df, FACT_DTYPES)
+
+
+def legacy_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Ancienne implémentation de create_features (apply ligne à ligne, merge)"""
+    df['is_weekend'] = df['order_date'].apply(lambda x: 1 if pd.to_datetime(x).dayofweek >= 5 else 0)
+    df['days_since_year_start'] = df['order_date'].apply(lambda x: pd.to_datetime(x).timetuple().tm_yday)
+    df['is_end_of_month'] = df['order_date'].apply(lambda x: 1 if pd.to_datetime(x).day > 25 else 0)
+    df['is_beginning_of_month'] = df['order_date'].apply(lambda x: 1 if pd.to_datetime(x).day <= 5 else 0)
+
+    df['revenue_per_shipping_day'] = df['sales'] / (df['days_for_shipping_real'] + 1)
+    df['profit_margin'] = (df['order_profit_per_order'] / df['sales'].replace(0, np.nan)) * 100
+    df['profit_margin'] = df['profit_margin'].fillna(0)
+
+    df['is_high_value_order'] = (df['sales'] > df['sales'].quantile(0.75)).astype(int)
+    df['is_low_value_order'] = (df['sales'] < df['sales'].quantile(0.25)).astype(int)
+    df['is_highly_profitable'] = (
+        df['order_profit_per_order'] > df['order_profit_per_order'].quantile(0.75)
+    ).astype(int)
+
+    df['delay_vs_scheduled'] = df['shipping_delay_days'] / (df['days_for_shipment_scheduled'] + 1)
+    df['is_severe_delay'] = (df['shipping_delay_days'] > 7).astype(int)
+
+    df['delivery_status_encoded'] = pd.factorize(df['delivery_status'])[0]
+    df['market_encoded'] = pd.factorize(df['market'])[0]
+    df['order_region_encoded'] = pd.factorize(df['order_region'])[0]
+    df['performance_score_encoded'] = pd.factorize(df['performance_score'])[0]
+
+    customer_stats = df.groupby('customer_id').agg({
+        'order_id': 'count',
+        'sales': ['sum', 'mean'],
+        'late_delivery_risk': 'mean'
+    }).reset_index()
+    customer_stats.columns = [
+        'customer_id', 'customer_total_orders', 'customer_total_sales',
+        'customer_avg_order_value', 'customer_late_delivery_rate'
+    ]
+    df = df.merge(customer_stats, on='customer_id', how='left')
+
+    region_stats = df.groupby('order_region', observed=True).agg({
+        'late_delivery_risk': 'mean',
+        'sales': 'mean'
+    }).reset_index()
+    region_stats.columns = ['order_region', 'region_late_delivery_rate', 'region_avg_sales']
+    df = df.merge(region_stats, on='order_region', how='left')
+
+    df['high_value_late_risk'] = df['is_high_value_order'] * df['late_delivery_risk']
+    df['market_season_interaction'] = df['market_encoded'] * df['order_quarter']
+    return apply_schema(df, FEATURE_DTYPES)
+
+
+def timed(func, df: pd.DataFrame):
+    start = time.perf_counter()
+    result = func(df)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'lignes':>10} {'ancien (s)':>12} {'noyaux (s)':>12} {'gain':>8}  sorties")
+    for n_rows in args.rows:
+        facts = synthetic_facts(n_rows, args.seed)
+        legacy, legacy_seconds = timed(legacy_features, facts.copy())
+        vectorized, kernel_seconds = timed(compute_features, facts)
+        pd.testing.assert_frame_equal(legacy, vectorized)
+        print(
+            f"{n_rows:>10} {legacy_seconds:>12.2f} {kernel_seconds:>12.2f} "
+            f"{legacy_seconds / kernel_seconds:>7.1f}x  identiques"
+        )
+        del facts, legacy, vectorized
+
+
+if __name__ == "__main__":
+    main()
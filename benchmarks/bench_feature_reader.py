@@ -0,0 +1,111 @@
+"""
+Benchmark de lecture des features d'entraînement depuis PostgreSQL
+
+Compare, sur les colonnes lues par ml_modeling (TRAINING_COLUMNS):
+- read_sql("SELECT *") puis apply_schema (lecture historique)
+- read_sql de ces seules colonnes
+- COPY binaire de ces seules colonnes vers des tableaux NumPy (db.copy_columns)
+
+Chaque méthode tourne dans un processus neuf: durée, pic d'allocations
+Python / NumPy (tracemalloc) et croissance du RSS maximal du processus.
+Sans --table, une table de features synthétique (noyaux appliqués à
+bench_feature_kernels.synthetic_facts) est écrite dans le schéma bench puis
+supprimée. Nécessite la base configurée dans .env (DB_HOST, DB_NAME...).
+
+Usage:
+    python benchmarks/bench_feature_reader.py --rows 1000000
+    python benchmarks/bench_feature_reader.py --table staging.features_ml
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from bench_feature_kernels import synthetic_facts  # noqa: E402
+from dataco_schema import FEATURES_ML_DTYPES, apply_schema  # noqa: E402
+from db import copy_columns, copy_dataframe, get_engine  # noqa: E402
+from feature_kernels import compute_features  # noqa: E402
+from ml_modeling import TRAINING_COLUMNS  # noqa: E402
+
+
+def read_all(schema: str, table: str) -> pd.DataFrame:
+    return apply_schema(pd.read_sql(f"SELECT * FROM {schema}.{table}", get_engine()), FEATURES_ML_DTYPES)
+
+
+def read_projected(schema: str, table: str) -> pd.DataFrame:
+    query = f"SELECT {', '.join(TRAINING_COLUMNS)} FROM {schema}.{table}"
+    return apply_schema(pd.read_sql(query, get_engine()), FEATURES_ML_DTYPES)
+
+
+def copy_projected(schema: str, table: str) -> pd.DataFrame:
+    return copy_columns(table, TRAINING_COLUMNS, FEATURES_ML_DTYPES, schema=schema)
+
+
+METHODS = {
+    'read_sql SELECT *': read_all,
+    'read_sql colonnes': read_projected,
+    'COPY binaire colonnes': copy_projected,
+}
+
+
+def measure(name: str, schema: str, table: str, results) -> None:
+    """Exécuté dans un processus enfant: une lecture, mesurée"""
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = METHODS[name](schema, table)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    results.put((name, len(df), len(df.columns), seconds, peak / 1e6, rss_growth / 1e3, df.memory_usage().sum() / 1e6))
+
+
+def write_synthetic(n_rows: int, schema: str, table: str) -> None:
+    engine = get_engine()
+    features = compute_features(synthetic_facts(n_rows))
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+    features.head(0).to_sql(table, engine, schema=schema, if_exists='replace', index=False)
+    copy_dataframe(features, table, schema=schema, engine=engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000])
+    parser.add_argument('--table', default=None, help="table existante (schema.table) au lieu de données synthétiques")
+    args = parser.parse_args()
+
+    targets = [tuple(args.table.split('.'))] if args.table else [('bench', f'features_{n}') for n in args.rows]
+    context = multiprocessing.get_context('spawn')
+    print(f"{'table':>24} {'méthode':>22} {'lignes':>10} {'col.':>5} {'durée (s)':>10} "
+          f"{'pic alloc (Mo)':>15} {'RSS max +(Mo)':>14} {'frame (Mo)':>11}")
+    for (schema, table), n_rows in zip(targets, args.rows):
+        if not args.table:
+            write_synthetic(n_rows, schema, table)
+        try:
+            for name in METHODS:
+                results = context.Queue()
+                process = context.Process(target=measure, args=(name, schema, table, results))
+                process.start()
+                _, rows, columns, seconds, peak_mb, rss_mb, frame_mb = results.get()
+                process.join()
+                print(f"{schema + '.' + table:>24} {name:>22} {rows:>10} {columns:>5} {seconds:>10.2f} "
+                      f"{peak_mb:>15.1f} {rss_mb:>14.1f} {frame_mb:>11.1f}")
+        finally:
+            if not args.table:
+                with get_engine().begin() as conn:
+                    conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{table}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark de latence du store de features en ligne (online_store.OnlineFeatureStore)
+
+Un store synthétique (n clients, 23 régions) est publié dans un répertoire
+temporaire puis relu en mémoire mappée. Pour chaque taille de lot, get_many
+est appelé sur des clés aléatoires (dont une part inconnues) et les
+latences p50 / p99 sont affichées en microsecondes, avec le débit en clés
+par seconde.
+
+Usage:
+    python benchmarks/bench_online_store.py
+    python benchmarks/bench_online_store.py --customers 100000 --batch-sizes 1 100
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from online_store import ENTITIES, OnlineFeatureStore, publish  # noqa: E402
+
+
+def synthetic_entities(n_customers: int, seed: int = 0) -> dict:
+    """Features client / région aléatoires au format de FeatureStore.entity_frames"""
+    rng = np.random.default_rng(seed)
+    frames = {}
+    for entity, (key, features) in ENTITIES.items():
+        if entity == 'customer':
+            index = pd.Index(rng.choice(n_customers * 3, n_customers, replace=False) + 1, name=key)
+        else:
+            index = pd.Index([f'Region {i}' for i in range(23)], name=key)
+        frames[entity] = pd.DataFrame(rng.random((len(index), len(features))), index=index, columns=features)
+    return frames
+
+
+def latencies(store: OnlineFeatureStore, entity: str, keys: np.ndarray, batch_size: int, repeats: int) -> np.ndarray:
+    rng = np.random.default_rng(batch_size)
+    samples = np.empty(repeats)
+    for i in range(repeats):
+        batch = keys[rng.integers(0, len(keys), batch_size)]
+        start = time.perf_counter()
+        store.get_many(entity, batch)
+        samples[i] = time.perf_counter() - start
+    return samples * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--customers', type=int, default=1_000_000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--repeats', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    frames = synthetic_entities(args.customers, args.seed)
+    with tempfile.TemporaryDirectory() as root:
+        start = time.perf_counter()
+        publish(frames, root=root)
+        publish_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        store = OnlineFeatureStore(root)
+        open_ms = (time.perf_counter() - start) * 1000
+        print(f"publication: {publish_seconds:.2f}s, ouverture: {open_ms:.1f} ms ({args.customers} clients)")
+
+        # un quart des clés demandées sont inconnues (clients absents du store)
+        known = frames['customer'].index.to_numpy()
+        customer_keys = np.concatenate([known, -np.arange(1, len(known) // 3 + 1)])
+        region_keys = np.array(list(frames['region'].index) + ['Inconnue'], dtype=object)
+
+        print(f"{'entité':>8} {'lot':>6} {'p50 (µs)':>10} {'p99 (µs)':>10} {'clés/s':>12}")
+        for entity, keys in (('customer', customer_keys), ('region', region_keys)):
+            for batch_size in args.batch_sizes:
+                samples = latencies(store, entity, keys, batch_size, args.repeats)
+                p50, p99 = np.percentile(samples, [50, 99])
+                print(
+                    f"{entity:>8} {batch_size:>6} {p50:>10.1f} {p99:>10.1f} "
+                    f"{batch_size / samples.mean() * 1e6:>12.0f}"
+                )
+        del store
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark de l'ingestion parallèle du CSV (extract_data.parallel_csv_to_postgres)
+Mesure le temps total pour 1, 2, 4 et 8 workers
+
+Usage:
+    python benchmarks/bench_parallel_extract.py                 # parse + validation + chargement
+    python benchmarks/bench_parallel_extract.py --parse-only    # sans base de données
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from extract_data import (  # noqa: E402
+    get_db_connection,
+    create_raw_schema,
+    parallel_csv_to_postgres,
+    process_partition,
+    split_csv_byte_ranges,
+)
+
+DEFAULT_CSV = os.path.join(
+    os.path.dirname(__file__), '..', 'dataset', 'DataCoSupplyChainDatasetRefined.csv'
+)
+
+
+def parse_only(csv_path: str, workers: int) -> int:
+    """Découper, parser et valider les partitions sans charger en base"""
+    columns, ranges = split_csv_byte_ranges(csv_path, workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(process_partition, csv_path, start, end, columns)
+            for start, end in ranges
+        ]
+        return sum(future.result()['rows'] for future in futures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=DEFAULT_CSV)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--parse-only', action='store_true')
+    args = parser.parse_args()
+
+    engine = None
+    if not args.parse_only:
+        engine = get_db_connection()
+        create_raw_schema(engine)
+
+    print(f"{'workers':>8} {'lignes':>10} {'secondes':>10} {'lignes/s':>12}")
+    for workers in args.workers:
+        start = time.perf_counter()
+        if args.parse_only:
+            n_rows = parse_only(args.csv, workers)
+        else:
+            n_rows = parallel_csv_to_postgres(args.csv, engine, 'supply_chain_raw', workers=workers)
+        elapsed = time.perf_counter() - start
+        print(f"{workers:>8} {n_rows:>10} {elapsed:>10.2f} {n_rows / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
+import os
 import sys
 
 # Ensure our mounted project paths are importable inside Airflow containers
-for p in ["/opt/airflow", "/opt/airflow/scripts"]:
+# (and the local scripts/ directory, whose modules import each other by name)
+for p in ["/opt/airflow", "/opt/airflow/scripts", os.path.join(os.path.dirname(__file__), "scripts")]:
     if p not in sys.path:
         sys.path.insert(0, p)
@@ -0,0 +1,16 @@
+/*
+    Nom du schéma cible d'un modèle
+    - comportement dbt par défaut (<target.schema>_<schema>) pour tous les modèles,
+    - sauf ceux du dossier models/features, publiés tels quels dans leur schéma
+      (staging.features_ml, lue par ml_modeling.py)
+*/
+
+{% macro generate_schema_name(custom_schema_name, node) -%}
+    {%- if custom_schema_name is none -%}
+        {{ target.schema }}
+    {%- elif node.fqn[1:2] == ['features'] -%}
+        {{ custom_schema_name | trim }}
+    {%- else -%}
+        {{ target.schema }}_{{ custom_schema_name | trim }}
+    {%- endif -%}
+{%- endmacro %}
@@ -0,0 +1,120 @@
+/*
+    Features ML calculées dans PostgreSQL -> staging.features_ml
+    
+    Équivalent SQL de feature_engineering.create_features (mode 'pandas'):
+    mêmes colonnes, mêmes types, sans aller-retour des données vers Python.
+    - seuils de quantiles par percentile_cont (interpolation linéaire, comme pandas)
+    - agrégats client / région par fenêtres
+    - encodages: rang alphabétique des valeurs (0..n-1, -1 si NULL), stable
+      d'une exécution à l'autre, alors que pd.factorize suit l'ordre de lecture
+    - divisions par zéro -> NULL (pandas produit inf)
+*/
+
+{{ config(
+    materialized='table',
+    schema='staging'
+) }}
+
+{%- set encoded_columns = ['delivery_status', 'market', 'order_region', 'performance_score'] %}
+
+-- Colonnes de la table de faits, aux types compacts de dataco_schema.FACT_DTYPES
+WITH facts AS (
+    SELECT
+        CAST(order_id AS INTEGER) AS order_id,
+        CAST(order_item_id AS INTEGER) AS order_item_id,
+        CAST(order_date AS TIMESTAMP) AS order_date,
+        CAST(customer_id AS INTEGER) AS customer_id,
+        CAST(order_year AS SMALLINT) AS order_year,
+        CAST(order_month AS SMALLINT) AS order_month,
+        CAST(order_quarter AS SMALLINT) AS order_quarter,
+        CAST(order_day AS SMALLINT) AS order_day,
+        CAST(days_for_shipping_real AS SMALLINT) AS days_for_shipping_real,
+        CAST(days_for_shipment_scheduled AS SMALLINT) AS days_for_shipment_scheduled,
+        CAST(shipping_delay_days AS SMALLINT) AS shipping_delay_days,
+        CAST(late_delivery_risk AS SMALLINT) AS late_delivery_risk,
+        delivery_status,
+        order_region,
+        order_country,
+        market,
+        CAST(sales AS REAL) AS sales,
+        CAST(order_profit_per_order AS REAL) AS order_profit_per_order,
+        CAST(benefit_per_order AS REAL) AS benefit_per_order,
+        CAST(is_on_time AS SMALLINT) AS is_on_time,
+        CAST(is_profitable AS SMALLINT) AS is_profitable,
+        performance_score
+    FROM {{ ref('fct_supply_chain') }}
+),
+
+thresholds AS (
+    SELECT
+        percentile_cont(0.25) WITHIN GROUP (ORDER BY sales) AS sales_p25,
+        percentile_cont(0.75) WITHIN GROUP (ORDER BY sales) AS sales_p75,
+        percentile_cont(0.75) WITHIN GROUP (ORDER BY order_profit_per_order) AS profit_p75
+    FROM facts
+),
+
+{% for column in encoded_columns %}
+{{ column }}_codes AS (
+    SELECT
+        {{ column }},
+        DENSE_RANK() OVER (ORDER BY {{ column }}) - 1 AS code
+    FROM (SELECT DISTINCT {{ column }} FROM facts WHERE {{ column }} IS NOT NULL) AS v
+),
+{% endfor %}
+
+features AS (
+    SELECT
+        f.*,
+        
+        -- 1. Features temporelles
+        CAST(CASE WHEN EXTRACT(ISODOW FROM f.order_date) >= 6 THEN 1 ELSE 0 END AS SMALLINT) AS is_weekend,
+        CAST(EXTRACT(DOY FROM f.order_date) AS SMALLINT) AS days_since_year_start,
+        CAST(CASE WHEN EXTRACT(DAY FROM f.order_date) > 25 THEN 1 ELSE 0 END AS SMALLINT) AS is_end_of_month,
+        CAST(CASE WHEN EXTRACT(DAY FROM f.order_date) <= 5 THEN 1 ELSE 0 END AS SMALLINT) AS is_beginning_of_month,
+        
+        -- 2. Features financières dérivées
+        CAST(f.sales / NULLIF(f.days_for_shipping_real + 1, 0) AS REAL) AS revenue_per_shipping_day,
+        CAST(COALESCE(f.order_profit_per_order / NULLIF(f.sales, 0) * 100, 0) AS REAL) AS profit_margin,
+        
+        -- 3. Features de catégorisation
+        CAST(CASE WHEN f.sales > t.sales_p75 THEN 1 ELSE 0 END AS SMALLINT) AS is_high_value_order,
+        CAST(CASE WHEN f.sales < t.sales_p25 THEN 1 ELSE 0 END AS SMALLINT) AS is_low_value_order,
+        CAST(CASE WHEN f.order_profit_per_order > t.profit_p75 THEN 1 ELSE 0 END AS SMALLINT) AS is_highly_profitable,
+        
+        -- 4. Features de délai
+        CAST(f.shipping_delay_days::float8 / NULLIF(f.days_for_shipment_scheduled + 1, 0) AS REAL) AS delay_vs_scheduled,
+        CAST(CASE WHEN f.shipping_delay_days > 7 THEN 1 ELSE 0 END AS SMALLINT) AS is_severe_delay,
+        
+        -- 5. Encodage des variables catégorielles
+        {%- for column in encoded_columns %}
+        CAST(COALESCE({{ column }}_codes.code, -1) AS SMALLINT) AS {{ column }}_encoded,
+        {%- endfor %}
+        
+        -- 6. Features d'agrégation par client
+        CAST(COUNT(f.order_id) OVER customer AS INTEGER) AS customer_total_orders,
+        SUM(CAST(f.sales AS DOUBLE PRECISION)) OVER customer AS customer_total_sales,
+        CAST(AVG(f.sales) OVER customer AS REAL) AS customer_avg_order_value,
+        CAST(AVG(f.late_delivery_risk) OVER customer AS REAL) AS customer_late_delivery_rate,
+        
+        -- 7. Features d'agrégation par région (pas d'agrégat pour une région NULL)
+        CAST(CASE WHEN f.order_region IS NOT NULL THEN AVG(f.late_delivery_risk) OVER region END AS REAL) AS region_late_delivery_rate,
+        CAST(CASE WHEN f.order_region IS NOT NULL THEN AVG(f.sales) OVER region END AS REAL) AS region_avg_sales
+        
+    FROM facts f
+    CROSS JOIN thresholds t
+    {%- for column in encoded_columns %}
+    LEFT JOIN {{ column }}_codes ON {{ column }}_codes.{{ column }} = f.{{ column }}
+    {%- endfor %}
+    WINDOW
+        customer AS (PARTITION BY f.customer_id),
+        region AS (PARTITION BY f.order_region)
+)
+
+SELECT
+    *,
+    
+    -- 8. Interaction features
+    CAST(is_high_value_order * late_delivery_risk AS SMALLINT) AS high_value_late_risk,
+    CAST(market_encoded * order_quarter AS SMALLINT) AS market_season_interaction
+    
+FROM features
@@ -0,0 +1,247 @@
+"""
+Schéma de types compacts déclarés du dataset DataCo Supply Chain
+
+Chaque script qui charge des données brutes ou des features applique ces
+types au lieu de l'inférence pandas: les chaînes deviennent `category`, les
+identifiants et indicateurs entiers sont réduits, et les montants sont en
+`float32` (dbt les convertit en NUMERIC(10,2) / NUMERIC(5,4), bien dans la
+précision d'un float32). Les coordonnées restent en `float64`. Les dates
+sont analysées une seule fois, à la lecture.
+
+En script, compare la mémoire du schéma déclaré à celle du DataFrame inféré:
+python scripts/dataco_schema.py chemin/du/fichier.csv
+"""
+
+from __future__ import annotations
+
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DATETIME = "datetime64[ns]"
+
+# raw_data.supply_chain_raw / DataCoSupplyChainDatasetRefined.csv
+RAW_DTYPES: dict[str, str] = {
+    "type": "category",
+    "days_for_shipping_real": "int8",
+    "days_for_shipment_scheduled": "int8",
+    "benefit_per_order": "float32",
+    "sales_per_customer": "float32",
+    "delivery_status": "category",
+    "late_delivery_risk": "int8",
+    "category_id": "int16",
+    "category_name": "category",
+    "customer_city": "category",
+    "customer_country": "category",
+    "customer_email": "category",
+    "customer_fname": "category",
+    "customer_id": "int32",
+    "customer_lname": "category",
+    "customer_password": "category",
+    "customer_segment": "category",
+    "customer_state": "category",
+    "customer_street": "category",
+    "customer_zipcode": "float32",
+    "department_id": "int16",
+    "department_name": "category",
+    "latitude_src": "float64",
+    "longitude_src": "float64",
+    "market": "category",
+    "order_city": "category",
+    "order_country": "category",
+    "order_customer_id": "int32",
+    "order_date_dateorders": DATETIME,
+    "order_id": "int32",
+    "order_item_cardprod_id": "int32",
+    "order_item_discount": "float32",
+    "order_item_discount_rate": "float32",
+    "order_item_id": "int32",
+    "order_item_product_price": "float32",
+    "order_item_profit_ratio": "float32",
+    "order_item_quantity": "int16",
+    "sales": "float32",
+    "order_item_total": "float32",
+    "order_profit_per_order": "float32",
+    "order_region": "category",
+    "order_state": "category",
+    "order_status": "category",
+    "order_zipcode": "float32",
+    "product_card_id": "int32",
+    "product_category_id": "int16",
+    "product_image": "category",
+    "product_name": "category",
+    "product_price": "float32",
+    "product_status": "int8",
+    "shipping_date_dateorders": DATETIME,
+    "shipping_mode": "category",
+    "order_country_en": "category",
+    "order_state_en": "category",
+    "order_city_en": "category",
+    "latitude_dest": "float64",
+    "longitude_dest": "float64",
+    "address_dest": "category",
+}
+
+# analytics_marts.fct_supply_chain (colonnes lues par le feature engineering)
+FACT_DTYPES: dict[str, str] = {
+    "order_id": "int32",
+    "order_item_id": "int32",
+    "order_date": DATETIME,
+    "customer_id": "int32",
+    "order_year": "int16",
+    "order_month": "int8",
+    "order_quarter": "int8",
+    "order_day": "int8",
+    "days_for_shipping_real": "int8",
+    "days_for_shipment_scheduled": "int8",
+    "shipping_delay_days": "int16",
+    "late_delivery_risk": "int8",
+    "delivery_status": "category",
+    "order_region": "category",
+    "order_country": "category",
+    "market": "category",
+    "sales": "float32",
+    "order_profit_per_order": "float32",
+    "benefit_per_order": "float32",
+    "is_on_time": "int8",
+    "is_profitable": "int8",
+    "performance_score": "category",
+}
+
+# Colonnes dérivées par feature_engineering.create_features
+FEATURE_DTYPES: dict[str, str] = {
+    "is_weekend": "int8",
+    "days_since_year_start": "int16",
+    "is_end_of_month": "int8",
+    "is_beginning_of_month": "int8",
+    "revenue_per_shipping_day": "float32",
+    "profit_margin": "float32",
+    "is_high_value_order": "int8",
+    "is_low_value_order": "int8",
+    "is_highly_profitable": "int8",
+    "delay_vs_scheduled": "float32",
+    "is_severe_delay": "int8",
+    "delivery_status_encoded": "int8",
+    "market_encoded": "int8",
+    "order_region_encoded": "int8",
+    "performance_score_encoded": "int8",
+    "customer_total_orders": "int32",
+    "customer_total_sales": "float64",
+    "customer_avg_order_value": "float32",
+    "customer_late_delivery_rate": "float32",
+    "region_late_delivery_rate": "float32",
+    "region_avg_sales": "float32",
+    "high_value_late_risk": "int8",
+    "market_season_interaction": "int8",
+}
+
+# staging.features_ml = colonnes de faits + features dérivées
+FEATURES_ML_DTYPES: dict[str, str] = {**FACT_DTYPES, **FEATURE_DTYPES}
+
+
+def csv_read_options(csv_path: str, dtypes: dict[str, str] = RAW_DTYPES, encoding: str = "utf-8") -> dict:
+    """
+    Arguments de pd.read_csv appliquant `dtypes` à l'en-tête du fichier
+    
+    Les noms de l'en-tête sont comparés sans leurs espaces: un en-tête avec
+    des espaces garde son type déclaré. Les colonnes de dates vont dans `parse_dates`.
+    """
+    header = pd.read_csv(csv_path, nrows=0, encoding=encoding).columns
+    return header_read_options(header, dtypes)
+
+
+def header_read_options(header, dtypes: dict[str, str] = RAW_DTYPES) -> dict:
+    """Comme csv_read_options, pour une liste de noms d'en-tête déjà connue"""
+    dtype, parse_dates = {}, []
+    for name in header:
+        declared = dtypes.get(name.strip())
+        if declared == DATETIME:
+            parse_dates.append(name)
+        elif declared is not None:
+            dtype[name] = declared
+    return {"dtype": dtype, "parse_dates": parse_dates}
+
+
+def apply_schema(df: pd.DataFrame, dtypes: dict[str, str]) -> pd.DataFrame:
+    """
+    Convertir sur place les colonnes déclarées de `df` et le retourner
+    
+    Les colonnes qui ne peuvent pas prendre leur type déclaré (par exemple
+    des entiers avec des valeurs manquantes) gardent leur type actuel, avec
+    un avertissement dans le journal.
+    """
+    for col, declared in dtypes.items():
+        if col not in df.columns or str(df[col].dtype) == declared:
+            continue
+        try:
+            if declared == DATETIME:
+                df[col] = pd.to_datetime(df[col], errors="coerce")
+            else:
+                df[col] = df[col].astype(declared)
+        except (ValueError, TypeError) as e:
+            logger.warning("Colonne %s gardée en %s (déclarée %s): %s", col, df[col].dtype, declared, e)
+    return df
+
+
+def conform_frame(df: pd.DataFrame, dtypes: dict[str, str]) -> pd.DataFrame:
+    """
+    Convertir sur place `df` exactement aux types déclarés d'une table et le retourner
+    
+    Contrairement à apply_schema, rien ne reste au type inféré: une colonne
+    entière avec des valeurs manquantes devient l'entier nullable de la
+    largeur déclarée (COPY envoie alors NULL, et non "42.0" dans une colonne
+    INTEGER), et une valeur qui ne peut pas prendre son type déclaré lève
+    une exception au lieu d'un avertissement.
+    """
+    for col, declared in dtypes.items():
+        if col not in df.columns or str(df[col].dtype) == declared:
+            continue
+        if declared == DATETIME:
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+        elif declared.startswith("int") and df[col].isna().any():
+            df[col] = df[col].astype(declared.capitalize())
+        else:
+            df[col] = df[col].astype(declared)
+    return df
+
+
+def empty_frame(dtypes: dict[str, str] = RAW_DTYPES, columns: list[str] | None = None) -> pd.DataFrame:
+    """
+    DataFrame vide aux types déclarés (création des tables)
+    
+    `columns` fixe l'ordre des colonnes; les colonnes non déclarées sont en `object`.
+    """
+    columns = list(dtypes) if columns is None else columns
+    return pd.DataFrame({col: pd.Series(dtype=dtypes.get(col, "object")) for col in columns})
+
+
+def memory_report(compact: pd.DataFrame, inferred: pd.DataFrame) -> dict:
+    """Mémoire (deep) du DataFrame au schéma déclaré comparée à celle du DataFrame inféré"""
+    compact_bytes = int(compact.memory_usage(deep=True).sum())
+    inferred_bytes = int(inferred.memory_usage(deep=True).sum())
+    return {
+        "inferred_bytes": inferred_bytes,
+        "compact_bytes": compact_bytes,
+        "saved_bytes": inferred_bytes - compact_bytes,
+        "ratio": inferred_bytes / compact_bytes if compact_bytes else float("nan"),
+    }
+
+
+def compare_csv_memory(csv_path: str, encoding: str = "utf-8") -> dict:
+    """Lire le CSV des deux façons et mesurer la mémoire économisée par RAW_DTYPES"""
+    inferred = pd.read_csv(csv_path, encoding=encoding, low_memory=False)
+    compact = pd.read_csv(csv_path, encoding=encoding, **csv_read_options(csv_path, encoding=encoding))
+    return memory_report(compact, inferred)
+
+
+if __name__ == "__main__":
+    import sys
+
+    report = compare_csv_memory(sys.argv[1])
+    print(
+        f"inféré: {report['inferred_bytes'] / 1e6:.1f} Mo, "
+        f"déclaré: {report['compact_bytes'] / 1e6:.1f} Mo, "
+        f"économisé: {report['saved_bytes'] / 1e6:.1f} Mo (x{report['ratio']:.1f})"
+    )
@@ -0,0 +1,417 @@
+"""
+Accès PostgreSQL partagé par les scripts du pipeline
+
+- un moteur avec pool par processus (pre-ping, recyclage, taille du pool par l'environnement)
+- curseurs serveur pour les grosses lectures (read_sql_chunks)
+- délai maximal par requête (statement_timeout)
+- écritures en masse par COPY (copy_dataframe)
+- lectures COPY binaires de quelques colonnes vers des tableaux NumPy (copy_columns)
+- compteurs d'allers-retours et d'octets, journalisés par tâche (décorateur track_db_usage)
+
+Paramètres (environnement / .env): DB_HOST, DB_PORT, DB_NAME, DB_USER,
+DB_PASSWORD, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE,
+DB_STATEMENT_TIMEOUT_MS (0 = pas de délai)
+"""
+
+from __future__ import annotations
+
+import functools
+import io
+import logging
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event, inspect, text
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+
+@dataclass
+class DbStats:
+    """
+    Compteurs de trafic avec la base du processus courant
+    
+    bytes_sent compte le texte SQL, les paramètres et les données COPY FROM;
+    bytes_received les données COPY TO. Les résultats ordinaires ne sont
+    comptés que dans rows_fetched: psycopg2 n'expose pas leur taille réseau.
+    """
+
+    round_trips: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    rows_fetched: int = 0
+    seconds: float = 0.0
+
+    def snapshot(self) -> "DbStats":
+        return DbStats(**{f.name: getattr(self, f.name) for f in fields(self)})
+
+    def since(self, start: "DbStats") -> "DbStats":
+        return DbStats(**{f.name: getattr(self, f.name) - getattr(start, f.name) for f in fields(self)})
+
+
+_stats = DbStats()
+_engines: dict = {}
+
+
+def db_stats() -> DbStats:
+    """Compteurs cumulés par ce processus depuis son démarrage"""
+    return _stats
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_start"] = time.perf_counter()
+    _stats.round_trips += 1
+    _stats.bytes_sent += len(statement) + (len(repr(parameters)) if parameters else 0)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _stats.seconds += time.perf_counter() - conn.info.pop("query_start", time.perf_counter())
+    if cursor.description is not None and cursor.rowcount > 0:
+        _stats.rows_fetched += cursor.rowcount
+
+
+def connection_url() -> str:
+    db_host = os.getenv('DB_HOST', 'localhost')
+    db_port = os.getenv('DB_PORT', '5432')
+    db_name = os.getenv('DB_NAME', 'supply_chain_dw')
+    db_user = os.getenv('DB_USER', 'postgres')
+    db_password = os.getenv('DB_PASSWORD', 'postgres')
+    return f'postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}'
+
+
+def get_engine():
+    """Moteur avec pool, créé une fois par processus (les processus forkés ont le leur)"""
+    pid = os.getpid()
+    engine = _engines.get(pid)
+    if engine is None:
+        connect_args = {}
+        timeout_ms = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '0'))
+        if timeout_ms:
+            connect_args['options'] = f'-c statement_timeout={timeout_ms}'
+        engine = create_engine(
+            connection_url(),
+            pool_size=int(os.getenv('DB_POOL_SIZE', '5')),
+            max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '10')),
+            pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '1800')),
+            pool_pre_ping=True,
+            connect_args=connect_args,
+        )
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        _engines[pid] = engine
+    return engine
+
+
+def get_db_connection():
+    """Nom historique utilisé par les scripts du pipeline: le moteur du processus"""
+    return get_engine()
+
+
+@contextmanager
+def statement_timeout(conn, milliseconds: int):
+    """Appliquer un délai maximal aux requêtes de la transaction courante"""
+    conn.execute(text(f"SET LOCAL statement_timeout = {int(milliseconds)}"))
+    yield conn
+
+
+def read_sql_chunks(query: str, engine=None, chunksize: int = 50000, params: dict | None = None) -> Iterator[pd.DataFrame]:
+    """Lire le résultat d'une requête en flux par un curseur serveur (nommé), bloc par bloc"""
+    engine = engine or get_engine()
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=chunksize)
+        for chunk in pd.read_sql(text(query), conn, params=params, chunksize=chunksize):
+            yield chunk
+
+
+def plan_refresh(conn, watermark: int | None, schema: str = "raw_data") -> tuple[str, int | None]:
+    """
+    Décider comment rafraîchir un état dérivé de la table brute depuis `watermark`
+    
+    Retourne (action, last_load_id), action valant:
+    - "full": pas encore d'état, un rechargement complet, ou des lignes
+      modifiées depuis le watermark (un état dérivé comme un sketch ne
+      peut pas retirer une ligne)
+    - "delta": seulement des insertions incrémentales, à intégrer
+    - "none": rien de chargé depuis le watermark
+    """
+    if not inspect(conn).has_table("load_runs", schema=schema):
+        return "full", None
+
+    last_load, rebuilds = conn.execute(text(f"""
+        SELECT COALESCE(MAX(load_id), 0),
+               COUNT(*) FILTER (WHERE load_method <> 'incremental' OR rows_updated > 0)
+        FROM {schema}.load_runs
+        WHERE load_id > :watermark
+    """), {"watermark": watermark or 0}).one()
+
+    if watermark is None or rebuilds:
+        latest = conn.execute(text(f"SELECT MAX(load_id) FROM {schema}.load_runs")).scalar()
+        return "full", latest
+    if not last_load:
+        return "none", watermark
+    return "delta", last_load
+
+
+def copy_chunk(raw_conn, df: pd.DataFrame, table_name: str, schema: str) -> None:
+    """Envoyer un bloc de lignes par COPY FROM STDIN (format texte CSV), sans valider la transaction"""
+    columns = ', '.join(f'"{c}"' for c in df.columns)
+    buffer = io.StringIO()
+    df.to_csv(buffer, header=False, index=False)
+    n_bytes = buffer.tell()
+    buffer.seek(0)
+    t0 = time.perf_counter()
+    with raw_conn.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {schema}.{table_name} ({columns}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    _stats.round_trips += 1
+    _stats.bytes_sent += n_bytes
+    _stats.seconds += time.perf_counter() - t0
+
+
+def copy_dataframe(
+    df: pd.DataFrame,
+    table_name: str,
+    schema: str,
+    engine=None,
+    truncate: bool = False,
+    chunksize: int = 50000,
+) -> int:
+    """
+    Écrire un DataFrame en masse par COPY FROM STDIN, en une seule transaction
+    
+    La table est créée aux types du DataFrame si elle n'existe pas. Avec
+    truncate=True elle est vidée dans la même transaction: un chargement
+    en échec laisse intacts le contenu précédent (et les vues qui en dépendent).
+    """
+    engine = engine or get_engine()
+    if not inspect(engine).has_table(table_name, schema=schema):
+        logger.info(f"Création de la table {schema}.{table_name}")
+        df.head(0).to_sql(table_name, engine, schema=schema, index=False)
+
+    raw_conn = engine.raw_connection()
+    try:
+        if truncate:
+            with raw_conn.cursor() as cursor:
+                cursor.execute(f"TRUNCATE TABLE {schema}.{table_name}")
+        for start in range(0, len(df), chunksize):
+            copy_chunk(raw_conn, df.iloc[start:start + chunksize], table_name, schema)
+        raw_conn.commit()
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+
+    return len(df)
+
+
+# Format COPY binaire: signature, puis drapeaux int32 et longueur int32 de l'extension d'en-tête
+_PGCOPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+_PGCOPY_TRAILER = b"\xff\xff"
+# Les timestamps PostgreSQL comptent les microsecondes depuis le 2000-01-01
+_PG_EPOCH_US = 946_684_800_000_000
+# Types entiers transmis, par taille d'élément NumPy
+_PG_INTEGERS = {1: ("int2", ">i2"), 2: ("int2", ">i2"), 4: ("int4", ">i4"), 8: ("int8", ">i8")}
+
+
+def _wire_type(dtype) -> tuple[str, str, np.dtype]:
+    """
+    (conversion SQL, remplacement des NULL, dtype big-endian transmis) d'une colonne envoyée à largeur fixe sans NULL
+    
+    Les entiers sont envoyés à la plus petite largeur PostgreSQL contenant le
+    dtype, les NULL comme la plus petite valeur de cette largeur; les flottants
+    en real ou double precision, NULL en NaN; les timestamps, NULL en -infinity.
+    """
+    dtype = pd.api.types.pandas_dtype(dtype)
+    if dtype.kind == "f":
+        cast, wire = ("float4", ">f4") if dtype.itemsize <= 4 else ("float8", ">f8")
+        return cast, f"'NaN'::{cast}", np.dtype(wire)
+    if dtype.kind in "iub":
+        cast, wire = _PG_INTEGERS[4] if dtype.kind == "b" else _PG_INTEGERS[dtype.itemsize]
+        return cast, f"'{np.iinfo(wire).min}'::{cast}", np.dtype(wire)
+    if dtype.kind == "M":
+        return "timestamp", "'-infinity'::timestamp", np.dtype(">i8")
+    raise ValueError(f"Lecture COPY binaire: dtype non pris en charge {dtype}")
+
+
+def binary_copy_select(source: str, columns: list[str], dtypes: dict[str, str]) -> str:
+    """SELECT envoyant `columns` de `source` en champs de largeur fixe, NULL remplacés par des sentinelles"""
+    fields = []
+    for column in columns:
+        cast, null, _ = _wire_type(dtypes[column])
+        quoted = '"' + column.replace('"', '""') + '"'
+        fields.append(f"COALESCE({quoted}::{cast}, {null})")
+    return f"SELECT {', '.join(fields)} FROM {source}"
+
+
+class BinaryCopyReader:
+    """
+    Destination de type fichier pour COPY (binary_copy_select) TO STDOUT (FORMAT binary)
+    
+    Toutes les lignes ont la même taille (nombre de champs, puis une longueur
+    et une valeur de largeur fixe par champ): les lignes en tampon sont
+    décodées par un seul np.frombuffer structuré et écrites colonne par
+    colonne dans des tableaux préalloués aux dtypes cibles, sans objet Python
+    par valeur. Les colonnes entières avec des NULL deviennent float64 avec
+    NaN, comme les renvoie read_sql.
+    """
+
+    def __init__(self, columns: list[str], dtypes: dict[str, str], n_rows: int, buffer_bytes: int = 1 << 22) -> None:
+        self.columns = list(columns)
+        self.dtypes = {c: np.dtype(dtypes[c]) for c in self.columns}
+        self.wire = {c: _wire_type(self.dtypes[c])[2] for c in self.columns}
+        fields = [("fields", ">i2")]
+        for i, column in enumerate(self.columns):
+            fields += [(f"length{i}", ">i4"), (f"value{i}", self.wire[column])]
+        self.row = np.dtype(fields)
+        self.arrays = {c: np.empty(n_rows, dtype=self.dtypes[c]) for c in self.columns}
+        self.nulls: dict[str, np.ndarray] = {}
+        self.capacity = n_rows
+        self.n_rows = 0
+        self.bytes = 0
+        self.buffer_bytes = buffer_bytes
+        self._buffer = bytearray()
+        self._header = False
+        self._done = False
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        self.bytes += len(data)
+        if len(self._buffer) >= self.buffer_bytes:
+            self._decode()
+        return len(data)
+
+    def _read_header(self) -> bool:
+        if len(self._buffer) < 19:
+            return False
+        if bytes(self._buffer[:11]) != _PGCOPY_SIGNATURE:
+            raise ValueError("Flux COPY binaire PostgreSQL invalide")
+        extension = int.from_bytes(self._buffer[15:19], "big")
+        if len(self._buffer) < 19 + extension:
+            return False
+        del self._buffer[:19 + extension]
+        self._header = True
+        return True
+
+    def _decode(self) -> None:
+        if not self._header and not self._read_header():
+            return
+        n = len(self._buffer) // self.row.itemsize
+        if n:
+            start = self.n_rows
+            if start + n > self.capacity:
+                raise ValueError("COPY a renvoyé plus de lignes que comptées")
+            rows = np.frombuffer(self._buffer, dtype=self.row, count=n)
+            if (rows["fields"] != len(self.columns)).any():
+                raise ValueError("Nombre de champs inattendu dans une ligne COPY binaire")
+            for i, column in enumerate(self.columns):
+                if (rows[f"length{i}"] != self.wire[column].itemsize).any():
+                    raise ValueError(f"Colonne {column}: NULL ou largeur de champ inattendue dans une ligne COPY binaire")
+                self._store(column, rows[f"value{i}"], start)
+            del rows
+            del self._buffer[:n * self.row.itemsize]
+            self.n_rows += n
+        if bytes(self._buffer) == _PGCOPY_TRAILER:
+            self._buffer.clear()
+            self._done = True
+
+    def _store(self, column: str, values: np.ndarray, start: int) -> None:
+        target = self.arrays[column][start:start + len(values)]
+        dtype = self.dtypes[column]
+        if dtype.kind == "f":
+            target[:] = values
+            return
+        null = values == np.iinfo(values.dtype).min
+        if null.any():
+            if column not in self.nulls:
+                self.nulls[column] = np.zeros(self.capacity, dtype=bool)
+            self.nulls[column][start:start + len(values)] = null
+        if dtype.kind == "M":
+            # microsecondes depuis 2000 -> datetime64 de l'unité cible
+            micros = np.where(null, 0, values) + _PG_EPOCH_US
+            target[:] = micros.astype("datetime64[us]")
+            target[null] = np.datetime64("NaT")
+        else:
+            target[:] = np.where(null, 0, values)
+
+    def frame(self) -> pd.DataFrame:
+        """Lignes décodées, en DataFrame sur les tableaux préalloués"""
+        self._decode()
+        if not self._done or self._buffer:
+            raise ValueError("Flux COPY binaire incomplet")
+        arrays = {}
+        for column, values in self.arrays.items():
+            values = values[:self.n_rows]
+            if column in self.nulls and self.dtypes[column].kind in "iub":
+                values = values.astype(np.float64)
+                values[self.nulls[column][:self.n_rows]] = np.nan
+            arrays[column] = values
+        return pd.DataFrame(arrays, copy=False)
+
+
+def copy_columns(
+    table_name: str,
+    columns: list[str],
+    dtypes: dict[str, str],
+    schema: str,
+    engine=None,
+) -> pd.DataFrame:
+    """
+    Lire seulement `columns` d'une table par COPY TO STDOUT (FORMAT binary) dans des tableaux NumPy
+    
+    Le comptage des lignes et le COPY partagent un même instantané REPEATABLE
+    READ: les tableaux sont alloués une fois à leur taille finale. Les
+    colonnes doivent avoir un dtype numérique, booléen ou date dans `dtypes`.
+    """
+    engine = engine or get_engine()
+    source = f"{schema}.{table_name}"
+    raw_conn = engine.raw_connection()
+    t0 = time.perf_counter()
+    try:
+        with raw_conn.cursor() as cursor:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cursor.execute(f"SELECT COUNT(*) FROM {source}")
+            n_rows = cursor.fetchone()[0]
+            reader = BinaryCopyReader(columns, dtypes, n_rows)
+            cursor.copy_expert(
+                f"COPY ({binary_copy_select(source, columns, dtypes)}) TO STDOUT (FORMAT binary)", reader
+            )
+        raw_conn.rollback()
+    finally:
+        raw_conn.close()
+    _stats.round_trips += 3
+    _stats.bytes_received += reader.bytes
+    _stats.rows_fetched += n_rows
+    _stats.seconds += time.perf_counter() - t0
+    return reader.frame()
+
+
+def track_db_usage(func):
+    """Journaliser le trafic avec la base d'une tâche du pipeline (décorateur)"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = _stats.snapshot()
+        t0 = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            used = _stats.since(start)
+            logger.info(
+                f"Usage base [{func.__name__}]: {used.round_trips} allers-retours, "
+                f"{used.bytes_sent / 1e6:.1f} Mo envoyés, {used.bytes_received / 1e6:.1f} Mo reçus (COPY), "
+                f"{used.rows_fetched} lignes lues, {used.seconds:.2f}s en requêtes "
+                f"sur {time.perf_counter() - t0:.2f}s"
+            )
+
+    return wrapper
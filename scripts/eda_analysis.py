@@ -4,15 +4,17 @@ Génère des rapports sur la structure, distributions et corrélations du datase
 """
 
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sqlalchemy import create_engine
-import os
 from dotenv import load_dotenv
 import logging
 from pathlib import Path
 
+from dataco_schema import RAW_DTYPES, apply_schema
+from db import get_db_connection, plan_refresh, read_sql_chunks, track_db_usage
+from eda_charts import render_charts
+from eda_profile import EdaProfile, profile_dataframe, profile_in_database
+from eda_sampling import annotate_sample, read_sample
+from eda_state import ProfileState, load_state, save_state
+
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -20,100 +22,163 @@ logger = logging.getLogger(__name__)
 # Charger les variables d'environnement
 load_dotenv()
 
-def get_db_connection():
-    """Créer une connexion à la base de données PostgreSQL"""
-    db_host = os.getenv('DB_HOST', 'localhost')
-    db_port = os.getenv('DB_PORT', '5432')
-    db_name = os.getenv('DB_NAME', 'supply_chain_dw')
-    db_user = os.getenv('DB_USER', 'postgres')
-    db_password = os.getenv('DB_PASSWORD', 'postgres')
+def write_report(profile: EdaProfile, output_dir: Path) -> None:
+    """Écrire eda_report.txt à partir du profil"""
+    with open(output_dir / "eda_report.txt", "w", encoding="utf-8") as f:
+        f.write("=== RAPPORT EDA - Supply Chain Dataset ===\n\n")
+        f.write(f"Nombre de lignes: {profile.n_rows}\n")
+        if profile.sample is not None:
+            sample = profile.sample
+            f.write(
+                f"Échantillon ({sample.method}): {sample.sample_rows} lignes sur ~{sample.population_rows} "
+                f"({sample.fraction:.2%})\n"
+            )
+        f.write(f"Nombre de colonnes: {len(profile.dtypes)}\n\n")
+        
+        f.write("=== TYPES DE DONNÉES ===\n")
+        f.write(str(profile.dtypes) + "\n\n")
+        
+        f.write("=== STATISTIQUES DESCRIPTIVES ===\n")
+        f.write(str(profile.describe) + "\n\n")
+        
+        f.write("=== VALEURS MANQUANTES ===\n")
+        f.write(str(profile.nulls) + "\n\n")
+        
+        f.write("=== VALEURS UNIQUES PAR COLONNE ===\n")
+        for col, unique_count in profile.nunique.items():
+            if profile.distinct_error is not None:
+                f.write(f"{col}: ~{unique_count} valeurs uniques (HyperLogLog, ±{profile.distinct_error:.1%})\n")
+            else:
+                f.write(f"{col}: {unique_count} valeurs uniques\n")
+        f.write("\n")
+        
+        if profile.estimates is not None:
+            f.write("=== ESTIMATIONS SUR LA POPULATION (IC 95%) ===\n")
+            for label, row in profile.estimates.iterrows():
+                f.write(f"{label}: {row['estimate']:.4f} [{row['ci_low']:.4f}, {row['ci_high']:.4f}]\n")
+            for region, row in profile.region_sales_ci.iterrows():
+                f.write(
+                    f"total(sales | {region}): {profile.region_sales[region]:.2f} "
+                    f"[{row['ci_low']:.2f}, {row['ci_high']:.2f}]\n"
+                )
+            f.write("\n")
+
+
+def update_profile_state(engine, state_path: Path, chunksize: int = 100000) -> ProfileState:
+    """
+    Mettre à jour le profil persisté avec les seules lignes chargées depuis le dernier passage
+    
+    Les lignes sont lues par curseur serveur, bloc par bloc: la mémoire ne
+    dépend que de `chunksize`, le coût que de la taille du delta.
+    """
+    state = load_state(str(state_path))
+    with engine.connect() as conn:
+        action, last_load = plan_refresh(conn, state.watermark if state else None)
+    
+    if action == 'none':
+        logger.info(f"Profil EDA à jour (load_id {last_load}), aucun nouveau chargement")
+        return state
+    
+    if action == 'full':
+        logger.info("Reconstruction complète du profil EDA...")
+        state = ProfileState()
+        query, params = "SELECT * FROM raw_data.supply_chain_raw", None
+    else:
+        logger.info(f"Fusion des lignes chargées après load_id {state.watermark} (jusqu'à {last_load})...")
+        query = """
+            SELECT r.*
+            FROM raw_data.supply_chain_raw r
+            JOIN raw_data.load_manifest m
+              ON m.order_id = r.order_id AND m.order_item_id = r.order_item_id
+            WHERE m.first_load_id > :watermark AND m.first_load_id <= :last_load
+        """
+        params = {'watermark': state.watermark, 'last_load': last_load}
     
-    connection_string = f'postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}'
-    return create_engine(connection_string)
+    n_rows = 0
+    for chunk in read_sql_chunks(query, engine, chunksize=chunksize, params=params):
+        state.update(apply_schema(chunk, RAW_DTYPES))
+        n_rows += len(chunk)
+    state.watermark = last_load
+    save_state(state, str(state_path))
+    logger.info(f"Profil EDA mis à jour: {n_rows} lignes ajoutées, {state.n_rows} au total")
+    return state
 
-def perform_eda():
+
+@track_db_usage
+def perform_eda(
+    mode: str = 'pandas',
+    approximate_distinct: bool = False,
+    distinct_error: float = 0.01,
+    chart_workers: int = None,
+    sample_fraction: float = None,
+    time_budget: float = None,
+    sample_method: str = 'bernoulli',
+):
     """
     Effectuer l'analyse exploratoire des données
     Génère des rapports et visualisations
+    
+    mode:
+    - 'pandas' (par défaut): SELECT * puis agrégats calculés en pandas
+    - 'sql': agrégats calculés dans PostgreSQL (quelques parcours de table),
+      seuls les résultats et la colonne sales sont transférés
+    - 'incremental': profil fusionnable persisté entre deux exécutions
+      (eda_profile_state.pkl), mis à jour avec les seules nouvelles lignes
+    - 'sample': rapport et graphiques calculés sur un échantillon
+      (sample_method: 'bernoulli', 'system' ou 'reservoir'), de taille
+      sample_fraction ou limitée par time_budget (secondes, TABLESAMPLE
+      seulement: le réservoir parcourt toute la table); moyennes, taux
+      de retard et totaux par région sont annotés d'intervalles de confiance
+    
+    approximate_distinct=True (mode 'pandas') estime le nombre de valeurs
+    uniques par HyperLogLog (erreur relative ~distinct_error, mémoire fixe
+    par colonne) au lieu de nunique().
+    
+    Les graphiques sont rendus en parallèle (chart_workers processus) à partir
+    des agrégats du profil; ceux dont les données n'ont pas changé sont réutilisés.
     """
     try:
         engine = get_db_connection()
         
-        # Charger les données depuis raw_data
-        logger.info("Chargement des données depuis raw_data.supply_chain_raw...")
-        query = "SELECT * FROM raw_data.supply_chain_raw"
-        df = pd.read_sql(query, engine)
-        logger.info(f"Données chargées: {len(df)} lignes, {len(df.columns)} colonnes")
-        
         # Créer le dossier de sortie
         output_dir = Path("/opt/airflow/notebooks/eda_reports")
         output_dir.mkdir(parents=True, exist_ok=True)
         
+        if mode == 'incremental':
+            profile = update_profile_state(engine, output_dir / "eda_profile_state.pkl").to_profile()
+        elif mode == 'sample':
+            with engine.connect() as conn:
+                df, sample = read_sample(
+                    conn, 'supply_chain_raw', schema='raw_data',
+                    fraction=sample_fraction, time_budget=time_budget, method=sample_method
+                )
+            df = apply_schema(df, RAW_DTYPES)
+            profile = annotate_sample(profile_dataframe(df, approximate_distinct, distinct_error), df, sample)
+        elif mode == 'sql':
+            logger.info("Profilage dans PostgreSQL de raw_data.supply_chain_raw...")
+            with engine.connect() as conn:
+                profile = profile_in_database(conn, 'supply_chain_raw', schema='raw_data')
+            logger.info(f"Profil calculé côté serveur: {profile.n_rows} lignes, {len(profile.dtypes)} colonnes")
+        else:
+            # Charger les données depuis raw_data
+            logger.info("Chargement des données depuis raw_data.supply_chain_raw...")
+            query = "SELECT * FROM raw_data.supply_chain_raw"
+            df = apply_schema(pd.read_sql(query, engine), RAW_DTYPES)
+            logger.info(
+                f"Données chargées: {len(df)} lignes, {len(df.columns)} colonnes, "
+                f"{df.memory_usage(deep=True).sum() / 1e6:.1f} Mo en mémoire"
+            )
+            profile = profile_dataframe(df, approximate_distinct, distinct_error)
+        
         # Rapport de base
-        with open(output_dir / "eda_report.txt", "w", encoding="utf-8") as f:
-            f.write("=== RAPPORT EDA - Supply Chain Dataset ===\n\n")
-            f.write(f"Nombre de lignes: {len(df)}\n")
-            f.write(f"Nombre de colonnes: {len(df.columns)}\n\n")
-            
-            f.write("=== TYPES DE DONNÉES ===\n")
-            f.write(str(df.dtypes) + "\n\n")
-            
-            f.write("=== STATISTIQUES DESCRIPTIVES ===\n")
-            f.write(str(df.describe(include='all')) + "\n\n")
-            
-            f.write("=== VALEURS MANQUANTES ===\n")
-            f.write(str(df.isnull().sum()) + "\n\n")
-            
-            f.write("=== VALEURS UNIQUES PAR COLONNE ===\n")
-            for col in df.columns:
-                unique_count = df[col].nunique()
-                f.write(f"{col}: {unique_count} valeurs uniques\n")
-            f.write("\n")
+        write_report(profile, output_dir)
         
         # Visualisations
         logger.info("Génération des visualisations...")
-        
-        # 1. Distribution des ventes
-        plt.figure(figsize=(10, 6))
-        sns.histplot(df['sales'], bins=50, kde=True)
-        plt.title('Distribution des Ventes')
-        plt.xlabel('Ventes')
-        plt.ylabel('Fréquence')
-        plt.savefig(output_dir / "sales_distribution.png")
-        plt.close()
-        
-        # 2. Taux de livraison en retard
-        plt.figure(figsize=(8, 6))
-        df['late_delivery_risk'].value_counts().plot(kind='pie', autopct='%1.1f%%')
-        plt.title('Taux de Risque de Livraison en Retard')
-        plt.ylabel('')
-        plt.savefig(output_dir / "late_delivery_risk.png")
-        plt.close()
-        
-        # 3. Ventes par région
-        plt.figure(figsize=(12, 6))
-        region_sales = df.groupby('order_region')['sales'].sum().sort_values(ascending=False)
-        region_sales.plot(kind='bar')
-        plt.title('Ventes Totales par Région')
-        plt.xlabel('Région')
-        plt.ylabel('Ventes Totales')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig(output_dir / "sales_by_region.png")
-        plt.close()
-        
-        # 4. Corrélation entre variables numériques
-        numeric_cols = ['sales', 'order_item_total', 'order_profit_per_order', 
-                       'days_for_shipping_real', 'days_for_shipment_scheduled']
-        numeric_df = df[numeric_cols].select_dtypes(include=[np.number])
-        
-        plt.figure(figsize=(10, 8))
-        correlation_matrix = numeric_df.corr()
-        sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', center=0)
-        plt.title('Matrice de Corrélation')
-        plt.tight_layout()
-        plt.savefig(output_dir / "correlation_matrix.png")
-        plt.close()
+        timings = render_charts(profile, output_dir, workers=chart_workers)
+        rendered = sum(t['seconds'] for t in timings.values())
+        skipped = sum(t['cached'] for t in timings.values())
+        logger.info(f"Visualisations: {rendered:.2f}s de rendu, {skipped}/{len(timings)} inchangées")
         
         logger.info(f"EDA terminée. Rapports sauvegardés dans {output_dir}")
         
@@ -125,5 +190,21 @@ def perform_eda():
 
 if __name__ == "__main__":
     # Exécution en standalone
-    result = perform_eda()
-    print(result)
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Analyse exploratoire de raw_data.supply_chain_raw")
+    parser.add_argument('--mode', choices=['pandas', 'sql', 'incremental', 'sample'], default='pandas')
+    parser.add_argument('--approximate-distinct', action='store_true')
+    parser.add_argument('--sample-fraction', type=float, default=None)
+    parser.add_argument('--time-budget', type=float, default=None, help="secondes (mode sample)")
+    parser.add_argument('--sample-method', choices=['bernoulli', 'system', 'reservoir'], default='bernoulli')
+    args = parser.parse_args()
+    
+    result = perform_eda(
+        mode=args.mode,
+        approximate_distinct=args.approximate_distinct,
+        sample_fraction=args.sample_fraction,
+        time_budget=args.time_budget,
+        sample_method=args.sample_method
+    )
+    print(result)
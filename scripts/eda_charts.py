@@ -0,0 +1,177 @@
+"""
+Rendu des graphiques de l'EDA
+
+Chaque graphique est tracé à partir d'une petite entrée pré-agrégée tirée
+d'un EdaProfile (histogramme des ventes par classes, comptes de retards,
+sommes par région, matrice de corrélation), jamais des lignes brutes. Les
+graphiques sont rendus en parallèle dans un pool de processus avec le
+backend Agg (sans affichage). Un graphique dont le hash d'entrée est celui
+enregistré dans l'index de cache du dossier de sortie, et dont le PNG
+existe encore, n'est pas redessiné. render_charts retourne, et journalise,
+la durée de chaque graphique.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import seaborn as sns  # noqa: E402
+
+from eda_profile import EdaProfile  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+CACHE_INDEX = ".chart_cache.json"
+# À incrémenter pour invalider tous les graphiques en cache quand le code de tracé change
+CHART_VERSION = 1
+
+
+def _sales_distribution(data: dict, path: Path) -> None:
+    plt.figure(figsize=(10, 6))
+    sns.histplot(x=data["centers"], weights=data["counts"], bins=50, kde=True)
+    plt.title('Distribution des Ventes')
+    plt.xlabel('Ventes')
+    plt.ylabel('Fréquence')
+    plt.savefig(path)
+    plt.close()
+
+
+def _late_delivery_risk(data: dict, path: Path) -> None:
+    plt.figure(figsize=(8, 6))
+    data["counts"].plot(kind='pie', autopct='%1.1f%%')
+    plt.title('Taux de Risque de Livraison en Retard')
+    plt.ylabel('')
+    plt.savefig(path)
+    plt.close()
+
+
+def _sales_by_region(data: dict, path: Path) -> None:
+    plt.figure(figsize=(12, 6))
+    data["sales"].plot(kind='bar', yerr=data.get("errors"), capsize=3)
+    plt.title('Ventes Totales par Région')
+    plt.xlabel('Région')
+    plt.ylabel('Ventes Totales')
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+def _correlation_matrix(data: dict, path: Path) -> None:
+    plt.figure(figsize=(10, 8))
+    sns.heatmap(data["correlation"], annot=True, cmap='coolwarm', center=0)
+    plt.title('Matrice de Corrélation')
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+# nom de fichier -> fonction de tracé
+CHARTS = {
+    "sales_distribution.png": _sales_distribution,
+    "late_delivery_risk.png": _late_delivery_risk,
+    "sales_by_region.png": _sales_by_region,
+    "correlation_matrix.png": _correlation_matrix,
+}
+
+
+def _region_errors(profile: EdaProfile):
+    """Barres d'erreur asymétriques (2 x n) des totaux par région échantillonnés, None s'ils sont exacts"""
+    if profile.region_sales_ci is None:
+        return None
+    ci = profile.region_sales_ci.reindex(profile.region_sales.index)
+    return np.vstack([profile.region_sales - ci["ci_low"], ci["ci_high"] - profile.region_sales])
+
+
+def chart_inputs(profile: EdaProfile) -> dict[str, dict]:
+    """Entrée pré-agrégée de chaque graphique"""
+    centers, counts = profile.sales_histogram
+    return {
+        "sales_distribution.png": {"centers": centers, "counts": counts},
+        "late_delivery_risk.png": {"counts": profile.late_delivery_counts},
+        "sales_by_region.png": {"sales": profile.region_sales, "errors": _region_errors(profile)},
+        "correlation_matrix.png": {"correlation": profile.correlation},
+    }
+
+
+def _normalize(value):
+    """Forme Python simple / octets d'une entrée de graphique, pour le hash"""
+    if isinstance(value, pd.DataFrame):
+        return value.to_numpy().tolist(), value.index.tolist(), value.columns.tolist()
+    if isinstance(value, pd.Series):
+        return value.tolist(), value.index.tolist(), value.name
+    if isinstance(value, np.ndarray):
+        return str(value.dtype), value.shape, value.tobytes()
+    return value
+
+
+def input_hash(name: str, data: dict) -> str:
+    """Hash stable du nom, de l'entrée et de CHART_VERSION d'un graphique"""
+    normalized = [(key, _normalize(data[key])) for key in sorted(data)]
+    return hashlib.sha256(pickle.dumps((name, CHART_VERSION, normalized))).hexdigest()
+
+
+def _render(name: str, data: dict, path: str) -> float:
+    start = time.perf_counter()
+    CHARTS[name](data, Path(path))
+    return time.perf_counter() - start
+
+
+def render_charts(
+    profile: EdaProfile,
+    output_dir: Path,
+    workers: int | None = None,
+    use_cache: bool = True,
+) -> dict[str, dict]:
+    """
+    Rendre les graphiques de `profile` dans output_dir
+    
+    Retourne {nom de fichier: {"seconds": durée du rendu, "cached": non redessiné}}.
+    workers=1 rend dans le processus appelant.
+    """
+    output_dir = Path(output_dir)
+    index_path = output_dir / CACHE_INDEX
+    cache = json.loads(index_path.read_text()) if use_cache and index_path.exists() else {}
+
+    inputs = chart_inputs(profile)
+    hashes = {name: input_hash(name, data) for name, data in inputs.items()}
+    todo = [
+        name for name in inputs
+        if not (use_cache and cache.get(name) == hashes[name] and (output_dir / name).exists())
+    ]
+    timings = {name: {"seconds": 0.0, "cached": True} for name in inputs if name not in todo}
+
+    workers = min(workers or os.cpu_count() or 1, len(todo)) if todo else 0
+    if workers == 1:
+        seconds = {name: _render(name, inputs[name], str(output_dir / name)) for name in todo}
+    elif workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {name: executor.submit(_render, name, inputs[name], str(output_dir / name)) for name in todo}
+            seconds = {name: future.result() for name, future in futures.items()}
+    else:
+        seconds = {}
+
+    for name, elapsed in seconds.items():
+        timings[name] = {"seconds": elapsed, "cached": False}
+        cache[name] = hashes[name]
+    if use_cache:
+        index_path.write_text(json.dumps(cache, indent=2, sort_keys=True))
+
+    for name in inputs:
+        t = timings[name]
+        logger.info("Graphique %s: %s", name, "en cache, non redessiné" if t["cached"] else f"{t['seconds']:.2f}s")
+    return {name: timings[name] for name in inputs}
@@ -0,0 +1,269 @@
+"""
+Profil des données derrière le rapport EDA (eda_analysis.py)
+
+Un EdaProfile contient tout ce dont le rapport et les graphiques ont
+besoin: nombre de lignes, types, tableau describe(), comptes de valeurs
+manquantes et distinctes, ventes par région, répartition des retards,
+matrice de corrélation et histogramme des ventes par classes. Il est
+calculé en pandas sur un DataFrame chargé (profile_dataframe) ou dans
+PostgreSQL (profile_in_database), où les agrégats tiennent en quelques
+parcours de table et seuls leurs petits résultats sont transférés.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from dataco_schema import DATETIME, RAW_DTYPES
+from sketches import HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+# Colonnes numériques de la carte de corrélation
+EDA_NUMERIC_COLUMNS = [
+    "sales",
+    "order_item_total",
+    "order_profit_per_order",
+    "days_for_shipping_real",
+    "days_for_shipment_scheduled",
+]
+# Ordre des lignes de describe(include="all"); pandas place "std" en dernier
+# en présence d'une colonne de dates
+DESCRIBE_INDEX = ["count", "unique", "top", "freq", "mean", "std", "min", "25%", "50%", "75%", "max"]
+QUANTILES = [0.25, 0.5, 0.75]
+# Largeur des classes de l'histogramme des ventes (le graphique les regroupe,
+# et s'en sert de points pondérés pour sa KDE)
+SALES_BIN_WIDTH = 1.0
+
+
+@dataclass
+class EdaProfile:
+    n_rows: int
+    dtypes: pd.Series
+    describe: pd.DataFrame
+    nulls: pd.Series
+    nunique: pd.Series
+    region_sales: pd.Series
+    late_delivery_counts: pd.Series
+    correlation: pd.DataFrame
+    # (centres des classes, effectifs) des ventes, voir SALES_BIN_WIDTH
+    sales_histogram: tuple[np.ndarray, np.ndarray]
+    # erreur relative de nunique estimé par HyperLogLog, None s'il est exact
+    distinct_error: float | None = None
+    # Exécutions sur échantillon (eda_sampling.annotate_sample): description de
+    # l'échantillon, estimations avec intervalles à 95 % et intervalles des totaux par région
+    sample: "SampleInfo | None" = None
+    estimates: pd.DataFrame | None = None
+    region_sales_ci: pd.DataFrame | None = None
+
+
+def sales_bin_counts(sales: pd.Series) -> pd.Series:
+    """Nombre de lignes par classe de largeur SALES_BIN_WIDTH, indexé par numéro de classe"""
+    bins = np.floor(sales.dropna().to_numpy(dtype=np.float64) / SALES_BIN_WIDTH).astype(np.int64)
+    return pd.Series(bins).value_counts().sort_index()
+
+
+def bins_to_histogram(bin_counts: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """(centres des classes, effectifs) à partir de sales_bin_counts()"""
+    bin_counts = bin_counts.sort_index()
+    centers = (bin_counts.index.to_numpy(dtype=np.float64) + 0.5) * SALES_BIN_WIDTH
+    return centers, bin_counts.to_numpy(dtype=np.float64)
+
+
+def profile_dataframe(df: pd.DataFrame, approximate_distinct: bool = False, distinct_error: float = 0.01) -> EdaProfile:
+    """Profiler un DataFrame chargé, en pandas"""
+    if approximate_distinct:
+        counts = {}
+        for col in df.columns:
+            sketch = HyperLogLog.for_error(distinct_error)
+            sketch.add(df[col])
+            counts[col] = sketch.count()
+        nunique = pd.Series(counts)
+        distinct_error = HyperLogLog.for_error(distinct_error).relative_error
+    else:
+        nunique = df.nunique()
+        distinct_error = None
+
+    numeric_df = df[EDA_NUMERIC_COLUMNS].select_dtypes(include=[np.number])
+    return EdaProfile(
+        n_rows=len(df),
+        dtypes=df.dtypes,
+        describe=df.describe(include="all"),
+        nulls=df.isnull().sum(),
+        nunique=nunique,
+        region_sales=df.groupby("order_region", observed=True)["sales"].sum().sort_values(ascending=False),
+        late_delivery_counts=df["late_delivery_risk"].value_counts(),
+        correlation=numeric_df.corr(),
+        sales_histogram=bins_to_histogram(sales_bin_counts(df["sales"])),
+        distinct_error=distinct_error,
+    )
+
+
+def _column_kind(name: str, data_type: str) -> str:
+    """'numeric', 'datetime' ou 'text', d'après le type déclaré, sinon le type SQL"""
+    declared = RAW_DTYPES.get(name)
+    if declared == DATETIME:
+        return "datetime"
+    if declared is not None:
+        return "text" if declared == "category" else "numeric"
+    if data_type in ("smallint", "integer", "bigint", "real", "double precision", "numeric"):
+        return "numeric"
+    if data_type.startswith(("timestamp", "date")):
+        return "datetime"
+    return "text"
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def profile_sql(columns: dict[str, str], table: str) -> str:
+    """
+    SELECT d'agrégats calculant les statistiques par colonne et les corrélations en un parcours
+    
+    `columns` associe les noms de colonnes à leur nature (voir _column_kind).
+    Les dates sont agrégées en secondes depuis l'epoch. Les alias sont
+    "c<i>__<stat>" pour la i-ème colonne, et "corr_<a>_<b>" pour les paires
+    de EDA_NUMERIC_COLUMNS.
+    """
+    select = ["COUNT(*) AS n_rows"]
+    for i, (name, kind) in enumerate(columns.items()):
+        col = _quote(name)
+        select += [f"COUNT({col}) AS c{i}__count", f"COUNT(DISTINCT {col}) AS c{i}__unique"]
+        if kind == "numeric":
+            value = f"{col}::float8"
+        elif kind == "datetime":
+            value = f"EXTRACT(EPOCH FROM CAST({col} AS timestamp))::float8"
+        else:
+            select.append(f"(mode() WITHIN GROUP (ORDER BY {col}))::text AS c{i}__top")
+            continue
+        select += [
+            f"AVG({value}) AS c{i}__mean",
+            f"MIN({value}) AS c{i}__min",
+            f"MAX({value}) AS c{i}__max",
+            f"percentile_cont(ARRAY{QUANTILES}) WITHIN GROUP (ORDER BY {value}) AS c{i}__quantiles",
+        ]
+        if kind == "numeric":
+            select.append(f"STDDEV_SAMP({value}) AS c{i}__std")
+
+    numeric = [c for c in EDA_NUMERIC_COLUMNS if columns.get(c) == "numeric"]
+    for a in range(len(numeric)):
+        for b in range(a + 1, len(numeric)):
+            select.append(f"CORR({_quote(numeric[a])}, {_quote(numeric[b])}) AS corr_{a}_{b}")
+    return "SELECT\n    " + ",\n    ".join(select) + f"\nFROM {table}"
+
+
+def _describe_from_row(row, columns: dict[str, str], freqs: dict[str, int]) -> pd.DataFrame:
+    """Reconstruire describe(include='all') à partir de la ligne d'agrégats"""
+    table = {}
+    for i, (name, kind) in enumerate(columns.items()):
+        stats = {"count": float(row[f"c{i}__count"])}
+        if kind == "text":
+            stats.update(unique=row[f"c{i}__unique"], top=row[f"c{i}__top"], freq=freqs.get(name))
+        elif row[f"c{i}__count"]:
+            quantiles = row[f"c{i}__quantiles"]
+            values = {
+                "mean": row[f"c{i}__mean"],
+                "min": row[f"c{i}__min"],
+                **{f"{q:.0%}": v for q, v in zip(QUANTILES, quantiles)},
+                "max": row[f"c{i}__max"],
+            }
+            if kind == "datetime":
+                values = {k: pd.Timestamp(v, unit="s") for k, v in values.items()}
+            else:
+                values["std"] = row[f"c{i}__std"]
+            stats.update(values)
+        table[name] = stats
+    index = DESCRIBE_INDEX
+    if "datetime" in columns.values():
+        index = [i for i in DESCRIBE_INDEX if i != "std"] + ["std"]
+    return pd.DataFrame(table).reindex(index).dropna(how="all")
+
+
+def profile_in_database(conn, table_name: str = "supply_chain_raw", schema: str = "raw_data") -> EdaProfile:
+    """
+    Profiler une table par agrégats SQL au lieu de la charger
+    
+    Trois parcours: les statistiques par colonne (et les corrélations), la
+    fréquence de la valeur la plus courante de chaque colonne texte, et les
+    comptes par région / risque de retard (GROUPING SETS); l'histogramme des
+    ventes est un GROUP BY de plus sur les numéros de classe. Aucune colonne
+    n'est transférée ligne par ligne.
+    """
+    from sqlalchemy import text
+
+    table = f"{schema}.{table_name}"
+    catalog = conn.execute(
+        text(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = :schema AND table_name = :table ORDER BY ordinal_position"
+        ),
+        {"schema": schema, "table": table_name},
+    ).fetchall()
+    columns = {name: _column_kind(name, data_type) for name, data_type in catalog}
+
+    row = conn.execute(text(profile_sql(columns, table))).mappings().one()
+
+    tops = {name: row[f"c{i}__top"] for i, (name, kind) in enumerate(columns.items()) if kind == "text"}
+    tops = {name: top for name, top in tops.items() if top is not None}
+    freqs = {}
+    if tops:
+        names = list(tops)
+        freq_sql = "SELECT " + ", ".join(
+            f"COUNT(*) FILTER (WHERE {_quote(n)}::text = :top{j}) AS f{j}" for j, n in enumerate(names)
+        ) + f" FROM {table}"
+        freq_row = conn.execute(text(freq_sql), {f"top{j}": tops[n] for j, n in enumerate(names)}).one()
+        freqs = dict(zip(names, freq_row))
+
+    groups = pd.DataFrame(
+        conn.execute(text(f"""
+            SELECT order_region, late_delivery_risk, GROUPING(order_region) AS by_risk,
+                   SUM(sales) AS sales, COUNT(*) AS n
+            FROM {table}
+            GROUP BY GROUPING SETS ((order_region), (late_delivery_risk))
+        """)).fetchall(),
+        columns=["order_region", "late_delivery_risk", "by_risk", "sales", "n"],
+    )
+    # groupes NULL écartés, comme le font groupby() et value_counts()
+    by_region = groups[groups["by_risk"] == 0].dropna(subset=["order_region"])
+    by_risk = groups[groups["by_risk"] == 1].dropna(subset=["late_delivery_risk"])
+    region_sales = (
+        by_region.set_index("order_region")["sales"].astype(float).rename("sales").sort_values(ascending=False)
+    )
+    late_delivery_counts = (
+        by_risk.set_index("late_delivery_risk")["n"].astype(int).rename("count").sort_values(ascending=False)
+    )
+
+    numeric = [c for c in EDA_NUMERIC_COLUMNS if columns.get(c) == "numeric"]
+    correlation = pd.DataFrame(np.eye(len(numeric)), index=numeric, columns=numeric)
+    for a in range(len(numeric)):
+        for b in range(a + 1, len(numeric)):
+            correlation.iloc[a, b] = correlation.iloc[b, a] = row[f"corr_{a}_{b}"]
+
+    sales_bins = conn.execute(
+        text(f"""
+            SELECT FLOOR(sales / :width)::bigint AS bin, COUNT(*) AS n
+            FROM {table}
+            WHERE sales IS NOT NULL
+            GROUP BY 1
+        """),
+        {"width": SALES_BIN_WIDTH},
+    ).fetchall()
+    sales_histogram = bins_to_histogram(pd.Series(dict(sales_bins), dtype=np.int64))
+
+    counts = pd.Series({name: row[f"c{i}__count"] for i, name in enumerate(columns)})
+    return EdaProfile(
+        n_rows=row["n_rows"],
+        dtypes=pd.Series({name: RAW_DTYPES.get(name, "object") for name in columns}, dtype=object),
+        describe=_describe_from_row(row, columns, freqs),
+        nulls=row["n_rows"] - counts,
+        nunique=pd.Series({name: row[f"c{i}__unique"] for i, name in enumerate(columns)}),
+        region_sales=region_sales,
+        late_delivery_counts=late_delivery_counts,
+        correlation=correlation,
+        sales_histogram=sales_histogram,
+    )
@@ -0,0 +1,232 @@
+"""
+EDA sur échantillon: lire un échantillon aléatoire d'une table et estimer
+les statistiques de la population avec des intervalles de confiance
+
+Méthodes d'échantillonnage:
+- "bernoulli": TABLESAMPLE BERNOULLI, chaque ligne gardée avec probabilité p
+- "system": TABLESAMPLE SYSTEM, pages entières gardées avec probabilité p
+  (bien plus rapide, mais les lignes d'une page sont corrélées: les
+  intervalles sont optimistes quand la table est physiquement ordonnée)
+- "reservoir": échantillon uniforme de taille fixe, tenu pendant la lecture
+  en flux de toute la table par un curseur serveur (mémoire bornée par la
+  taille de l'échantillon)
+
+La taille de l'échantillon est donnée par une fraction ou, pour les
+méthodes TABLESAMPLE, par un budget de temps, converti en fraction en
+chronométrant un petit échantillon pilote. Un réservoir n'est uniforme
+qu'une fois toute la table lue, ce qu'un budget de temps ne peut pas
+borner: il n'accepte qu'une fraction.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from eda_profile import EDA_NUMERIC_COLUMNS, EdaProfile
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_METHODS = ("bernoulli", "system", "reservoir")
+# quantile normal bilatéral à 95 %
+Z_95 = 1.959963984540054
+PILOT_FRACTION = 0.001
+
+
+@dataclass
+class SampleInfo:
+    method: str
+    fraction: float
+    sample_rows: int
+    # lignes de la table (estimées par pg_class pour TABLESAMPLE)
+    population_rows: int
+    seconds: float = 0.0
+
+
+class ReservoirSampler:
+    """Échantillon uniforme de taille fixe sur un flux de DataFrames (algorithme R, vectorisé)"""
+
+    def __init__(self, size: int, seed: int | None = None) -> None:
+        self.size = size
+        self.seen = 0
+        self.sample: pd.DataFrame | None = None
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        chunk = chunk.reset_index(drop=True)
+        if self.sample is None:
+            self.sample = chunk.iloc[:0].copy()
+
+        # remplir d'abord le réservoir
+        free = self.size - len(self.sample)
+        if free > 0:
+            self.sample = pd.concat([self.sample, chunk.iloc[:free]], ignore_index=True)
+            self.seen += min(free, len(chunk))
+            chunk = chunk.iloc[free:].reset_index(drop=True)
+        if chunk.empty:
+            return
+
+        # la ligne t (position dans le flux, à partir de 1) remplace la case j ~ U[0, t) si j < size;
+        # entre lignes tirant la même case, la dernière l'emporte, comme dans l'algorithme séquentiel.
+        # Les cases sont échangeables: les lignes remplacées sont retirées et les nouvelles ajoutées.
+        positions = self.seen + 1 + np.arange(len(chunk))
+        slots = (self._rng.random(len(chunk)) * positions).astype(np.int64)
+        accepted = pd.Series(slots[slots < self.size], index=np.flatnonzero(slots < self.size))
+        accepted = accepted[~accepted.duplicated(keep="last")]
+        self.sample = pd.concat(
+            [self.sample.drop(index=accepted.to_numpy()), chunk.iloc[accepted.index.to_numpy()]],
+            ignore_index=True,
+        )
+        self.seen += len(chunk)
+
+
+def tablesample_query(table: str, fraction: float, method: str = "bernoulli", seed: int | None = None) -> str:
+    """SELECT * avec une clause TABLESAMPLE (fraction dans ]0, 1])"""
+    clause = f"TABLESAMPLE {method.upper()} ({100.0 * fraction:.6f})"
+    if seed is not None:
+        clause += f" REPEATABLE ({int(seed)})"
+    return f"SELECT * FROM {table} {clause}"
+
+
+def estimated_row_count(conn, table: str) -> int:
+    """Nombre de lignes d'après les statistiques du planificateur, ou COUNT(*) si la table n'a jamais été analysée"""
+    from sqlalchemy import text
+
+    estimate = conn.execute(text("SELECT reltuples FROM pg_class WHERE oid = CAST(:t AS regclass)"), {"t": table}).scalar()
+    if estimate is None or estimate <= 0:
+        estimate = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+    return int(estimate)
+
+
+def fraction_for_budget(conn, table: str, seconds: float, method: str = "bernoulli") -> float:
+    """Fraction d'échantillon lisible en `seconds`, d'après un échantillon pilote chronométré"""
+    from sqlalchemy import text
+
+    start = time.perf_counter()
+    pilot = pd.read_sql(text(tablesample_query(table, PILOT_FRACTION, method)), conn)
+    elapsed = max(time.perf_counter() - start, 1e-3)
+    # le coût de lecture croît avec la fraction; le coût fixe du pilote rend l'estimation prudente
+    fraction = PILOT_FRACTION * seconds / elapsed
+    logger.info("Échantillon pilote: %d lignes en %.2fs -> fraction %.4f pour %.0fs", len(pilot), elapsed, fraction, seconds)
+    return float(min(max(fraction, PILOT_FRACTION), 1.0))
+
+
+def read_sample(
+    conn,
+    table_name: str = "supply_chain_raw",
+    schema: str = "raw_data",
+    fraction: float | None = None,
+    time_budget: float | None = None,
+    method: str = "bernoulli",
+    seed: int | None = None,
+    chunksize: int = 50000,
+) -> tuple[pd.DataFrame, SampleInfo]:
+    """Lire un échantillon de `schema.table_name` de taille `fraction` ou `time_budget` (secondes)"""
+    from sqlalchemy import text
+
+    if method not in SAMPLE_METHODS:
+        raise ValueError(f"Méthode d'échantillonnage inconnue: {method}")
+    if (fraction is None) == (time_budget is None):
+        raise ValueError("Donner exactement un de fraction ou time_budget")
+    if method == "reservoir" and fraction is None:
+        # arrêter le parcours plus tôt laisserait un début de table, pas un échantillon uniforme
+        raise ValueError("La méthode reservoir demande une fraction: un budget de temps ne peut pas borner son parcours complet")
+
+    table = f"{schema}.{table_name}"
+    start = time.perf_counter()
+
+    if method == "reservoir":
+        population = estimated_row_count(conn, table)
+        size = max(1, int(round(fraction * population)))
+        sampler = ReservoirSampler(size, seed)
+        streaming = conn.execution_options(stream_results=True, max_row_buffer=chunksize)
+        for chunk in pd.read_sql(text(f"SELECT * FROM {table}"), streaming, chunksize=chunksize):
+            sampler.update(chunk)
+        df = sampler.sample if sampler.sample is not None else pd.DataFrame()
+        seen = sampler.seen
+        info = SampleInfo(method, len(df) / seen if seen else 0.0, len(df), max(population, seen))
+    else:
+        if fraction is None:
+            fraction = fraction_for_budget(conn, table, time_budget, method)
+        df = pd.read_sql(text(tablesample_query(table, fraction, method, seed)), conn)
+        info = SampleInfo(method, fraction, len(df), estimated_row_count(conn, table))
+
+    info.seconds = time.perf_counter() - start
+    logger.info(
+        "Échantillon (%s): %d lignes sur ~%d (%.2f %%) en %.2fs",
+        info.method, info.sample_rows, info.population_rows, 100 * info.fraction, info.seconds,
+    )
+    return df, info
+
+
+def mean_ci(values: pd.Series, population: int | None = None, z: float = Z_95) -> tuple[float, float, float]:
+    """(moyenne, borne basse, borne haute): intervalle normal avec correction de population finie"""
+    values = values.dropna().astype(np.float64)
+    n = len(values)
+    if n < 2:
+        mean = float(values.mean()) if n else np.nan
+        return mean, np.nan, np.nan
+    mean = float(values.mean())
+    se = float(values.std(ddof=1)) / np.sqrt(n)
+    if population:
+        se *= np.sqrt(max(1 - n / population, 0.0))
+    return mean, mean - z * se, mean + z * se
+
+
+def proportion_ci(successes: int, n: int, z: float = Z_95) -> tuple[float, float, float]:
+    """(taux, borne basse, borne haute): intervalle de score de Wilson"""
+    if n == 0:
+        return np.nan, np.nan, np.nan
+    p = successes / n
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    half = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return p, center - half, center + half
+
+
+def group_total_ci(df: pd.DataFrame, group: str, value: str, population: int, z: float = Z_95) -> pd.DataFrame:
+    """
+    Totaux de `value` par `group` sur la population, à partir d'un échantillon uniforme
+    
+    Chaque total vaut N * moyenne(y) avec y = value sur les lignes du groupe
+    et 0 ailleurs: les groupes absents de l'échantillon n'apparaissent pas.
+    """
+    n = len(df)
+    values = df[value].fillna(0).to_numpy(dtype=np.float64)
+    fpc = np.sqrt(max(1 - n / population, 0.0)) if population else 1.0
+    rows = {}
+    for key, index in df.groupby(group, observed=True).indices.items():
+        y = np.zeros(n)
+        y[index] = values[index]
+        total = population * y.mean()
+        half = z * population * y.std(ddof=1) / np.sqrt(n) * fpc if n > 1 else np.nan
+        rows[key] = {"estimate": total, "ci_low": total - half, "ci_high": total + half}
+    return pd.DataFrame.from_dict(rows, orient="index").sort_values("estimate", ascending=False)
+
+
+def annotate_sample(profile: EdaProfile, df: pd.DataFrame, info: SampleInfo) -> EdaProfile:
+    """
+    Transformer un profil calculé sur un échantillon en estimations sur la population
+    
+    Ajoute des intervalles à 95 % pour les moyennes de EDA_NUMERIC_COLUMNS
+    et le taux de retard, et remplace les ventes par région par les totaux
+    estimés sur la population (avec leurs intervalles, tracés en barres d'erreur).
+    """
+    population = info.population_rows
+    estimates = {}
+    for col in EDA_NUMERIC_COLUMNS:
+        if col in df.columns:
+            estimates[f"mean({col})"] = mean_ci(df[col], population)
+    late = df["late_delivery_risk"].dropna()
+    estimates["rate(late_delivery_risk)"] = proportion_ci(int((late == 1).sum()), len(late))
+
+    totals = group_total_ci(df, "order_region", "sales", population)
+    profile.region_sales = totals["estimate"].rename_axis("order_region").rename("sales")
+    profile.region_sales_ci = totals[["ci_low", "ci_high"]].rename_axis("order_region")
+    profile.estimates = pd.DataFrame.from_dict(estimates, orient="index", columns=["estimate", "ci_low", "ci_high"])
+    profile.sample = info
+    return profile
@@ -0,0 +1,271 @@
+"""
+Statistiques incrémentales et fusionnables derrière le rapport EDA
+
+Un ProfileState garde, par colonne de raw_data.supply_chain_raw:
+- effectif, nombre de valeurs manquantes, moyenne et somme des carrés des
+  écarts, min/max (numériques et dates)
+- un sketch de quantiles (quartiles de describe())
+- un sketch HyperLogLog (nombre de valeurs distinctes)
+- des compteurs de valeurs fréquentes pour les colonnes texte (top/freq de describe())
+ainsi que la matrice des co-moments de EDA_NUMERIC_COLUMNS (carte de
+corrélation), les ventes par région, les comptes de retards et un
+histogramme fin des ventes.
+
+Chaque statistique se fusionne exactement (ou, pour les sketches, dans
+leurs bornes d'erreur): une exécution ne lit que les lignes chargées depuis
+la précédente. update(chunk) intègre de nouvelles lignes, to_profile()
+produit un EdaProfile. L'état est sérialisé (pickle) entre deux exécutions
+avec le watermark de raw_data.load_runs (load_id) qu'il couvre.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import pickle
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from dataco_schema import DATETIME, RAW_DTYPES
+from eda_profile import (
+    DESCRIBE_INDEX,
+    EDA_NUMERIC_COLUMNS,
+    QUANTILES,
+    EdaProfile,
+    bins_to_histogram,
+    sales_bin_counts,
+)
+from sketches import FrequentItems, HyperLogLog, QuantileSketch
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 2
+DISTINCT_ERROR = 0.01
+
+
+@dataclass
+class ColumnState:
+    kind: str  # "numeric", "datetime" ou "text"
+    count: int = 0
+    nulls: int = 0
+    # moyenne et somme des carrés des écarts des valeurs non nulles (fusion de Chan et al., comme CoMoments)
+    mean: float = 0.0
+    m2: float = 0.0
+    minimum: float = np.inf
+    maximum: float = -np.inf
+    quantiles: QuantileSketch | None = None
+    distinct: HyperLogLog = field(default_factory=lambda: HyperLogLog.for_error(DISTINCT_ERROR))
+    frequent: FrequentItems | None = None
+
+    def __post_init__(self) -> None:
+        if self.kind == "text":
+            self.frequent = self.frequent or FrequentItems()
+        else:
+            self.quantiles = self.quantiles or QuantileSketch()
+
+    @staticmethod
+    def _values(s: pd.Series, kind: str) -> np.ndarray:
+        """Valeurs non nulles en float64 (dates en secondes depuis l'epoch)"""
+        s = s.dropna()
+        if kind == "datetime":
+            return s.to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+        return s.to_numpy(dtype=np.float64)
+
+    def update(self, s: pd.Series) -> None:
+        nulls = int(s.isna().sum())
+        self.nulls += nulls
+        self.count += len(s) - nulls
+        self.distinct.add(s)
+        if self.kind == "text":
+            self.frequent.add(s)
+            return
+        values = self._values(s, self.kind)
+        if len(values):
+            mean = float(values.mean())
+            centered = values - mean
+            self._merge_moments(self.count - len(values), len(values), mean, float(np.dot(centered, centered)))
+            self.minimum = min(self.minimum, float(values.min()))
+            self.maximum = max(self.maximum, float(values.max()))
+            self.quantiles.add(values)
+
+    def _merge_moments(self, n: int, other_n: int, other_mean: float, other_m2: float) -> None:
+        """Intégrer (effectif, moyenne, M2) d'autres valeurs à la moyenne / M2 des `n` valeurs déjà vues"""
+        if not other_n:
+            return
+        total = n + other_n
+        delta = other_mean - self.mean
+        self.m2 += other_m2 + delta * delta * n * other_n / total
+        self.mean += delta * other_n / total
+
+    def merge(self, other: "ColumnState") -> "ColumnState":
+        if self.kind != "text":
+            self._merge_moments(self.count, other.count, other.mean, other.m2)
+        self.count += other.count
+        self.nulls += other.nulls
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.distinct.merge(other.distinct)
+        if self.kind == "text":
+            self.frequent.merge(other.frequent)
+        else:
+            self.quantiles.merge(other.quantiles)
+        return self
+
+    def describe(self) -> dict:
+        if self.kind == "text":
+            stats = {"count": self.count}
+            top, freq = self.frequent.top()
+            stats.update(unique=self.distinct.count(), top=top, freq=freq)
+            return stats
+        stats = {"count": float(self.count)}
+        if not self.count:
+            return stats
+        values = {
+            "mean": self.mean,
+            "min": self.minimum,
+            **{f"{q:.0%}": v for q, v in zip(QUANTILES, self.quantiles.quantiles(QUANTILES))},
+            "max": self.maximum,
+        }
+        if self.kind == "datetime":
+            return {**stats, **{k: pd.Timestamp(v, unit="s") for k, v in values.items()}}
+        if self.count > 1:
+            values["std"] = np.sqrt(self.m2 / (self.count - 1))
+        return {**stats, **values}
+
+
+@dataclass
+class CoMoments:
+    """Effectif, moyennes et matrice des co-moments des lignes complètes (fusion de Chan et al.)"""
+
+    columns: list[str]
+    n: int = 0
+    mean: np.ndarray | None = None
+    comoment: np.ndarray | None = None
+
+    def __post_init__(self) -> None:
+        k = len(self.columns)
+        self.mean = np.zeros(k) if self.mean is None else self.mean
+        self.comoment = np.zeros((k, k)) if self.comoment is None else self.comoment
+
+    def update(self, df: pd.DataFrame) -> None:
+        values = df[self.columns].dropna().to_numpy(dtype=np.float64)
+        if not len(values):
+            return
+        mean = values.mean(axis=0)
+        centered = values - mean
+        self.merge(CoMoments(self.columns, len(values), mean, centered.T @ centered))
+
+    def merge(self, other: "CoMoments") -> "CoMoments":
+        if not other.n:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.comoment = self.comoment + other.comoment + np.outer(delta, delta) * self.n * other.n / n
+        self.mean = self.mean + delta * other.n / n
+        self.n = n
+        return self
+
+    def correlation(self) -> pd.DataFrame:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(np.diag(self.comoment))
+            corr = self.comoment / np.outer(std, std)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+@dataclass
+class ProfileState:
+    """Statistiques EDA fusionnables des lignes vues jusqu'ici"""
+
+    columns: dict[str, ColumnState] = field(default_factory=dict)
+    comoments: CoMoments = field(default_factory=lambda: CoMoments(list(EDA_NUMERIC_COLUMNS)))
+    region_sales: pd.Series = field(default_factory=lambda: pd.Series(dtype=np.float64))
+    late_delivery_counts: pd.Series = field(default_factory=lambda: pd.Series(dtype=np.int64))
+    sales_bins: pd.Series = field(default_factory=lambda: pd.Series(dtype=np.int64))
+    # dernier raw_data.load_runs.load_id inclus, None s'il est inconnu
+    watermark: int | None = None
+    version: int = STATE_VERSION
+
+    @property
+    def n_rows(self) -> int:
+        column = next(iter(self.columns.values()), None)
+        return column.count + column.nulls if column else 0
+
+    @staticmethod
+    def _kind(name: str, dtype) -> str:
+        declared = RAW_DTYPES.get(name, str(dtype))
+        if declared in (DATETIME, "datetime64[ns]"):
+            return "datetime"
+        if declared in ("category", "object"):
+            return "text"
+        return "numeric"
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Intégrer un bloc de lignes brutes (types déclarés appliqués) à l'état"""
+        for name in df.columns:
+            if name not in self.columns:
+                self.columns[name] = ColumnState(self._kind(name, df[name].dtype))
+            self.columns[name].update(df[name])
+
+        if set(EDA_NUMERIC_COLUMNS).issubset(df.columns):
+            self.comoments.update(df)
+        region_sales = df.groupby("order_region", observed=True)["sales"].sum().astype(np.float64)
+        region_sales.index = region_sales.index.astype(object)
+        self.region_sales = self.region_sales.add(region_sales, fill_value=0)
+        self.late_delivery_counts = self.late_delivery_counts.add(
+            df["late_delivery_risk"].value_counts(), fill_value=0
+        ).astype(np.int64)
+        self.sales_bins = self.sales_bins.add(sales_bin_counts(df["sales"]), fill_value=0).astype(np.int64)
+
+    def merge(self, other: "ProfileState") -> "ProfileState":
+        for name, column in other.columns.items():
+            if name in self.columns:
+                self.columns[name].merge(column)
+            else:
+                self.columns[name] = column
+        self.comoments.merge(other.comoments)
+        self.region_sales = self.region_sales.add(other.region_sales, fill_value=0)
+        self.late_delivery_counts = self.late_delivery_counts.add(other.late_delivery_counts, fill_value=0).astype(np.int64)
+        self.sales_bins = self.sales_bins.add(other.sales_bins, fill_value=0).astype(np.int64)
+        return self
+
+    def to_profile(self) -> EdaProfile:
+        names = list(self.columns)
+        index = DESCRIBE_INDEX
+        if any(c.kind == "datetime" for c in self.columns.values()):
+            index = [i for i in DESCRIBE_INDEX if i != "std"] + ["std"]
+        describe = pd.DataFrame({name: self.columns[name].describe() for name in names}).reindex(index)
+        return EdaProfile(
+            n_rows=self.n_rows,
+            dtypes=pd.Series({name: RAW_DTYPES.get(name, "object") for name in names}, dtype=object),
+            describe=describe.dropna(how="all"),
+            nulls=pd.Series({name: self.columns[name].nulls for name in names}),
+            nunique=pd.Series({name: self.columns[name].distinct.count() for name in names}),
+            region_sales=self.region_sales.rename_axis("order_region").rename("sales").sort_values(ascending=False),
+            late_delivery_counts=self.late_delivery_counts.rename_axis("late_delivery_risk").rename("count")
+            .sort_values(ascending=False),
+            correlation=self.comoments.correlation(),
+            distinct_error=HyperLogLog.for_error(DISTINCT_ERROR).relative_error,
+            sales_histogram=bins_to_histogram(self.sales_bins),
+        )
+
+
+def load_state(path: str) -> ProfileState | None:
+    """État enregistré précédemment, ou None (fichier absent ou ancien format)"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        state = pickle.load(f)
+    if getattr(state, "version", None) != STATE_VERSION:
+        logger.info("L'état EDA %s est dans un ancien format, il sera reconstruit", path)
+        return None
+    return state
+
+
+def save_state(state: ProfileState, path: str) -> None:
+    """Écrire l'état de façon atomique (fichier temporaire + renommage)"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
@@ -4,13 +4,26 @@ Partie du pipeline ETL de Supply Chain Analytics
 """
 
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import inspect, text
 import os
+import io
+import csv
+import time
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
 import logging
 from typing import Tuple
 
-from validation import validate_raw_dataframe
+from dataco_schema import RAW_DTYPES, apply_schema, csv_read_options, empty_frame, header_read_options
+from db import copy_chunk, copy_dataframe, get_db_connection, read_sql_chunks, track_db_usage
+from parse_cache import read_csv_cached
+from validation import (
+    MAX_UNPARSEABLE_DATE_RATIO,
+    RAW_DATE_COLUMNS,
+    RawDataValidator,
+    validate_raw_dataframe,
+    validate_raw_table,
+)
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,21 +32,6 @@ logger = logging.getLogger(__name__)
 # Charger les variables d'environnement
 load_dotenv()
 
-def get_db_connection():
-    """
-    Créer une connexion à la base de données PostgreSQL
-    """
-    db_host = os.getenv('DB_HOST', 'localhost')
-    db_port = os.getenv('DB_PORT', '5432')
-    db_name = os.getenv('DB_NAME', 'supply_chain_dw')
-    db_user = os.getenv('DB_USER', 'postgres')
-    db_password = os.getenv('DB_PASSWORD', 'postgres')
-    
-    connection_string = f'postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}'
-    
-    engine = create_engine(connection_string)
-    return engine
-
 
 def create_raw_schema(engine):
     """
@@ -48,9 +46,493 @@ def create_raw_schema(engine):
         raise
 
 
-def extract_csv_to_postgres():
+def truncate_if_exists(engine, table_name: str, schema: str = 'raw_data') -> bool:
+    """
+    Vider la table (TRUNCATE) si elle existe, au lieu de DROP
+    Ceci évite de casser les vues dbt qui dépendent de cette table
+    """
+    with engine.begin() as conn:
+        table_exists = conn.execute(text("""
+            SELECT EXISTS (
+                SELECT FROM information_schema.tables 
+                WHERE table_schema = :schema 
+                AND table_name = :table_name
+            );
+        """), {'schema': schema, 'table_name': table_name}).scalar()
+        
+        if table_exists:
+            logger.info(f"Table existe, vidage avec TRUNCATE...")
+            conn.execute(text(f"TRUNCATE TABLE {schema}.{table_name};"))
+    return table_exists
+
+
+def insert_dataframe_to_postgres(df: pd.DataFrame, engine, table_name: str, schema: str = 'raw_data'):
+    """
+    Chargement historique par INSERT multi-lignes (df.to_sql)
+    Conservé pour comparer les performances avec le chargement COPY
+    """
+    truncate_if_exists(engine, table_name, schema)
+    
+    # Charger les données (append si table existe déjà)
+    df.to_sql(
+        table_name,
+        engine,
+        schema=schema,
+        if_exists='append',  # Append car on vient de faire TRUNCATE
+        index=False,
+        method='multi',
+        chunksize=1000
+    )
+
+
+def stream_csv_to_postgres(
+    csv_path: str,
+    engine,
+    table_name: str,
+    schema: str = 'raw_data',
+    chunksize: int = 100000,
+    approximate_keys: bool = False,
+) -> int:
+    """
+    Lire, valider et charger le CSV bloc par bloc (mémoire bornée)
+    
+    Chaque bloc est validé de façon incrémentale (RawDataValidator) puis
+    envoyé par COPY avant la lecture du suivant. Tout se fait dans une seule
+    transaction: si un bloc ou la validation finale échoue, le TRUNCATE et
+    les blocs déjà envoyés sont annulés.
+    
+    approximate_keys=True remplace l'ensemble exact des clés déjà vues par un
+    filtre de Bloom (mémoire constante, faux positifs possibles mais rares).
+    """
+    validator = RawDataValidator(approximate_keys=approximate_keys)
+    raw_conn = None
+    
+    try:
+        # Types déclarés: tous les blocs ont les mêmes dtypes, quelle que soit leur contenu
+        reader = pd.read_csv(
+            csv_path, encoding='utf-8', chunksize=chunksize, **csv_read_options(csv_path)
+        )
+        for i, chunk in enumerate(reader):
+            chunk.columns = [c.strip() for c in chunk.columns]
+            validator.update(chunk)
+            
+            if raw_conn is None:
+                # Le premier bloc fixe les types si la table n'existe pas encore
+                if not inspect(engine).has_table(table_name, schema=schema):
+                    logger.info(f"Création de la table {schema}.{table_name}...")
+                    chunk.head(0).to_sql(table_name, engine, schema=schema, index=False)
+                raw_conn = engine.raw_connection()
+                with raw_conn.cursor() as cursor:
+                    cursor.execute(f"TRUNCATE TABLE {schema}.{table_name}")
+            
+            copy_chunk(raw_conn, chunk, table_name, schema)
+            logger.info(
+                f"Bloc {i + 1}: {validator.rows} lignes validées et chargées "
+                f"(dates non parsables: {validator.unparseable_date_ratio('order_date_dateorders'):.2%})"
+            )
+        
+        validator.finalize()
+        if raw_conn is not None:
+            raw_conn.commit()
+    except Exception:
+        if raw_conn is not None:
+            raw_conn.rollback()
+        raise
+    finally:
+        if raw_conn is not None:
+            raw_conn.close()
+    
+    return validator.rows
+
+
+def ensure_load_tracking_tables(conn, schema: str = 'raw_data'):
+    """
+    Créer les tables de suivi des chargements si elles n'existent pas
+    
+    - load_runs: une ligne par chargement (compteurs insérées/modifiées/inchangées);
+      le plus grand load_id sert de watermark aux étapes suivantes
+    - load_manifest: hash de chaque ligne chargée, par clé (order_id, order_item_id)
+    """
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.load_runs (
+            load_id SERIAL PRIMARY KEY,
+            loaded_at TIMESTAMP NOT NULL DEFAULT now(),
+            load_method TEXT NOT NULL,
+            rows_total BIGINT,
+            rows_inserted BIGINT,
+            rows_updated BIGINT,
+            rows_unchanged BIGINT
+        )
+    """))
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.load_manifest (
+            order_id BIGINT NOT NULL,
+            order_item_id BIGINT NOT NULL,
+            row_hash BIGINT NOT NULL,
+            first_load_id INTEGER NOT NULL,
+            last_load_id INTEGER NOT NULL,
+            PRIMARY KEY (order_id, order_item_id)
+        )
+    """))
+
+
+def record_full_load(
+    engine,
+    load_method: str,
+    n_rows: int,
+    schema: str = 'raw_data',
+    df: pd.DataFrame = None,
+    table_name: str = 'supply_chain_raw',
+    chunksize: int = 100000,
+) -> int:
+    """
+    Enregistrer un rechargement complet (TRUNCATE + chargement)
+    
+    Le manifeste est reconstruit dans la même transaction avec le hash de
+    chaque ligne chargée: celles de df s'il est en mémoire (copy, insert),
+    sinon celles de la table relue par blocs aux types déclarés (stream,
+    parallel). Le prochain chargement incrémental ne renvoie ainsi que les
+    lignes réellement nouvelles ou modifiées.
+    """
+    if df is not None:
+        frames = [df]
+    else:
+        frames = (
+            apply_schema(chunk, RAW_DTYPES)
+            for chunk in read_sql_chunks(f"SELECT * FROM {schema}.{table_name}", engine, chunksize=chunksize)
+        )
+    with engine.begin() as conn:
+        ensure_load_tracking_tables(conn, schema)
+        conn.execute(text(f"TRUNCATE TABLE {schema}.load_manifest"))
+        load_id = conn.execute(text(f"""
+            INSERT INTO {schema}.load_runs
+                (load_method, rows_total, rows_inserted, rows_updated, rows_unchanged)
+            VALUES (:load_method, :n_rows, :n_rows, 0, 0)
+            RETURNING load_id
+        """), {'load_method': load_method, 'n_rows': n_rows}).scalar()
+        for frame in frames:
+            for start in range(0, len(frame), chunksize):
+                copy_chunk(conn.connection, manifest_rows(frame.iloc[start:start + chunksize], load_id),
+                           'load_manifest', schema)
+    return load_id
+
+
+def compute_row_hashes(df: pd.DataFrame) -> pd.Series:
+    """Hash 64 bits de chaque ligne (toutes colonnes), signé pour tenir dans un BIGINT"""
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy().view('int64')
+    return pd.Series(hashes, index=df.index, name='row_hash')
+
+
+def manifest_rows(df: pd.DataFrame, load_id: int) -> pd.DataFrame:
+    """Lignes de load_manifest des lignes de df, chargées par load_id"""
+    rows = df[['order_id', 'order_item_id']].astype('int64')
+    rows['row_hash'] = compute_row_hashes(df)
+    rows['first_load_id'] = load_id
+    rows['last_load_id'] = load_id
+    return rows
+
+
+def changed_rows(df: pd.DataFrame, manifest: pd.DataFrame) -> pd.DataFrame:
+    """
+    Clés et hashes des lignes de df nouvelles ou modifiées par rapport au manifeste
+    
+    (Int64 nullable: un float64 perdrait les bits de poids faible des hashes)
+    """
+    key_cols = ['order_id', 'order_item_id']
+    manifest = manifest[key_cols + ['row_hash']].astype({'order_id': 'int64', 'order_item_id': 'int64', 'row_hash': 'Int64'})
+    current = df[key_cols].copy()
+    current['row_hash'] = compute_row_hashes(df)
+    current = current.merge(
+        manifest.rename(columns={'row_hash': 'previous_hash'}),
+        on=key_cols,
+        how='left'
+    )
+    changed_mask = (current['previous_hash'] != current['row_hash']).fillna(True).to_numpy(dtype=bool)
+    return current.loc[changed_mask, key_cols + ['row_hash']].set_axis(df.index[changed_mask])
+
+
+def incremental_load_to_postgres(
+    df: pd.DataFrame,
+    engine,
+    table_name: str,
+    schema: str = 'raw_data',
+    chunksize: int = 50000,
+) -> dict:
+    """
+    Chargement incrémental (CDC) au lieu de TRUNCATE + rechargement complet
+    
+    - Chaque ligne est hashée et comparée au manifeste sur (order_id, order_item_id)
+    - Seules les lignes nouvelles ou modifiées sont envoyées par COPY dans une
+      table temporaire, puis fusionnées par INSERT ... ON CONFLICT DO UPDATE
+    - Le manifeste et load_runs sont mis à jour dans la même transaction
+    
+    Retourne les compteurs: inserted, updated, unchanged, total, load_id
+    """
+    key_cols = ['order_id', 'order_item_id']
+    
+    if not inspect(engine).has_table(table_name, schema=schema):
+        logger.info(f"Création de la table {schema}.{table_name}...")
+        df.head(0).to_sql(table_name, engine, schema=schema, index=False)
+    
+    with engine.begin() as conn:
+        ensure_load_tracking_tables(conn, schema)
+        # ON CONFLICT nécessite un index unique sur la clé composite
+        conn.execute(text(f"""
+            CREATE UNIQUE INDEX IF NOT EXISTS {table_name}_pk_idx
+            ON {schema}.{table_name} (order_id, order_item_id)
+        """))
+        manifest = pd.read_sql(
+            text(f"SELECT order_id, order_item_id, row_hash FROM {schema}.load_manifest"),
+            conn
+        )
+    
+    # Comparer les hashes du fichier avec ceux du manifeste
+    delta_hashes = changed_rows(df, manifest)
+    delta = df.loc[delta_hashes.index]
+    unchanged = len(df) - len(delta)
+    logger.info(
+        f"Delta détecté: {len(delta)} lignes nouvelles ou modifiées, {unchanged} inchangées"
+    )
+    
+    columns = ', '.join(f'"{c}"' for c in df.columns)
+    updates = ', '.join(f'"{c}" = EXCLUDED."{c}"' for c in df.columns if c not in key_cols)
+    
+    raw_conn = engine.raw_connection()
+    try:
+        with raw_conn.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {schema}.load_runs (load_method, rows_total) "
+                f"VALUES ('incremental', %s) RETURNING load_id",
+                (len(df),)
+            )
+            load_id = cursor.fetchone()[0]
+            
+            cursor.execute(
+                f"CREATE TEMP TABLE {table_name}_delta "
+                f"(LIKE {schema}.{table_name} INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            cursor.execute(
+                "CREATE TEMP TABLE load_manifest_delta "
+                "(order_id BIGINT, order_item_id BIGINT, row_hash BIGINT) ON COMMIT DROP"
+            )
+        
+        for start in range(0, len(delta), chunksize):
+            copy_chunk(raw_conn, delta.iloc[start:start + chunksize], f'{table_name}_delta', 'pg_temp')
+            copy_chunk(raw_conn, delta_hashes.iloc[start:start + chunksize], 'load_manifest_delta', 'pg_temp')
+        
+        with raw_conn.cursor() as cursor:
+            # xmax = 0 distingue une insertion d'une mise à jour sur conflit
+            cursor.execute(f"""
+                WITH upserted AS (
+                    INSERT INTO {schema}.{table_name} ({columns})
+                    SELECT {columns} FROM pg_temp.{table_name}_delta
+                    ON CONFLICT (order_id, order_item_id) DO UPDATE SET {updates}
+                    RETURNING (xmax = 0) AS inserted
+                )
+                SELECT
+                    COUNT(*) FILTER (WHERE inserted),
+                    COUNT(*) FILTER (WHERE NOT inserted)
+                FROM upserted
+            """)
+            inserted, updated = cursor.fetchone()
+            
+            cursor.execute(f"""
+                INSERT INTO {schema}.load_manifest
+                    (order_id, order_item_id, row_hash, first_load_id, last_load_id)
+                SELECT order_id, order_item_id, row_hash, %(load_id)s, %(load_id)s
+                FROM pg_temp.load_manifest_delta
+                ON CONFLICT (order_id, order_item_id) DO UPDATE
+                SET row_hash = EXCLUDED.row_hash, last_load_id = EXCLUDED.last_load_id
+            """, {'load_id': load_id})
+            
+            cursor.execute(f"""
+                UPDATE {schema}.load_runs
+                SET rows_inserted = %s, rows_updated = %s, rows_unchanged = %s
+                WHERE load_id = %s
+            """, (inserted, updated, unchanged, load_id))
+        raw_conn.commit()
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+    
+    return {
+        'load_id': load_id,
+        'total': len(df),
+        'inserted': inserted,
+        'updated': updated,
+        'unchanged': unchanged,
+    }
+
+
+def split_csv_byte_ranges(csv_path: str, n_partitions: int) -> Tuple[list, list]:
+    """
+    Découper le CSV en plages d'octets alignées sur des débuts de ligne
+    
+    Retourne (colonnes de l'en-tête, liste de plages (début, fin)).
+    Suppose qu'aucun champ ne contient de retour à la ligne (cas du DataCo CSV).
+    """
+    size = os.path.getsize(csv_path)
+    with open(csv_path, 'rb') as f:
+        header = f.readline()
+        data_start = f.tell()
+        bounds = [data_start]
+        for i in range(1, n_partitions):
+            target = data_start + (size - data_start) * i // n_partitions
+            if target <= bounds[-1]:
+                continue
+            # Avancer jusqu'au début de la ligne suivante
+            f.seek(target - 1)
+            f.readline()
+            position = f.tell()
+            if bounds[-1] < position < size:
+                bounds.append(position)
+        bounds.append(size)
+    
+    columns = [c.strip() for c in next(csv.reader([header.decode('utf-8-sig')]))]
+    ranges = [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+    return columns, ranges
+
+
+def process_partition(
+    csv_path: str,
+    start: int,
+    end: int,
+    columns: list,
+    staging_table: str = None,
+    schema: str = 'raw_data',
+) -> dict:
+    """
+    Parser, valider puis charger une plage d'octets du CSV (exécuté dans un worker)
+    
+    Les octets d'origine sont envoyés tels quels par COPY dans la table de
+    staging, sur une connexion propre au worker: pas de re-sérialisation.
+    Sans staging_table, la partition est seulement parsée et validée.
+    Les doublons entre partitions sont vérifiés ensuite côté base.
+    """
+    t0 = time.perf_counter()
+    with open(csv_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    
+    df = pd.read_csv(
+        io.BytesIO(data), header=None, names=columns, encoding='utf-8',
+        **header_read_options(columns)
+    )
+    validator = RawDataValidator()
+    validator.update(df)
+    t1 = time.perf_counter()
+    
+    if staging_table is not None:
+        quoted = ', '.join(f'"{c}"' for c in columns)
+        engine = get_db_connection()
+        raw_conn = engine.raw_connection()
+        try:
+            with raw_conn.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY {schema}.{staging_table} ({quoted}) FROM STDIN WITH (FORMAT csv)",
+                    io.BytesIO(data)
+                )
+            raw_conn.commit()
+        finally:
+            raw_conn.close()
+    t2 = time.perf_counter()
+    
+    return {
+        'rows': validator.rows,
+        'unparseable_dates': validator.unparseable_dates,
+        'parse_seconds': t1 - t0,
+        'load_seconds': t2 - t1,
+    }
+
+
+def parallel_csv_to_postgres(
+    csv_path: str,
+    engine,
+    table_name: str,
+    schema: str = 'raw_data',
+    workers: int = None,
+) -> int:
+    """
+    Ingestion parallèle: partitions parsées, validées et chargées par un pool de processus
+    
+    1. Le CSV est découpé en `workers` plages d'octets alignées sur les lignes
+    2. Chaque worker charge sa partition par COPY dans une table UNLOGGED de staging
+    3. Les règles globales (doublons, ratio de dates) sont vérifiées sur l'ensemble
+    4. TRUNCATE + INSERT ... SELECT dans une seule transaction: tout ou rien
+    """
+    workers = workers or os.cpu_count() or 1
+    staging_table = f'{table_name}_staging'
+    columns, ranges = split_csv_byte_ranges(csv_path, workers)
+    logger.info(f"{len(ranges)} partitions, {workers} workers")
+    
+    if not inspect(engine).has_table(table_name, schema=schema):
+        # Types issus du schéma déclaré, dans l'ordre de l'en-tête du CSV
+        logger.info(f"Création de la table {schema}.{table_name}...")
+        empty_frame(RAW_DTYPES, columns).to_sql(table_name, engine, schema=schema, index=False)
+    
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{staging_table}"))
+        conn.execute(text(
+            f"CREATE UNLOGGED TABLE {schema}.{staging_table} (LIKE {schema}.{table_name})"
+        ))
+    
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(process_partition, csv_path, start, end, columns, staging_table, schema)
+                for start, end in ranges
+            ]
+            results = [future.result() for future in futures]
+        
+        n_rows = sum(r['rows'] for r in results)
+        logger.info(
+            f"Partitions chargées: {n_rows} lignes "
+            f"(parse max {max(r['parse_seconds'] for r in results):.2f}s, "
+            f"COPY max {max(r['load_seconds'] for r in results):.2f}s)"
+        )
+        
+        # Règles globales: ratio de dates non parsables et doublons inter-partitions
+        for date_col in RAW_DATE_COLUMNS:
+            unparseable = sum(r['unparseable_dates'][date_col] for r in results)
+            if n_rows and unparseable / n_rows > MAX_UNPARSEABLE_DATE_RATIO:
+                raise ValueError(f"Trop de dates non analysables dans {date_col}")
+        
+        with engine.begin() as conn:
+            # Toutes les règles en un seul parcours de la table de staging, côté serveur
+            report = validate_raw_table(conn, staging_table, schema)
+            logger.info(f"Validation SQL de {schema}.{staging_table}: {report.seconds:.2f}s")
+            
+            # Bascule atomique vers la table cible (les vues dbt restent valides)
+            conn.execute(text(f"TRUNCATE TABLE {schema}.{table_name}"))
+            conn.execute(text(f"INSERT INTO {schema}.{table_name} SELECT * FROM {schema}.{staging_table}"))
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{staging_table}"))
+    
+    return n_rows
+
+
+@track_db_usage
+def extract_csv_to_postgres(
+    load_method: str = 'copy',
+    chunksize: int = 100000,
+    workers: int = None,
+    approximate_keys: bool = False,
+):
     """
     Extraire les données du fichier CSV et les charger dans PostgreSQL
+    
+    load_method:
+    - 'copy' (par défaut): lecture complète, validation, puis COPY FROM STDIN
+    - 'insert': lecture complète, validation, puis to_sql multi-lignes
+    - 'stream': lecture/validation/COPY par blocs de `chunksize` lignes
+    - 'incremental': lecture complète, validation, puis upsert du seul delta
+      (lignes nouvelles ou modifiées) sans TRUNCATE
+    - 'parallel': partitions du CSV traitées par `workers` processus (défaut: nombre de CPU)
+    
+    approximate_keys (mode 'stream'): détection des doublons par filtre de Bloom.
     """
     try:
         # Chemin vers le fichier CSV
@@ -60,68 +542,83 @@ def extract_csv_to_postgres():
             'dataset', 
             'DataCoSupplyChainDatasetRefined.csv'
         )
-        
-        logger.info(f"Lecture du fichier CSV: {csv_path}")
-        
-        # Lire le CSV avec gestion de l'encodage
-        df = pd.read_csv(csv_path, encoding='utf-8', low_memory=False)
-        
-        logger.info(f"CSV chargé: {len(df)} lignes, {len(df.columns)} colonnes")
-
-        # Data Quality: basic cleaning and validation before load
-        # Trim column names
-        df.columns = [c.strip() for c in df.columns]
-
-        # Coerce dates (keep original cols intact in raw; validation only)
-        for date_col in [
-            'order_date_dateorders',
-            'shipping_date_dateorders',
-        ]:
-            if date_col in df.columns:
-                _ = pd.to_datetime(df[date_col], errors='coerce')
-
-        # Validate schema & quality (raises on failure)
-        validate_raw_dataframe(df)
-        
-        # Connexion à la base de données
-        engine = get_db_connection()
-        
-        # Créer le schéma
-        create_raw_schema(engine)
-        
-        # Charger les données dans PostgreSQL
         table_name = 'supply_chain_raw'
-        logger.info(f"Chargement des données dans la table {table_name}...")
         
-        # Vérifier si la table existe et la vider (TRUNCATE) au lieu de DROP
-        # Ceci évite de casser les vues dbt qui dépendent de cette table
-        with engine.begin() as conn:
-            # Vérifier l'existence de la table
-            check_table = f"""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_schema = 'raw_data' 
-                    AND table_name = '{table_name}'
-                );
-            """
-            table_exists = conn.execute(check_table).scalar()
+        if load_method == 'stream':
+            engine = get_db_connection()
+            create_raw_schema(engine)
+            
+            logger.info(f"Lecture en flux du fichier CSV: {csv_path} (blocs de {chunksize} lignes)")
+            start = time.perf_counter()
+            n_rows = stream_csv_to_postgres(
+                csv_path, engine, table_name, schema='raw_data',
+                chunksize=chunksize, approximate_keys=approximate_keys
+            )
+            elapsed = time.perf_counter() - start
+        elif load_method == 'parallel':
+            engine = get_db_connection()
+            create_raw_schema(engine)
+            
+            logger.info(f"Lecture parallèle du fichier CSV: {csv_path}")
+            start = time.perf_counter()
+            n_rows = parallel_csv_to_postgres(csv_path, engine, table_name, schema='raw_data', workers=workers)
+            elapsed = time.perf_counter() - start
+        else:
+            logger.info(f"Lecture du fichier CSV: {csv_path}")
+            
+            # Lire le CSV avec gestion de l'encodage et les types déclarés
+            # (dates parsées une seule fois; cache colonnaire: un fichier inchangé n'est pas re-parsé)
+            df = read_csv_cached(
+                csv_path, encoding='utf-8', low_memory=False, **csv_read_options(csv_path)
+            )
+            n_rows = len(df)
+            
+            logger.info(
+                f"CSV chargé: {len(df)} lignes, {len(df.columns)} colonnes, "
+                f"{df.memory_usage(deep=True).sum() / 1e6:.1f} Mo en mémoire"
+            )
+
+            # Data Quality: basic cleaning and validation before load
+            # Trim column names
+            df.columns = [c.strip() for c in df.columns]
+
+            # Validate schema & quality (raises on failure)
+            report = validate_raw_dataframe(df)
+            logger.info(f"Validation: {len(report.results)} règles en {report.seconds * 1000:.1f} ms")
             
-            if table_exists:
-                logger.info(f"Table existe, vidage avec TRUNCATE...")
-                conn.execute(f"TRUNCATE TABLE raw_data.{table_name};")
+            # Connexion à la base de données
+            engine = get_db_connection()
+            
+            # Créer le schéma
+            create_raw_schema(engine)
+            
+            # Charger les données dans PostgreSQL
+            logger.info(f"Chargement des données dans la table {table_name} (méthode: {load_method})...")
+            
+            start = time.perf_counter()
+            if load_method == 'copy':
+                copy_dataframe(df, table_name, schema='raw_data', engine=engine, truncate=True)
+            elif load_method == 'insert':
+                insert_dataframe_to_postgres(df, engine, table_name, schema='raw_data')
+            elif load_method == 'incremental':
+                counts = incremental_load_to_postgres(df, engine, table_name, schema='raw_data')
+                logger.info(
+                    f"Chargement incrémental #{counts['load_id']}: {counts['inserted']} insérées, "
+                    f"{counts['updated']} modifiées, {counts['unchanged']} inchangées"
+                )
+            else:
+                raise ValueError(f"Méthode de chargement inconnue: {load_method}")
+            elapsed = time.perf_counter() - start
         
-        # Charger les données (append si table existe déjà)
-        df.to_sql(
-            table_name,
-            engine,
-            schema='raw_data',
-            if_exists='append',  # Append car on vient de faire TRUNCATE
-            index=False,
-            method='multi',
-            chunksize=1000
-        )
+        if load_method != 'incremental':
+            # stream et parallel n'ont pas le fichier complet en mémoire: table relue
+            loaded = df if load_method in ('copy', 'insert') else None
+            record_full_load(engine, load_method, n_rows, schema='raw_data', df=loaded, table_name=table_name)
         
-        logger.info(f"Données chargées avec succès: {len(df)} lignes dans raw_data.{table_name}")
+        logger.info(
+            f"Données chargées avec succès: {n_rows} lignes dans raw_data.{table_name} "
+            f"en {elapsed:.2f}s ({n_rows / max(elapsed, 1e-9):,.0f} lignes/s)"
+        )
         
         # Vérification
         with engine.connect() as conn:
@@ -129,7 +626,7 @@ def extract_csv_to_postgres():
             count = result.scalar()
             logger.info(f"Vérification: {count} lignes dans la base de données")
         
-        return f"Extraction réussie: {len(df)} lignes chargées"
+        return f"Extraction réussie: {n_rows} lignes chargées"
         
     except FileNotFoundError:
         logger.exception(f"Fichier CSV non trouvé: {csv_path}")
@@ -141,5 +638,20 @@ def extract_csv_to_postgres():
 
 if __name__ == "__main__":
     # Exécution en standalone
-    result = extract_csv_to_postgres()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Extraction CSV -> PostgreSQL")
+    parser.add_argument('--load-method', choices=['copy', 'insert', 'stream', 'incremental', 'parallel'], default='copy')
+    parser.add_argument('--chunksize', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--approximate-keys', action='store_true',
+                        help="doublons détectés par filtre de Bloom (mode stream)")
+    args = parser.parse_args()
+    
+    result = extract_csv_to_postgres(
+        load_method=args.load_method,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        approximate_keys=args.approximate_keys
+    )
     print(result)
@@ -0,0 +1,180 @@
+"""
+Artefact colonnaire des features, transmis du feature engineering à l'entraînement
+
+En plus de staging.features_ml, un calcul des features publie les mêmes
+lignes en fichiers Arrow IPC non compressés dans un dossier versionné:
+
+    <root>/<version>/manifest.json      lignes, schéma, fichiers, watermark source
+    <root>/<version>/<part>.arrow       un ou plusieurs fichiers de même schéma
+    <root>/CURRENT                      nom de la version à lire
+
+L'entraînement projette les fichiers en mémoire (memory map) et ne
+sélectionne que les colonnes utiles: les tampons Arrow IPC sont lus sur
+place, les pages des autres colonnes ne sont jamais touchées. L'artefact
+n'est utilisé que tant qu'il décrit encore la table: le manifeste garde le
+watermark de raw_data.load_runs des features et le nombre de lignes
+écrites, que is_fresh compare à la base. Les écritures de
+staging.features_ml qui ne publient pas d'artefact appellent invalidate().
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from db import plan_refresh
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARTIFACT_DIR = os.getenv(
+    "FEATURE_ARTIFACT_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "ml_models", "feature_artifacts"),
+)
+CURRENT = "CURRENT"
+MANIFEST = "manifest.json"
+
+
+def begin(root: str = DEFAULT_ARTIFACT_DIR, version: str | None = None) -> str:
+    """Créer le dossier de préparation d'une nouvelle version; les parties y sont écrites, puis commit()"""
+    version = version or time.strftime("%Y%m%dT%H%M%S")
+    path = os.path.join(root, f"{version}.tmp")
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    return path
+
+
+def _table(df: pd.DataFrame) -> pa.Table:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # la largeur des index de dictionnaire dépend du nombre de catégories de chaque partie: une seule largeur
+    fields = [
+        pa.field(f.name, pa.dictionary(pa.int32(), f.type.value_type)) if pa.types.is_dictionary(f.type) else f
+        for f in table.schema
+    ]
+    return table.cast(pa.schema(fields, metadata=table.schema.metadata))
+
+
+def write_part(df: pd.DataFrame, path: str, name: str = "features") -> str:
+    """Écrire une partie de l'artefact (non compressée, pour que les lecteurs la projettent en mémoire)"""
+    target = os.path.join(path, f"{name}.arrow")
+    table = _table(df)
+    with pa.OSFile(target, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return target
+
+
+def commit(path: str, source: dict | None = None, keep: int = 2) -> dict:
+    """
+    Écrire le manifeste d'un dossier de préparation et en faire la version courante
+    
+    `source` (par exemple watermark, mode) est enregistré tel quel. Retourne le manifeste.
+    """
+    root, version = os.path.split(path[:-len(".tmp")])
+    files = sorted(name for name in os.listdir(path) if name.endswith(".arrow"))
+    schema, n_rows, n_bytes = None, 0, 0
+    for name in files:
+        with pa.memory_map(os.path.join(path, name)) as source_file:
+            reader = ipc.open_file(source_file)
+            n_rows += sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+            if schema is None:
+                schema = reader.schema
+            elif not reader.schema.equals(schema, check_metadata=False):
+                raise ValueError(f"La partie {name} de l'artefact n'a pas le schéma de {files[0]}")
+        n_bytes += os.path.getsize(os.path.join(path, name))
+
+    manifest = {
+        "version": version,
+        "created_at": time.time(),
+        "rows": n_rows,
+        "bytes": n_bytes,
+        "files": files,
+        "schema": [{"name": f.name, "type": str(f.type)} for f in schema] if schema is not None else [],
+        "source": source or {},
+    }
+    with open(os.path.join(path, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, default=str)
+
+    target = os.path.join(root, version)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(path, target)
+    pointer = os.path.join(root, f"{CURRENT}.tmp")
+    with open(pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(root, CURRENT))
+
+    versions = sorted(
+        (name for name in os.listdir(root) if os.path.isfile(os.path.join(root, name, MANIFEST))),
+        key=lambda name: (os.path.getmtime(os.path.join(root, name, MANIFEST)), name),
+    )
+    for old in versions[:-keep]:
+        if old != version:
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    logger.info("Artefact de features %s: %d lignes, %d fichiers, %.1f Mo", version, n_rows, len(files), n_bytes / 1e6)
+    return manifest
+
+
+def publish_frame(
+    df: pd.DataFrame,
+    root: str = DEFAULT_ARTIFACT_DIR,
+    source: dict | None = None,
+    version: str | None = None,
+    keep: int = 2,
+) -> dict:
+    """Publier un DataFrame de features complet en version d'un seul fichier"""
+    path = begin(root, version)
+    write_part(df, path)
+    return commit(path, source, keep)
+
+
+def invalidate(root: str = DEFAULT_ARTIFACT_DIR) -> None:
+    """Ne plus servir la version courante (la table a été réécrite sans artefact)"""
+    try:
+        os.remove(os.path.join(root, CURRENT))
+        logger.info("Artefact de features invalidé")
+    except FileNotFoundError:
+        pass
+
+
+def current_manifest(root: str = DEFAULT_ARTIFACT_DIR) -> dict | None:
+    """Manifeste de la version courante, None s'il n'y en a pas"""
+    try:
+        with open(os.path.join(root, CURRENT), encoding="utf-8") as f:
+            version = f.read().strip()
+        with open(os.path.join(root, version, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def is_fresh(manifest: dict, conn, table_name: str = "features_ml", schema: str = "staging") -> bool:
+    """True si aucun chargement n'a eu lieu depuis le watermark de l'artefact et que la table a toujours son nombre de lignes"""
+    from sqlalchemy import text
+
+    watermark = manifest["source"].get("watermark")
+    action, _ = plan_refresh(conn, watermark)
+    if watermark is None or action != "none":
+        logger.info("Artefact de features %s périmé: chargements depuis le watermark %s", manifest["version"], watermark)
+        return False
+    n_rows = conn.execute(text(f"SELECT COUNT(*) FROM {schema}.{table_name}")).scalar()
+    if n_rows != manifest["rows"]:
+        logger.info("Artefact de features %s périmé: %d lignes, la table en a %d", manifest["version"], manifest["rows"], n_rows)
+        return False
+    return True
+
+
+def read_columns(manifest: dict, columns: list[str], root: str = DEFAULT_ARTIFACT_DIR) -> pd.DataFrame:
+    """Projeter en mémoire les fichiers de l'artefact et ne convertir que `columns` en pandas"""
+    path = os.path.join(root, manifest["version"])
+    tables = []
+    for name in manifest["files"]:
+        with pa.memory_map(os.path.join(path, name)) as source:
+            tables.append(ipc.open_file(source).read_all().select(columns))
+    if not tables:
+        return pd.DataFrame(columns=columns)
+    return pa.concat_tables(tables).to_pandas(split_blocks=True)
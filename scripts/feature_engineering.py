@@ -5,14 +5,41 @@ Crée des features avancées à partir des données transformées par dbt
 
 import pandas as pd
 import numpy as np
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 import os
+import shutil
 from dotenv import load_dotenv
 import logging
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from typing import List
 
-from validation import validate_features_dataframe
+from dataco_schema import FACT_DTYPES, FEATURES_ML_DTYPES, apply_schema, conform_frame, empty_frame
+from db import copy_dataframe, get_db_connection, plan_refresh, read_sql_chunks, track_db_usage
+import feature_artifact
+from feature_kernels import compute_features
+from feature_partitions import (
+    FEATURE_EXPANSION,
+    GLOBAL_COLUMNS,
+    GlobalFeatureState,
+    featurize_partition,
+    partition_filter_sql,
+    partitions_for_budget,
+)
+from feature_store import (
+    DEFAULT_STORE_PATH,
+    FeatureStore,
+    apply_to_table,
+    frame_thresholds,
+    load_store,
+    save_store,
+    table_thresholds,
+)
+from online_store import ENTITIES, publish
+from point_in_time import asof_overrides
+from validation import feature_rules, validate_features_dataframe, validate_raw_table
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -21,17 +48,59 @@ logger = logging.getLogger(__name__)
 # Charger les variables d'environnement
 load_dotenv()
 
+# Features requises par ml_modeling.py
+REQUIRED_FOR_ML: List[str] = [
+    'order_month', 'order_quarter', 'order_day', 'order_year',
+    'days_for_shipment_scheduled', 'is_weekend', 'days_since_year_start',
+    'is_end_of_month', 'is_beginning_of_month', 'market_encoded',
+    'order_region_encoded', 'customer_total_orders', 'customer_avg_order_value',
+    'region_avg_sales', 'customer_late_delivery_rate', 'region_late_delivery_rate',
+    'is_high_value_order', 'profit_margin'
+]
 
-def get_db_connection():
-    """Créer une connexion à la base de données PostgreSQL"""
-    db_host = os.getenv('DB_HOST', 'localhost')
-    db_port = os.getenv('DB_PORT', '5432')
-    db_name = os.getenv('DB_NAME', 'supply_chain_dw')
-    db_user = os.getenv('DB_USER', 'postgres')
-    db_password = os.getenv('DB_PASSWORD', 'postgres')
-    
-    connection_string = f'postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}'
-    return create_engine(connection_string)
+# Colonnes de la table de faits dbt lues par le feature engineering
+FACT_QUERY = """
+SELECT
+    order_id,
+    order_item_id,
+    order_date,
+    customer_id,
+    order_year,
+    order_month,
+    order_quarter,
+    order_day,
+    days_for_shipping_real,
+    days_for_shipment_scheduled,
+    shipping_delay_days,
+    late_delivery_risk,
+    delivery_status,
+    order_region,
+    order_country,
+    market,
+    sales,
+    order_profit_per_order,
+    benefit_per_order,
+    is_on_time,
+    is_profitable,
+    performance_score
+FROM analytics_marts.fct_supply_chain
+"""
+
+# Première passe du mode 'partitioned': colonnes nécessaires aux seuils,
+# encodages et agrégats région uniquement
+GLOBAL_QUERY = f"SELECT {', '.join(GLOBAL_COLUMNS)} FROM analytics_marts.fct_supply_chain"
+
+# Budget mémoire par défaut du mode 'partitioned' (Mo, tous workers confondus)
+DEFAULT_MEMORY_BUDGET_MB = float(os.getenv('FEATURE_MEMORY_BUDGET_MB', '2048'))
+
+# Lignes de faits des commandes chargées entre deux load_id
+DELTA_QUERY = f"""
+SELECT f.*
+FROM ({FACT_QUERY}) f
+JOIN raw_data.load_manifest m
+  ON m.order_id = f.order_id AND m.order_item_id = f.order_item_id
+WHERE m.first_load_id > :watermark AND m.first_load_id <= :last_load
+"""
 
 
 def create_staging_schema(engine):
@@ -45,156 +114,383 @@ def create_staging_schema(engine):
         raise
 
 
-def create_features():
+def check_dbt_features(
+    engine,
+    table_name: str = 'features_ml',
+    schema: str = 'staging',
+    publish_online: bool = True,
+) -> str:
+    """
+    Valider dans PostgreSQL les features produites par le modèle dbt features_ml
+    
+    Les règles de validate_features_dataframe sont évaluées par une seule
+    requête d'agrégats: aucune ligne n'est transférée vers Python.
+    """
+    with engine.connect() as conn:
+        report = validate_raw_table(conn, table_name, schema=schema, rules=feature_rules(REQUIRED_FOR_ML))
+        n_rows = conn.execute(text(f"SELECT COUNT(*) FROM {schema}.{table_name}")).scalar()
+        n_columns = conn.execute(text("""
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = :schema AND table_name = :table
+        """), {'schema': schema, 'table': table_name}).scalar()
+    logger.info(f"Validation en base: {len(report.results)} règles en {report.seconds:.2f}s")
+    logger.info(f"Features dbt validées: {schema}.{table_name}, {n_rows} lignes, {n_columns} colonnes")
+    # table reconstruite par dbt: l'artefact colonnaire ne la décrit plus
+    feature_artifact.invalidate()
+    if publish_online:
+        publish(online_frames_from_table(engine, table_name, schema), info={'mode': 'dbt', 'rows': n_rows})
+    return f"Feature Engineering réussi (dbt): {n_rows} lignes, {n_columns} colonnes"
+
+
+def write_features(df: pd.DataFrame, engine, table_name: str = 'features_ml', schema: str = 'staging') -> None:
+    """Valider les features requises puis réécrire staging.features_ml par COPY"""
+    # Validation des features requises (pour usage ML ultérieur)
+    report = validate_features_dataframe(df, REQUIRED_FOR_ML)
+    logger.info(f"Validation: {len(report.results)} règles en {report.seconds * 1000:.1f} ms")
+    
+    # Sauvegarder dans PostgreSQL
+    logger.info(f"Sauvegarde des features dans {schema}.{table_name}...")
+    
+    # Table recréée à partir des types, puis remplie par COPY
+    df.head(0).to_sql(table_name, engine, schema=schema, if_exists='replace', index=False)
+    copy_dataframe(df, table_name, schema=schema, engine=engine)
+    
+    logger.info(f"Features sauvegardées avec succès: {len(df)} lignes")
+
+
+def online_frames_from_facts(df: pd.DataFrame) -> dict:
+    """Features client / région sur tout l'historique de df (entrée du store en ligne)"""
+    store = FeatureStore()
+    store.customers.update(df)
+    store.regions.update(df)
+    return store.entity_frames()
+
+
+def online_frames_from_table(engine, table_name: str = 'features_ml', schema: str = 'staging') -> dict:
+    """Features client / région lues dans staging.features_ml (une ligne par clé)"""
+    frames = {}
+    with engine.connect() as conn:
+        for entity, (key, features) in ENTITIES.items():
+            columns = ', '.join([key] + features)
+            frames[entity] = pd.read_sql(
+                text(f"SELECT DISTINCT ON ({key}) {columns} FROM {schema}.{table_name} ORDER BY {key}"), conn
+            ).set_index(key)
+    return frames
+
+
+def update_feature_store(
+    engine,
+    store_path: str = DEFAULT_STORE_PATH,
+    table_name: str = 'features_ml',
+    schema: str = 'staging',
+    publish_online: bool = True,
+) -> tuple:
+    """
+    Mettre à jour staging.features_ml avec les seules commandes arrivées depuis le dernier passage
+    
+    Le FeatureStore (feature_store.py) persiste les agrégats client / région,
+    les codes des catégories et les seuils de quantiles entre deux exécutions.
+    - 'full' (store absent, rechargement complet ou lignes modifiées, table
+      réécrite entre-temps par un autre mode): la table de faits est relue,
+      le store reconstruit et la table réécrite
+    - 'delta': seules les nouvelles commandes sont lues (via
+      raw_data.load_manifest); leurs lignes sont insérées, et seuls les
+      agrégats des clients / régions touchés et les indicateurs dont le
+      seuil a bougé sont mis à jour en base
+    - 'none': aucun chargement depuis le dernier passage
+    
+    Le store en ligne (online_store.py) est republié depuis les agrégats du
+    store; l'artefact colonnaire (feature_artifact.py) est republié lors d'une
+    reconstruction complète et invalidé par un delta.
+    
+    Retourne (action, lignes lues, lignes de features écrites)
+    """
+    store = load_store(store_path)
+    with engine.connect() as conn:
+        action, last_load = plan_refresh(conn, store.watermark if store else None)
+        if store is not None and action != 'full':
+            # Le commentaire de table identifie la dernière reconstruction par le store
+            comment = conn.execute(
+                text("SELECT obj_description(to_regclass(:table), 'pg_class')"),
+                {'table': f"{schema}.{table_name}"}
+            ).scalar()
+            if comment != store.table_token:
+                logger.info(f"{schema}.{table_name} a été réécrite hors du store: reconstruction complète")
+                action = 'full'
+    
+    if action == 'none':
+        logger.info(f"Features à jour (load_id {last_load}), aucun nouveau chargement")
+        return action, 0, 0
+    
+    if action == 'full':
+        logger.info("Reconstruction complète du feature store...")
+        df = apply_schema(pd.read_sql(FACT_QUERY, engine), FACT_DTYPES)
+        store = FeatureStore()
+        delta = store.update(df, frame_thresholds(df))
+        write_features(delta.rows, engine, table_name, schema)
+        store.table_token = f"feature_store {uuid.uuid4().hex}"
+        with engine.begin() as conn:
+            conn.execute(text(f"COMMENT ON TABLE {schema}.{table_name} IS '{store.table_token}'"))
+        feature_artifact.publish_frame(delta.rows, source={'mode': 'incremental', 'watermark': last_load})
+    else:
+        logger.info(f"Features des commandes chargées après load_id {store.watermark} (jusqu'à {last_load})...")
+        df = apply_schema(
+            pd.read_sql(text(DELTA_QUERY), engine, params={'watermark': store.watermark, 'last_load': last_load}),
+            FACT_DTYPES
+        )
+        with engine.connect() as conn:
+            thresholds = table_thresholds(conn)
+        delta = store.update(df, thresholds)
+        if len(delta.rows):
+            validate_features_dataframe(delta.rows, REQUIRED_FOR_ML)
+        apply_to_table(engine, delta, table_name, schema)
+        logger.info(
+            f"Delta appliqué: {len(delta.rows)} lignes insérées, "
+            f"{len(delta.aggregates['customer_id'])} clients et {len(delta.aggregates['order_region'])} régions "
+            f"mis à jour, {len(delta.thresholds)} seuils déplacés"
+        )
+        # table mise à jour sur place: l'artefact colonnaire ne la décrit plus
+        feature_artifact.invalidate()
+    
+    store.watermark = last_load
+    save_store(store, store_path)
+    if publish_online:
+        publish(store.entity_frames(), info={'mode': 'incremental', 'action': action, 'load_id': last_load})
+    return action, len(df), len(delta.rows)
+
+
+def featurize_partition_task(
+    partition: int,
+    n_partitions: int,
+    state: GlobalFeatureState,
+    quantiles: dict,
+    table_name: str,
+    schema: str,
+    chunksize: int,
+    artifact_path: str,
+) -> dict:
+    """
+    Worker du mode 'partitioned': lire une partition de customer_id par curseur
+    serveur, calculer ses features et les écrire par COPY dès qu'elles sont prêtes,
+    ainsi que dans un fichier de l'artefact colonnaire en cours (artifact_path)
+    
+    Retourne le nombre de lignes, les durées et les features client de la
+    partition (pour le store en ligne).
+    """
+    t0 = time.perf_counter()
+    engine = get_db_connection()
+    query = f"{FACT_QUERY}WHERE {partition_filter_sql(n_partitions)}"
+    chunks = list(read_sql_chunks(query, engine, chunksize=chunksize, params={'partition': partition}))
+    if not chunks:
+        return {'partition': partition, 'rows': 0, 'read_seconds': 0.0, 'write_seconds': 0.0, 'customers': None}
+    df = apply_schema(pd.concat(chunks, ignore_index=True), FACT_DTYPES)
+    del chunks
+    t1 = time.perf_counter()
+    
+    # Types fixés par FEATURES_ML_DTYPES: une partition avec des NULL dans une
+    # colonne entière garde le type de la table (Int nullable, pas float64)
+    df = conform_frame(featurize_partition(df, state, quantiles), FEATURES_ML_DTYPES)
+    copy_dataframe(df, table_name, schema=schema, engine=engine)
+    feature_artifact.write_part(df, artifact_path, f"part-{partition:05d}")
+    customers = df.dropna(subset=['customer_id']).drop_duplicates('customer_id').set_index('customer_id')
+    return {
+        'partition': partition,
+        'rows': len(df),
+        'read_seconds': t1 - t0,
+        'write_seconds': time.perf_counter() - t1,
+        'customers': customers[ENTITIES['customer'][1]].astype(np.float64),
+    }
+
+
+def create_partitioned_features(
+    engine,
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+    workers: int = None,
+    table_name: str = 'features_ml',
+    schema: str = 'staging',
+    publish_online: bool = True,
+) -> tuple:
+    """
+    Feature engineering hors mémoire, par partitions de hachage de customer_id
+    
+    1. Un échantillon mesure la taille en mémoire d'une ligne de faits
+    2. Première passe en flux (curseur serveur, colonnes utiles seulement):
+       sketches de quantiles, codes des catégories et agrégats région
+       globaux (feature_partitions.GlobalFeatureState)
+    3. Le nombre de partitions est choisi pour que `workers` partitions
+       traitées en même temps tiennent dans memory_budget_mb
+    4. Un pool de processus calcule chaque partition et l'écrit par COPY
+       dans une table de staging dès qu'elle est prête, aux types de
+       FEATURES_ML_DTYPES (table créée depuis ce schéma, pas depuis l'échantillon)
+    5. Validation en base puis bascule atomique vers staging.features_ml;
+       les fichiers de partitions forment l'artefact colonnaire publié
+    
+    Chaque partition est lue par son propre parcours de fct_supply_chain
+    (filtre sur le hachage de customer_id): le coût de lecture croît comme
+    n_partitions × table, d'où un budget mémoire aussi large que possible
+    (voir feature_partitions.partitions_for_budget).
+    
+    Retourne (lignes écrites, nombre de partitions)
+    """
+    workers = workers or os.cpu_count() or 1
+    staging_table = f'{table_name}_partitions'
+    
+    sample = apply_schema(pd.read_sql(text(f"{FACT_QUERY}LIMIT 10000"), engine), FACT_DTYPES)
+    row_bytes = sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+    # lots de lecture: une fraction du budget d'un worker
+    chunksize = int(min(100000, max(1000, memory_budget_mb * 1e6 / workers / FEATURE_EXPANSION / 4 / row_bytes)))
+    
+    with engine.connect() as conn:
+        _, watermark = plan_refresh(conn, None)
+    
+    t0 = time.perf_counter()
+    state = GlobalFeatureState()
+    for chunk in read_sql_chunks(GLOBAL_QUERY, engine, chunksize=chunksize):
+        state.update(apply_schema(chunk, FACT_DTYPES))
+    quantiles = state.quantiles()
+    n_partitions = partitions_for_budget(state.n_rows, row_bytes, memory_budget_mb, workers)
+    logger.info(
+        f"Première passe: {state.n_rows} lignes en {time.perf_counter() - t0:.2f}s, "
+        f"seuils {quantiles}, {row_bytes:.0f} octets/ligne -> {n_partitions} partitions, {workers} workers"
+    )
+    
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{staging_table}"))
+    # Table créée aux types déclarés des features: ceux de l'échantillon dépendent
+    # de ses NULL (une colonne entière avec des NULL y serait float64)
+    empty_frame(FEATURES_ML_DTYPES).to_sql(staging_table, engine, schema=schema, index=False)
+    del sample
+    artifact_path = feature_artifact.begin()
+    
+    try:
+        customers = []
+        n_rows = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    featurize_partition_task, partition, n_partitions, state, quantiles,
+                    staging_table, schema, chunksize, artifact_path,
+                )
+                for partition in range(n_partitions)
+            ]
+            for done, future in enumerate(as_completed(futures), start=1):
+                result = future.result()
+                n_rows += result['rows']
+                if result['customers'] is not None:
+                    customers.append(result['customers'])
+                logger.info(
+                    f"Partition {result['partition']} écrite ({done}/{n_partitions}): {result['rows']} lignes, "
+                    f"lecture {result['read_seconds']:.2f}s, calcul + COPY {result['write_seconds']:.2f}s"
+                )
+        
+        with engine.begin() as conn:
+            report = validate_raw_table(conn, staging_table, schema=schema, rules=feature_rules(REQUIRED_FOR_ML))
+            logger.info(f"Validation en base: {len(report.results)} règles en {report.seconds:.2f}s")
+            conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{table_name}"))
+            conn.execute(text(f"ALTER TABLE {schema}.{staging_table} RENAME TO {table_name}"))
+        feature_artifact.commit(artifact_path, source={'mode': 'partitioned', 'watermark': watermark})
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{staging_table}"))
+        shutil.rmtree(artifact_path, ignore_errors=True)
+    
+    if publish_online:
+        frames = {
+            'customer': pd.concat(customers).rename_axis('customer_id'),
+            'region': state.regions.features(state.regions.stats.index),
+        }
+        publish(frames, info={'mode': 'partitioned', 'rows': n_rows, 'partitions': n_partitions})
+    return n_rows, n_partitions
+
+
+@track_db_usage
+def create_features(
+    mode: str = 'pandas',
+    point_in_time: bool = False,
+    publish_online: bool = True,
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+    workers: int = None,
+):
     """
     Créer des features pour le Machine Learning
+    
+    mode:
+    - 'pandas' (par défaut): lecture de la table de faits, calcul en Python
+      (feature_kernels) puis écriture de staging.features_ml par COPY
+    - 'dbt': staging.features_ml est déjà construite dans PostgreSQL par le
+      modèle dbt models/features/features_ml.sql (dbt run); seule la
+      validation reste, elle aussi exécutée en base
+    - 'incremental': feature store persistant, seules les nouvelles
+      commandes sont traitées (voir update_feature_store)
+    - 'partitioned': hors mémoire, par partitions de customer_id calculées
+      en parallèle sous un budget mémoire memory_budget_mb (voir
+      create_partitioned_features); seuils approchés par sketch
+    
+    point_in_time=True (mode 'pandas'): les agrégats client / région de
+    chaque commande ne portent que sur les commandes antérieures à sa date
+    (point_in_time.py), sans fuite du futur pour l'entraînement
+    
+    Les modes 'pandas' et 'partitioned' publient aussi les features en
+    artefact colonnaire Arrow (feature_artifact.py) relu par ml_modeling
+    sans repasser par PostgreSQL; les autres modes l'invalident.
+    
+    publish_online=True publie en fin d'exécution une nouvelle version du
+    store en ligne (online_store.py): features client / région sur tout
+    l'historique, en tableaux mappés en mémoire pour le scoring temps réel
     """
     try:
         engine = get_db_connection()
-        create_staging_schema(engine)
         
-        # Lire les données depuis la table de faits dbt
-        logger.info("Lecture des données depuis analytics_marts.fct_supply_chain...")
-        query = """
-        SELECT 
-            order_id,
-            order_item_id,
-            order_date,
-            customer_id,
-            order_year,
-            order_month,
-            order_quarter,
-            order_day,
-            days_for_shipping_real,
-            days_for_shipment_scheduled,
-            shipping_delay_days,
-            late_delivery_risk,
-            delivery_status,
-            order_region,
-            order_country,
-            market,
-            sales,
-            order_profit_per_order,
-            benefit_per_order,
-            is_on_time,
-            is_profitable,
-            performance_score
-        FROM analytics_marts.fct_supply_chain
-        """
+        if mode == 'dbt':
+            return check_dbt_features(engine, publish_online=publish_online)
         
-        df = pd.read_sql(query, engine)
-        logger.info(f"Données chargées: {len(df)} lignes")
+        if mode == 'incremental':
+            create_staging_schema(engine)
+            action, n_read, n_written = update_feature_store(engine, publish_online=publish_online)
+            return f"Feature Engineering réussi ({action}): {n_read} lignes lues, {n_written} lignes de features écrites"
         
-        # ===== FEATURE ENGINEERING =====
+        if mode == 'partitioned':
+            create_staging_schema(engine)
+            n_rows, n_partitions = create_partitioned_features(
+                engine, memory_budget_mb, workers, publish_online=publish_online
+            )
+            return f"Feature Engineering réussi (partitioned): {n_rows} lignes, {n_partitions} partitions"
         
-        # 1. Features temporelles avancées
-        df['is_weekend'] = df['order_date'].apply(
-            lambda x: 1 if pd.to_datetime(x).dayofweek >= 5 else 0
-        )
+        create_staging_schema(engine)
         
-        df['days_since_year_start'] = df['order_date'].apply(
-            lambda x: pd.to_datetime(x).timetuple().tm_yday
-        )
+        # Dernier chargement couvert par les faits lus (filigrane de l'artefact)
+        with engine.connect() as conn:
+            _, watermark = plan_refresh(conn, None)
         
-        df['is_end_of_month'] = df['order_date'].apply(
-            lambda x: 1 if pd.to_datetime(x).day > 25 else 0
-        )
+        # Lire les données depuis la table de faits dbt
+        logger.info("Lecture des données depuis analytics_marts.fct_supply_chain...")
         
-        df['is_beginning_of_month'] = df['order_date'].apply(
-            lambda x: 1 if pd.to_datetime(x).day <= 5 else 0
+        df = apply_schema(pd.read_sql(FACT_QUERY, engine), FACT_DTYPES)
+        logger.info(
+            f"Données chargées: {len(df)} lignes, "
+            f"{df.memory_usage(deep=True).sum() / 1e6:.1f} Mo en mémoire"
         )
         
-        # 2. Features financières dérivées
-        df['revenue_per_shipping_day'] = df['sales'] / (df['days_for_shipping_real'] + 1)
-        df['profit_margin'] = (df['order_profit_per_order'] / df['sales'].replace(0, np.nan)) * 100
-        df['profit_margin'] = df['profit_margin'].fillna(0)
-        
-        # 3. Features de catégorisation
-        df['is_high_value_order'] = (df['sales'] > df['sales'].quantile(0.75)).astype(int)
-        df['is_low_value_order'] = (df['sales'] < df['sales'].quantile(0.25)).astype(int)
-        
-        df['is_highly_profitable'] = (
-            df['order_profit_per_order'] > df['order_profit_per_order'].quantile(0.75)
-        ).astype(int)
-        
-        # 4. Features de délai
-        df['delay_vs_scheduled'] = df['shipping_delay_days'] / (df['days_for_shipment_scheduled'] + 1)
-        df['is_severe_delay'] = (df['shipping_delay_days'] > 7).astype(int)
-        
-        # 5. Encodage des variables catégorielles
-        df['delivery_status_encoded'] = pd.factorize(df['delivery_status'])[0]
-        df['market_encoded'] = pd.factorize(df['market'])[0]
-        df['order_region_encoded'] = pd.factorize(df['order_region'])[0]
-        df['performance_score_encoded'] = pd.factorize(df['performance_score'])[0]
-        
-        # 6. Features d'agrégation par client
-        customer_stats = df.groupby('customer_id').agg({
-            'order_id': 'count',
-            'sales': ['sum', 'mean'],
-            'late_delivery_risk': 'mean'
-        }).reset_index()
-        
-        customer_stats.columns = [
-            'customer_id', 
-            'customer_total_orders',
-            'customer_total_sales',
-            'customer_avg_order_value',
-            'customer_late_delivery_rate'
-        ]
-        
-        df = df.merge(customer_stats, on='customer_id', how='left')
-        
-        # 7. Features d'agrégation par région
-        region_stats = df.groupby('order_region').agg({
-            'late_delivery_risk': 'mean',
-            'sales': 'mean'
-        }).reset_index()
-        
-        region_stats.columns = [
-            'order_region',
-            'region_late_delivery_rate',
-            'region_avg_sales'
-        ]
-        
-        df = df.merge(region_stats, on='order_region', how='left')
-        
-        # 8. Interaction features
-        df['high_value_late_risk'] = df['is_high_value_order'] * df['late_delivery_risk']
-        df['market_season_interaction'] = df['market_encoded'] * df['order_quarter']
-        
+        # ===== FEATURE ENGINEERING =====
+        # Noyaux vectorisés (feature_kernels.KERNELS): dates converties une
+        # seule fois, masques NumPy, agrégats client/région par transform,
+        # chaque feature typée selon son noyau
+        start = time.perf_counter()
+        df = compute_features(df, overrides=asof_overrides(df) if point_in_time else None)
+        logger.info(f"Features calculées en {time.perf_counter() - start:.2f}s")
         logger.info(f"Features créées: {len(df.columns)} colonnes au total")
 
-        # Validation des features requises (pour usage ML ultérieur)
-        required_for_ml: List[str] = [
-            'order_month', 'order_quarter', 'order_day', 'order_year',
-            'days_for_shipment_scheduled', 'is_weekend', 'days_since_year_start',
-            'is_end_of_month', 'is_beginning_of_month', 'market_encoded',
-            'order_region_encoded', 'customer_total_orders', 'customer_avg_order_value',
-            'region_avg_sales', 'customer_late_delivery_rate', 'region_late_delivery_rate',
-            'is_high_value_order', 'profit_margin'
-        ]
-        validate_features_dataframe(df, required_for_ml)
-        
-        # Sauvegarder dans PostgreSQL
-        table_name = 'features_ml'
-        logger.info(f"Sauvegarde des features dans staging.{table_name}...")
-        
-        df.to_sql(
-            table_name,
-            engine,
-            schema='staging',
-            if_exists='replace',
-            index=False,
-            method='multi',
-            chunksize=1000
+        write_features(df, engine)
+        feature_artifact.publish_frame(
+            df, source={'mode': 'pandas', 'watermark': watermark, 'point_in_time': point_in_time}
         )
-        
-        logger.info(f"Features sauvegardées avec succès: {len(df)} lignes")
+        if publish_online:
+            publish(online_frames_from_facts(df), info={'mode': 'pandas', 'point_in_time': point_in_time, 'rows': len(df)})
         
         # Statistiques
         logger.info(f"Nombre de features: {len(df.columns)}")
         logger.info(f"Features numériques: {df.select_dtypes(include=[np.number]).shape[1]}")
-        logger.info(f"Features catégorielles: {df.select_dtypes(include=['object']).shape[1]}")
+        logger.info(f"Features catégorielles: {df.select_dtypes(include=['object', 'category']).shape[1]}")
         
         return f"Feature Engineering réussi: {len(df)} lignes, {len(df.columns)} colonnes"
         
@@ -204,5 +500,22 @@ def create_features():
 
 
 if __name__ == "__main__":
-    result = create_features()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Feature engineering vers staging.features_ml")
+    parser.add_argument('--mode', choices=['pandas', 'dbt', 'incremental', 'partitioned'], default='pandas')
+    parser.add_argument('--point-in-time', action='store_true', help="agrégats client/région à la date de chaque commande")
+    parser.add_argument('--no-online', action='store_true', help="ne pas publier le store de features en ligne")
+    parser.add_argument('--memory-budget-mb', type=float, default=DEFAULT_MEMORY_BUDGET_MB,
+                        help="budget mémoire du mode partitioned (Mo)")
+    parser.add_argument('--workers', type=int, default=None, help="processus du mode partitioned")
+    args = parser.parse_args()
+    
+    result = create_features(
+        mode=args.mode,
+        point_in_time=args.point_in_time,
+        publish_online=not args.no_online,
+        memory_budget_mb=args.memory_budget_mb,
+        workers=args.workers,
+    )
     print(result)
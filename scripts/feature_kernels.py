@@ -0,0 +1,226 @@
+"""
+Noyaux vectorisés des features derrière feature_engineering.create_features
+
+Un noyau calcule une colonne de feature sur des colonnes entières à la fois
+(accesseurs `.dt`, masques NumPy, transformations par groupe) au lieu d'un
+`.apply` ligne par ligne. Il déclare les colonnes qu'il lit et le type de
+sa sortie. Les noyaux sont enregistrés dans l'ordre des colonnes produites
+et peuvent lire les sorties des noyaux précédents. Les valeurs partagées
+par plusieurs noyaux (dates de commande analysées, seuils de quantiles,
+objets groupby) sont calculées une fois par DataFrame par un KernelContext.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from dataco_schema import apply_schema
+
+logger = logging.getLogger(__name__)
+
+
+class KernelContext:
+    """
+    Accès en lecture au DataFrame en cours de calcul, et valeurs dérivées partagées
+    
+    `quantiles` fournit des seuils {(colonne, q): valeur} à l'avance, par
+    exemple des seuils globaux quand le DataFrame n'est qu'une partie des données.
+    """
+
+    def __init__(self, df: pd.DataFrame, quantiles: dict[tuple[str, float], float] | None = None) -> None:
+        self.df = df
+        self.quantiles = dict(quantiles or {})
+        self._groups: dict[str, object] = {}
+
+    def __getitem__(self, column: str) -> pd.Series:
+        return self.df[column]
+
+    @cached_property
+    def order_date(self):
+        """Accesseur `.dt` de order_date, converti une fois pour tous les noyaux de dates"""
+        return pd.to_datetime(self.df["order_date"]).dt
+
+    def quantile(self, column: str, q: float) -> float:
+        key = (column, q)
+        if key not in self.quantiles:
+            self.quantiles[key] = self.df[column].quantile(q)
+        return self.quantiles[key]
+
+    def groupby(self, key: str):
+        if key not in self._groups:
+            self._groups[key] = self.df.groupby(key, observed=True)
+        return self._groups[key]
+
+
+@dataclass(frozen=True)
+class FeatureKernel:
+    name: str
+    inputs: tuple[str, ...]
+    dtype: str
+    compute: Callable[[KernelContext], "pd.Series | np.ndarray"]
+
+
+# nom de la feature -> noyau, dans l'ordre des colonnes produites
+KERNELS: dict[str, FeatureKernel] = {}
+
+
+def kernel(name: str, inputs: tuple[str, ...], dtype: str):
+    """Enregistrer la fonction décorée comme noyau de la feature `name`"""
+
+    def register(func: Callable[[KernelContext], "pd.Series | np.ndarray"]):
+        if name in KERNELS:
+            raise ValueError(f"Noyau de feature {name} enregistré deux fois")
+        KERNELS[name] = FeatureKernel(name, tuple(inputs), dtype, func)
+        return func
+
+    return register
+
+
+def compute_features(
+    df: pd.DataFrame,
+    names: list[str] | None = None,
+    quantiles: dict[tuple[str, float], float] | None = None,
+    overrides: dict[str, Callable[[KernelContext], "pd.Series | np.ndarray"]] | None = None,
+) -> pd.DataFrame:
+    """
+    Ajouter sur place les features `names` (par défaut: toutes celles enregistrées) à `df` et le retourner
+    
+    Chaque sortie est convertie au type de son noyau dès son calcul: aucune
+    colonne intermédiaire large ne survit à son noyau. `overrides` remplace
+    le calcul de certains noyaux (par exemple les agrégats tenus par
+    feature_store), en gardant leur type et leur position.
+    """
+    overrides = overrides or {}
+    kernels = list(KERNELS.values()) if names is None else [KERNELS[name] for name in names]
+    ctx = KernelContext(df, quantiles)
+    for k in kernels:
+        missing = [c for c in k.inputs if c not in df.columns]
+        if missing:
+            raise KeyError(f"La feature {k.name} demande des colonnes absentes: {missing}")
+        start = time.perf_counter()
+        values = overrides.get(k.name, k.compute)(ctx)
+        df[k.name] = values.to_numpy() if isinstance(values, pd.Series) else values
+        apply_schema(df, {k.name: k.dtype})
+        logger.debug("Noyau %s: %.1f ms", k.name, (time.perf_counter() - start) * 1000)
+    return df
+
+
+# 1. Features temporelles
+@kernel("is_weekend", ("order_date",), "int8")
+def _is_weekend(ctx):
+    return ctx.order_date.dayofweek >= 5
+
+
+@kernel("days_since_year_start", ("order_date",), "int16")
+def _days_since_year_start(ctx):
+    return ctx.order_date.dayofyear
+
+
+@kernel("is_end_of_month", ("order_date",), "int8")
+def _is_end_of_month(ctx):
+    return ctx.order_date.day > 25
+
+
+@kernel("is_beginning_of_month", ("order_date",), "int8")
+def _is_beginning_of_month(ctx):
+    return ctx.order_date.day <= 5
+
+
+# 2. Features financières
+@kernel("revenue_per_shipping_day", ("sales", "days_for_shipping_real"), "float32")
+def _revenue_per_shipping_day(ctx):
+    return ctx["sales"] / (ctx["days_for_shipping_real"] + 1)
+
+
+@kernel("profit_margin", ("order_profit_per_order", "sales"), "float32")
+def _profit_margin(ctx):
+    return ((ctx["order_profit_per_order"] / ctx["sales"].replace(0, np.nan)) * 100).fillna(0)
+
+
+# 3. Catégorisation par quantiles
+@kernel("is_high_value_order", ("sales",), "int8")
+def _is_high_value_order(ctx):
+    return ctx["sales"] > ctx.quantile("sales", 0.75)
+
+
+@kernel("is_low_value_order", ("sales",), "int8")
+def _is_low_value_order(ctx):
+    return ctx["sales"] < ctx.quantile("sales", 0.25)
+
+
+@kernel("is_highly_profitable", ("order_profit_per_order",), "int8")
+def _is_highly_profitable(ctx):
+    return ctx["order_profit_per_order"] > ctx.quantile("order_profit_per_order", 0.75)
+
+
+# 4. Délais
+@kernel("delay_vs_scheduled", ("shipping_delay_days", "days_for_shipment_scheduled"), "float32")
+def _delay_vs_scheduled(ctx):
+    return ctx["shipping_delay_days"] / (ctx["days_for_shipment_scheduled"] + 1)
+
+
+@kernel("is_severe_delay", ("shipping_delay_days",), "int8")
+def _is_severe_delay(ctx):
+    return ctx["shipping_delay_days"] > 7
+
+
+# 5. Encodage des catégories (codes dans l'ordre d'apparition)
+ENCODED_COLUMNS = ("delivery_status", "market", "order_region", "performance_score")
+
+
+def _register_encoding(column: str) -> None:
+    kernel(f"{column}_encoded", (column,), "int8")(lambda ctx: pd.factorize(ctx[column])[0])
+
+
+for _column in ENCODED_COLUMNS:
+    _register_encoding(_column)
+
+
+# 6. Agrégats par client
+@kernel("customer_total_orders", ("customer_id", "order_id"), "int32")
+def _customer_total_orders(ctx):
+    return ctx.groupby("customer_id")["order_id"].transform("count")
+
+
+@kernel("customer_total_sales", ("customer_id", "sales"), "float64")
+def _customer_total_sales(ctx):
+    return ctx.groupby("customer_id")["sales"].transform("sum")
+
+
+@kernel("customer_avg_order_value", ("customer_id", "sales"), "float32")
+def _customer_avg_order_value(ctx):
+    return ctx.groupby("customer_id")["sales"].transform("mean")
+
+
+@kernel("customer_late_delivery_rate", ("customer_id", "late_delivery_risk"), "float32")
+def _customer_late_delivery_rate(ctx):
+    return ctx.groupby("customer_id")["late_delivery_risk"].transform("mean")
+
+
+# 7. Agrégats par région
+@kernel("region_late_delivery_rate", ("order_region", "late_delivery_risk"), "float32")
+def _region_late_delivery_rate(ctx):
+    return ctx.groupby("order_region")["late_delivery_risk"].transform("mean")
+
+
+@kernel("region_avg_sales", ("order_region", "sales"), "float32")
+def _region_avg_sales(ctx):
+    return ctx.groupby("order_region")["sales"].transform("mean")
+
+
+# 8. Interactions
+@kernel("high_value_late_risk", ("is_high_value_order", "late_delivery_risk"), "int8")
+def _high_value_late_risk(ctx):
+    return ctx["is_high_value_order"] * ctx["late_delivery_risk"]
+
+
+@kernel("market_season_interaction", ("market_encoded", "order_quarter"), "int8")
+def _market_season_interaction(ctx):
+    return ctx["market_encoded"] * ctx["order_quarter"]
@@ -0,0 +1,127 @@
+"""
+Feature engineering hors mémoire sur des partitions par hachage de customer_id
+
+La table de faits est traitée en deux passes, dont aucune ne la garde
+entièrement en mémoire:
+
+1. Une passe en flux sur des blocs étroits construit un GlobalFeatureState:
+   un QuantileSketch par colonne à seuil, les codes des catégories dans
+   leur ordre d'apparition (comme pd.factorize les attribue sur toute la
+   table) et les agrégats courants par région. Le tout tient en quelques Ko.
+2. Chaque partition (les lignes dont le hachage de customer_id y mène) est
+   calculée seule. Les agrégats par client sont exacts dans une partition,
+   puisqu'un client n'est jamais réparti sur deux; les seuils, encodages et
+   agrégats par région viennent de l'état global (featurize_partition).
+
+Avec des seuils exacts, l'union des partitions est égale à compute_features
+sur toute la table; avec le sketch, seuls diffèrent les indicateurs des
+valeurs à moins de l'erreur de rang du sketch d'un seuil.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from feature_kernels import ENCODED_COLUMNS, compute_features
+from feature_store import THRESHOLD_FLAGS, RunningAggregates, _key_values, region_features
+from sketches import QuantileSketch
+
+PARTITION_KEY = "customer_id"
+
+# Colonnes lues par la première passe
+GLOBAL_COLUMNS = tuple(dict.fromkeys(
+    ["order_id", "order_region", "sales", "late_delivery_risk"]
+    + [column for column, _, _ in THRESHOLD_FLAGS.values()]
+    + list(ENCODED_COLUMNS)
+))
+
+# Pic mémoire du calcul d'une partition, en multiple de la taille en mémoire
+# de ses lignes de faits (blocs concaténés, colonnes de features, tampons groupby)
+FEATURE_EXPANSION = 4.0
+
+
+@dataclass
+class GlobalFeatureState:
+    """Ce dont chaque partition a besoin de toute la table, construit en une passe en flux"""
+
+    sketch_k: int = 2000
+    sketches: dict[str, QuantileSketch] = field(default_factory=dict)
+    codes: dict[str, list] = field(default_factory=lambda: {c: [] for c in ENCODED_COLUMNS})
+    regions: RunningAggregates = field(default_factory=lambda: RunningAggregates("order_region", region_features))
+    n_rows: int = 0
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Intégrer un bloc de lignes de faits (au moins GLOBAL_COLUMNS)"""
+        for column, _, _ in THRESHOLD_FLAGS.values():
+            if column not in self.sketches:
+                self.sketches[column] = QuantileSketch(self.sketch_k, seed=0)
+        for column, sketch in self.sketches.items():
+            sketch.add(chunk[column].to_numpy(dtype=np.float64, na_value=np.nan))
+        for column in ENCODED_COLUMNS:
+            known = set(self.codes[column])
+            self.codes[column] += [v for v in pd.unique(_key_values(chunk[column])) if pd.notna(v) and v not in known]
+        self.regions.update(chunk)
+        self.n_rows += len(chunk)
+
+    def quantiles(self) -> dict[tuple[str, float], float]:
+        """Seuils approchés de THRESHOLD_FLAGS, tirés des sketches"""
+        return {
+            (column, q): float(self.sketches[column].quantiles([q])[0])
+            for column, q, _ in THRESHOLD_FLAGS.values()
+        }
+
+    def overrides(self) -> dict:
+        """Remplacements de compute_features pour les features qui dépendent des autres partitions"""
+        overrides = {}
+        for column in ENCODED_COLUMNS:
+            codes = pd.Index(self.codes[column], dtype=object)
+            overrides[column + "_encoded"] = lambda ctx, c=column, codes=codes: codes.get_indexer(_key_values(ctx[c]))
+        if self.regions.stats is not None:
+            features = self.regions.features(self.regions.stats.index)
+            for name in features.columns:
+                overrides[name] = lambda ctx, name=name: self.regions.lookup(features, name, ctx["order_region"])
+        return overrides
+
+
+def featurize_partition(
+    df: pd.DataFrame,
+    state: GlobalFeatureState,
+    quantiles: dict[tuple[str, float], float] | None = None,
+) -> pd.DataFrame:
+    """
+    compute_features sur une partition de customer_id, avec les seuils, codes et agrégats par région globaux
+    
+    `quantiles` vaut par défaut les seuils des sketches de `state`.
+    """
+    return compute_features(df, quantiles=quantiles or state.quantiles(), overrides=state.overrides())
+
+
+def partition_filter_sql(n_partitions: int, column: str = PARTITION_KEY) -> str:
+    """Clause WHERE sélectionnant la partition :partition parmi `n_partitions` (les clés NULL vont en partition 0)"""
+    # hashint8 est dans [-2**31, 2**31): décalé pour être positif avant le modulo
+    return f"mod(hashint8(COALESCE({column}, 0)::bigint)::bigint + 2147483648, {int(n_partitions)}) = :partition"
+
+
+def partitions_for_budget(
+    n_rows: int,
+    row_bytes: float,
+    memory_budget_mb: float,
+    workers: int,
+    expansion: float = FEATURE_EXPANSION,
+) -> int:
+    """
+    Nombre de partitions gardant `workers` partitions simultanées dans le budget mémoire
+    
+    Au moins une partition par worker, pour que chaque worker en ait une.
+    Chaque partition est lue par son propre parcours de la table source
+    (partition_filter_sql filtre, il n'indexe pas): la lecture coûte donc
+    n_partitions parcours complets, et un budget plus grand signifie moins
+    de partitions et moins de parcours.
+    """
+    per_worker = memory_budget_mb * 1e6 / max(workers, 1)
+    needed = math.ceil(n_rows * row_bytes * expansion / per_worker) if per_worker > 0 else n_rows
+    return max(needed, workers, 1)
@@ -0,0 +1,310 @@
+"""
+Feature store incrémental derrière staging.features_ml
+
+Un FeatureStore garde, d'une exécution à l'autre, ce dont les features à
+état ont besoin:
+- les agrégats courants par customer_id et par order_region (nombre de
+  lignes, nombre et somme des ventes, nombre et somme des retards), d'où
+  sont dérivées les features customer_* et region_*,
+- les codes de catégories attribués jusqu'ici (un code existant ne change
+  jamais, une nouvelle valeur prend le code suivant, dans l'ordre
+  d'apparition comme pd.factorize),
+- les seuils de quantiles avec lesquels les indicateurs ont été calculés,
+- le watermark de raw_data.load_runs qu'il couvre.
+
+update(nouvelles_lignes, seuils) intègre les commandes arrivées et retourne
+un FeatureDelta: les lignes de features des nouvelles commandes, les
+agrégats rafraîchis des seuls clients et régions touchés, et les seuils
+qui ont bougé. Un delta s'applique à un DataFrame de features
+(apply_to_frame) ou à la table staging.features_ml (apply_to_table) sans
+recalculer les lignes non touchées. Une reconstruction complète est un
+store neuf mis à jour avec toutes les lignes; les deux chemins produisent
+la même table (aux arrondis flottants des sommes près).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import pickle
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from dataco_schema import FACT_DTYPES, FEATURES_ML_DTYPES, apply_schema, conform_frame
+from db import copy_chunk
+from feature_kernels import ENCODED_COLUMNS, KERNELS, compute_features
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+DEFAULT_STORE_PATH = os.getenv(
+    "FEATURE_STORE_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "ml_models", "feature_store.pkl"),
+)
+
+# Indicateurs calculés contre un seuil de quantile: nom -> (colonne, q, opérateur),
+# comme dans feature_kernels; high_value_late_risk dérive de is_high_value_order
+THRESHOLD_FLAGS = {
+    "is_high_value_order": ("sales", 0.75, ">"),
+    "is_low_value_order": ("sales", 0.25, "<"),
+    "is_highly_profitable": ("order_profit_per_order", 0.75, ">"),
+}
+DERIVED_FLAGS = ["high_value_late_risk"]
+
+
+def customer_features(stats: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        "customer_total_orders": stats["orders"],
+        "customer_total_sales": stats["sales_sum"],
+        "customer_avg_order_value": stats["sales_sum"] / stats["sales_n"],
+        "customer_late_delivery_rate": stats["late_sum"] / stats["late_n"],
+    })
+
+
+def region_features(stats: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        "region_late_delivery_rate": stats["late_sum"] / stats["late_n"],
+        "region_avg_sales": stats["sales_sum"] / stats["sales_n"],
+    })
+
+
+def _key_values(s: pd.Series) -> pd.Series:
+    """Clés de groupe comparables d'un DataFrame à l'autre (les catégories deviennent des valeurs simples)"""
+    return s.astype(object) if isinstance(s.dtype, pd.CategoricalDtype) else s
+
+
+@dataclass
+class RunningAggregates:
+    """Sommes fusionnables par clé derrière un groupe de features agrégées"""
+
+    key: str
+    derive: Callable[[pd.DataFrame], pd.DataFrame]
+    stats: pd.DataFrame | None = None
+
+    def update(self, df: pd.DataFrame) -> pd.Index:
+        """Intégrer des lignes et retourner les clés touchées (les lignes à clé NULL ne sont pas agrégées)"""
+        values = pd.DataFrame({
+            "orders": df["order_id"].notna(),
+            "sales_n": df["sales"].notna(),
+            "sales_sum": df["sales"].astype(np.float64).fillna(0),
+            "late_n": df["late_delivery_risk"].notna(),
+            "late_sum": df["late_delivery_risk"].astype(np.float64).fillna(0),
+        }).astype(np.float64)
+        grouped = values.groupby(_key_values(df[self.key]).to_numpy()).sum()
+        self.stats = grouped if self.stats is None else self.stats.add(grouped, fill_value=0)
+        return grouped.index
+
+    def features(self, keys: pd.Index) -> pd.DataFrame:
+        features = self.derive(self.stats.loc[keys])
+        features.index.name = self.key
+        return features
+
+    def lookup(self, features: pd.DataFrame, name: str, keys: pd.Series) -> np.ndarray:
+        return features[name].reindex(_key_values(keys)).to_numpy()
+
+
+@dataclass
+class FeatureDelta:
+    # lignes de features des nouvelles commandes
+    rows: pd.DataFrame
+    # colonne clé -> features agrégées rafraîchies des clés touchées (indexées par clé)
+    aggregates: dict[str, pd.DataFrame]
+    # seuils déplacés: (colonne, q) -> (ancien, nouveau)
+    thresholds: dict[tuple[str, float], tuple[float, float]]
+
+
+@dataclass
+class FeatureStore:
+    customers: RunningAggregates = field(default_factory=lambda: RunningAggregates("customer_id", customer_features))
+    regions: RunningAggregates = field(default_factory=lambda: RunningAggregates("order_region", region_features))
+    codes: dict[str, list] = field(default_factory=lambda: {c: [] for c in ENCODED_COLUMNS})
+    quantiles: dict[tuple[str, float], float] = field(default_factory=dict)
+    n_rows: int = 0
+    # dernier raw_data.load_runs.load_id inclus, None si inconnu
+    watermark: int | None = None
+    # commentaire posé sur la table de features à la dernière reconstruction (détecte les réécritures par les autres modes)
+    table_token: str | None = None
+    version: int = STORE_VERSION
+
+    def _encode(self, column: str, values: pd.Series) -> np.ndarray:
+        return pd.Index(self.codes[column], dtype=object).get_indexer(_key_values(values))
+
+    def entity_frames(self) -> dict[str, pd.DataFrame]:
+        """Features actuelles par client et par région sur toutes les lignes intégrées (entrée d'online_store)"""
+        return {
+            "customer": self.customers.features(self.customers.stats.index),
+            "region": self.regions.features(self.regions.stats.index),
+        }
+
+    def update(self, df: pd.DataFrame, quantiles: dict[tuple[str, float], float]) -> FeatureDelta:
+        """
+        Intégrer de nouvelles lignes de faits et retourner ce qui change dans la table de features
+        
+        `quantiles` sont les seuils sur toutes les lignes, nouvelles comprises
+        (voir frame_thresholds / table_thresholds).
+        """
+        for column in ENCODED_COLUMNS:
+            known = set(self.codes[column])
+            self.codes[column] += [v for v in pd.unique(_key_values(df[column])) if pd.notna(v) and v not in known]
+
+        aggregates = {}
+        overrides = {column + "_encoded": (lambda ctx, c=column: self._encode(c, ctx[c])) for column in ENCODED_COLUMNS}
+        for agg in (self.customers, self.regions):
+            features = agg.features(agg.update(df))
+            aggregates[agg.key] = features
+            for name in features.columns:
+                overrides[name] = lambda ctx, agg=agg, features=features, name=name: agg.lookup(features, name, ctx[agg.key])
+
+        moved = {
+            key: (self.quantiles[key], value) for key, value in quantiles.items()
+            if key in self.quantiles and self.quantiles[key] != value
+        }
+        self.quantiles = dict(quantiles)
+        self.n_rows += len(df)
+
+        rows = compute_features(df.copy(), quantiles=self.quantiles, overrides=overrides)
+        return FeatureDelta(rows, aggregates, moved)
+
+
+def frame_thresholds(df: pd.DataFrame) -> dict[tuple[str, float], float]:
+    """Seuils de quantiles de THRESHOLD_FLAGS sur un DataFrame contenant toutes les lignes"""
+    return {(column, q): df[column].quantile(q) for column, q, _ in THRESHOLD_FLAGS.values()}
+
+
+def table_thresholds(conn, table_name: str = "fct_supply_chain", schema: str = "analytics_marts") -> dict:
+    """Mêmes seuils calculés dans PostgreSQL (percentile_cont sur les valeurs arrondies en float32)"""
+    from sqlalchemy import text
+
+    keys = sorted({(column, q) for column, q, _ in THRESHOLD_FLAGS.values()})
+    select = ", ".join(
+        f"percentile_cont({q}) WITHIN GROUP (ORDER BY {column}::real) AS t{i}" for i, (column, q) in enumerate(keys)
+    )
+    row = conn.execute(text(f"SELECT {select} FROM {schema}.{table_name}")).one()
+    return dict(zip(keys, row))
+
+
+def _band(values: pd.Series, old: float, new: float) -> pd.Series:
+    return values.between(min(old, new), max(old, new))
+
+
+def apply_to_frame(table: pd.DataFrame, delta: FeatureDelta) -> pd.DataFrame:
+    """Appliquer un delta à une table de features en mémoire (implémentation de référence d'apply_to_table)"""
+    for key, features in delta.aggregates.items():
+        keys = _key_values(table[key])
+        hit = keys.isin(features.index).to_numpy()
+        for name in features.columns:
+            table.loc[hit, name] = features[name].reindex(keys[hit]).to_numpy().astype(KERNELS[name].dtype)
+
+    if delta.thresholds:
+        band = np.zeros(len(table), dtype=bool)
+        for (column, q), (old, new) in delta.thresholds.items():
+            band |= _band(table[column], old, new).to_numpy()
+        quantiles = {key: new for key, (_, new) in delta.thresholds.items()}
+        flags = compute_features(table.loc[band].copy(), list(THRESHOLD_FLAGS) + DERIVED_FLAGS, quantiles)
+        for name in list(THRESHOLD_FLAGS) + DERIVED_FLAGS:
+            table.loc[band, name] = flags[name].to_numpy()
+
+    table = pd.concat([table, delta.rows], ignore_index=True)
+    # les catégories des anciennes et nouvelles lignes diffèrent: reconversion après le concat
+    return apply_schema(table, FACT_DTYPES)
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def threshold_updates_sql(delta: FeatureDelta, table: str) -> list[tuple[str, dict]]:
+    """Requêtes UPDATE (paramètres psycopg2) recalculant les indicateurs des lignes entre un ancien et un nouveau seuil"""
+    statements = []
+    for (column, q), (old, new) in sorted(delta.thresholds.items()):
+        sets = []
+        for name, (flag_column, flag_q, operator) in THRESHOLD_FLAGS.items():
+            if (flag_column, flag_q) != (column, q):
+                continue
+            flag = f"CASE WHEN {_quote(column)} {operator} %(new)s THEN 1 ELSE 0 END"
+            sets.append(f"{_quote(name)} = {flag}")
+            if name == "is_high_value_order":
+                sets.append(f'"high_value_late_risk" = ({flag}) * "late_delivery_risk"')
+        statements.append((
+            f"UPDATE {table} SET {', '.join(sets)} WHERE {_quote(column)} BETWEEN %(low)s AND %(high)s",
+            {"new": new, "low": min(old, new), "high": max(old, new)},
+        ))
+    return statements
+
+
+def apply_to_table(engine, delta: FeatureDelta, table_name: str = "features_ml", schema: str = "staging") -> None:
+    """
+    Appliquer un delta à la table de features en une transaction
+    
+    Les features agrégées des clés touchées sont envoyées par COPY dans des
+    tables temporaires et jointes dans un UPDATE; les seuils déplacés mettent
+    à jour les indicateurs des lignes entre les deux; les nouvelles lignes
+    sont ajoutées par COPY.
+    """
+    from sqlalchemy import text
+
+    table = f"{schema}.{table_name}"
+    with engine.begin() as conn:
+        for key in delta.aggregates:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {table_name}_{key}_idx ON {table} ({_quote(key)})"))
+        for column in sorted({column for column, _, _ in THRESHOLD_FLAGS.values()}):
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {table_name}_{column}_idx ON {table} ({_quote(column)})"))
+
+    raw_conn = engine.raw_connection()
+    try:
+        for key, features in delta.aggregates.items():
+            if features.empty:
+                continue
+            columns = ", ".join(_quote(c) for c in features.columns)
+            with raw_conn.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE TEMP TABLE features_{key}_delta ON COMMIT DROP AS "
+                    f"SELECT {_quote(key)}, {columns} FROM {table} WITH NO DATA"
+                )
+            # les sommes courantes sont en float64: conversion aux types de la table (customer_total_orders est INTEGER)
+            copy_chunk(raw_conn, conform_frame(features.reset_index(), FEATURES_ML_DTYPES), f"features_{key}_delta", "pg_temp")
+            sets = ", ".join(f"{_quote(c)} = d.{_quote(c)}" for c in features.columns)
+            with raw_conn.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {table} f SET {sets} FROM pg_temp.features_{key}_delta d "
+                    f"WHERE f.{_quote(key)} = d.{_quote(key)}"
+                )
+                logger.info("Features %s: %d lignes mises à jour pour %d clés", key, cursor.rowcount, len(features))
+
+        for statement, params in threshold_updates_sql(delta, table):
+            with raw_conn.cursor() as cursor:
+                cursor.execute(statement, params)
+                logger.info("Indicateurs à seuil: %d lignes mises à jour", cursor.rowcount)
+
+        if len(delta.rows):
+            copy_chunk(raw_conn, conform_frame(delta.rows.copy(deep=False), FEATURES_ML_DTYPES), table_name, schema)
+        raw_conn.commit()
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+
+
+def load_store(path: str = DEFAULT_STORE_PATH) -> FeatureStore | None:
+    """Store sauvegardé précédemment, ou None (fichier absent ou ancien format)"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        store = pickle.load(f)
+    if getattr(store, "version", None) != STORE_VERSION:
+        logger.info("Feature store %s dans un ancien format, il sera reconstruit", path)
+        return None
+    return store
+
+
+def save_store(store: FeatureStore, path: str = DEFAULT_STORE_PATH) -> None:
+    """Écrire le store de façon atomique (fichier temporaire + renommage)"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(store, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
@@ -0,0 +1,217 @@
+"""
+Recherche parallèle d'hyperparamètres XGBoost sur une matrice quantifiée partagée
+
+L'appelant construit une seule fois les matrices d'entraînement et de
+validation (xgboost.QuantileDMatrix, celle de validation avec ref= les
+intervalles d'entraînement); les processus du pool en héritent par fork,
+si bien qu'aucun essai ne relit ni ne requantifie les features. Chaque
+essai s'entraîne avec arrêt précoce sur la matrice de validation.
+
+Deux stratégies:
+- "random": n_trials configurations tirées de l'espace, chacune jusqu'à
+  max_rounds itérations de boosting.
+- "halving": divisions successives. Toutes les configurations commencent
+  avec un petit budget d'itérations, et le meilleur 1/eta de chaque palier
+  passe au suivant avec eta fois plus d'itérations, jusqu'à max_rounds
+  (halving_rungs).
+
+Un budget de temps est une échéance partagée par tous les essais. Les
+essais encore en file quand elle passe sont sautés, et ceux en cours
+s'arrêtent à leur itération suivante (DeadlineCallback).
+
+GNU libgomp ne survit pas au fork une fois que le parent a exécuté une
+région parallèle: les workers se bloquent alors à leur premier appel
+OpenMP. Les matrices doivent donc être construites avec nthread=1, et le
+parent ne doit ni entraîner ni prédire avec plus d'un thread avant la recherche.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import xgboost as xgb
+
+# (type, bas, haut); "log" tire uniformément sur l'échelle logarithmique
+SEARCH_SPACE = {
+    "max_depth": ("int", 3, 10),
+    "learning_rate": ("log", 0.01, 0.3),
+    "subsample": ("float", 0.5, 1.0),
+    "colsample_bytree": ("float", 0.5, 1.0),
+    "min_child_weight": ("log", 1.0, 20.0),
+    "gamma": ("float", 0.0, 1.0),
+    "reg_lambda": ("log", 0.1, 10.0),
+}
+
+# Métriques de validation où plus grand est meilleur (la liste d'arrêt précoce de xgboost)
+MAXIMIZE_METRICS = ("auc", "aucpr", "map", "ndcg", "pre")
+
+# Matrices de la recherche en cours, héritées par les processus du pool (fork)
+_MATRICES: tuple[xgb.DMatrix, xgb.DMatrix] | None = None
+
+
+def sample_params(rng: np.random.Generator, space: dict = SEARCH_SPACE) -> dict:
+    """Une configuration tirée de `space`"""
+    params = {}
+    for name, (kind, low, high) in space.items():
+        if kind == "int":
+            params[name] = int(rng.integers(low, high + 1))
+        elif kind == "log":
+            params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        else:
+            params[name] = float(rng.uniform(low, high))
+    return params
+
+
+def halving_rungs(n_trials: int, max_rounds: int, eta: int = 3, min_rounds: int = 20) -> list[tuple[int, int]]:
+    """(configurations, itérations de boosting) de chaque palier de divisions successives, le dernier à max_rounds"""
+    depth = 0
+    while n_trials // eta ** (depth + 1) >= 1 and max_rounds // eta ** (depth + 1) >= min_rounds:
+        depth += 1
+    return [(max(1, n_trials // eta ** i), max_rounds // eta ** (depth - i)) for i in range(depth + 1)]
+
+
+def is_maximized(params: dict) -> bool:
+    return str(params.get("eval_metric", "")).split("@")[0] in MAXIMIZE_METRICS
+
+
+class DeadlineCallback(xgb.callback.TrainingCallback):
+    """Arrêter le boosting une fois que time.time() dépasse `deadline`"""
+
+    def __init__(self, deadline: float | None) -> None:
+        super().__init__()
+        self.deadline = deadline
+        self.reached = False
+
+    def after_iteration(self, model, epoch: int, evals_log: dict) -> bool:
+        self.reached = self.deadline is not None and time.time() >= self.deadline
+        return self.reached
+
+
+def _inherit_matrices(matrices: tuple[xgb.DMatrix, xgb.DMatrix]) -> None:
+    global _MATRICES
+    _MATRICES = matrices
+
+
+def run_trial(
+    trial: int,
+    rung: int,
+    params: dict,
+    num_boost_round: int,
+    early_stopping_rounds: int,
+    deadline: float | None = None,
+) -> dict:
+    """Entraîner une configuration sur les matrices héritées; durées et score de validation"""
+    record = {"trial": trial, "rung": rung, "params": params, "num_boost_round": num_boost_round}
+    if deadline is not None and time.time() >= deadline:
+        return {**record, "status": "skipped"}
+
+    dtrain, dvalid = _MATRICES
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    deadline_callback = DeadlineCallback(deadline)
+    booster = xgb.train(
+        params,
+        dtrain,
+        num_boost_round=num_boost_round,
+        evals=[(dvalid, "valid")],
+        early_stopping_rounds=early_stopping_rounds,
+        callbacks=[deadline_callback],
+        verbose_eval=False,
+    )
+    wall_seconds = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF)
+
+    rounds = booster.num_boosted_rounds()
+    if deadline_callback.reached:
+        status = "deadline"
+    elif rounds < num_boost_round:
+        status = "early_stopped"
+    else:
+        status = "completed"
+    return {
+        **record,
+        "status": status,
+        "score": float(booster.best_score),
+        "best_iteration": int(booster.best_iteration),
+        "rounds": rounds,
+        "wall_seconds": wall_seconds,
+        "cpu_seconds": (after.ru_utime - usage.ru_utime) + (after.ru_stime - usage.ru_stime),
+    }
+
+
+def run_search(
+    dtrain: xgb.DMatrix,
+    dvalid: xgb.DMatrix,
+    base_params: dict,
+    method: str = "halving",
+    n_trials: int = 27,
+    max_rounds: int = 400,
+    early_stopping_rounds: int = 20,
+    eta: int = 3,
+    min_rounds: int = 20,
+    workers: int | None = None,
+    threads_per_trial: int | None = None,
+    time_budget: float | None = None,
+    space: dict = SEARCH_SPACE,
+    seed: int = 42,
+) -> list[dict]:
+    """
+    Exécuter la recherche; un enregistrement par essai et par palier, dans l'ordre de soumission
+    
+    `base_params` sont les paramètres du booster (objective, eval_metric, ...)
+    que chaque configuration tirée surcharge. Les essais tournent `workers`
+    à la fois avec `threads_per_trial` threads XGBoost chacun. Par défaut, le
+    pool répartit les cœurs disponibles entre les workers.
+    """
+    if method not in ("random", "halving"):
+        raise ValueError(f"méthode de recherche inconnue: {method}")
+    cpus = os.cpu_count() or 1
+    workers = workers or min(n_trials, cpus)
+    threads_per_trial = threads_per_trial or max(1, cpus // workers)
+    deadline = time.time() + time_budget if time_budget is not None else None
+    maximize = is_maximized(base_params)
+
+    rng = np.random.default_rng(seed)
+    configs = [
+        {**base_params, **sample_params(rng, space), "nthread": threads_per_trial}
+        for _ in range(n_trials)
+    ]
+    rungs = halving_rungs(n_trials, max_rounds, eta, min_rounds) if method == "halving" else [(n_trials, max_rounds)]
+
+    records = []
+    survivors = list(range(n_trials))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_inherit_matrices,
+        initargs=((dtrain, dvalid),),
+    ) as executor:
+        for rung, (n_configs, rounds) in enumerate(rungs):
+            survivors = survivors[:n_configs]
+            futures = [
+                executor.submit(run_trial, trial, rung, configs[trial], rounds, early_stopping_rounds, deadline)
+                for trial in survivors
+            ]
+            results = [future.result() for future in futures]
+            records.extend(results)
+            scored = [r for r in results if r["status"] != "skipped"]
+            if deadline is not None and time.time() >= deadline:
+                break
+            scored.sort(key=lambda r: r["score"], reverse=maximize)
+            survivors = [r["trial"] for r in scored]
+    return records
+
+
+def best_trial(records: list[dict], maximize: bool) -> dict | None:
+    """Meilleur enregistrement du plus haut palier ayant produit un score (les paliers inférieurs ont eu moins d'itérations)"""
+    scored = [r for r in records if r["status"] != "skipped"]
+    if not scored:
+        return None
+    top_rung = max(r["rung"] for r in scored)
+    candidates = [r for r in scored if r["rung"] == top_rung]
+    return (max if maximize else min)(candidates, key=lambda r: r["score"])
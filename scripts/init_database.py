@@ -3,29 +3,19 @@ Script utilitaire pour initialiser la base de données PostgreSQL
 Crée les schémas et structures nécessaires
 """
 
-from sqlalchemy import create_engine, text
-import os
+from sqlalchemy import text
 from dotenv import load_dotenv
 import logging
 
+from db import get_db_connection, track_db_usage
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
 
-def get_db_connection():
-    """Créer une connexion à la base de données PostgreSQL"""
-    db_host = os.getenv('DB_HOST', 'localhost')
-    db_port = os.getenv('DB_PORT', '5432')
-    db_name = os.getenv('DB_NAME', 'supply_chain_dw')
-    db_user = os.getenv('DB_USER', 'postgres')
-    db_password = os.getenv('DB_PASSWORD', 'postgres')
-    
-    connection_string = f'postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}'
-    return create_engine(connection_string)
-
-
+@track_db_usage
 def init_database():
     """Initialiser la base de données avec tous les schémas nécessaires"""
     try:
@@ -5,25 +5,52 @@ Prédiction de la demande et du risque de retard de livraison
 
 import pandas as pd
 import numpy as np
-from sqlalchemy import create_engine, text
+from sqlalchemy import inspect, text
 import os
 from dotenv import load_dotenv
+import functools
 import logging
+import multiprocessing
 import pickle
+import resource
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
 # Machine Learning
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import (
     mean_squared_error, 
     mean_absolute_error, 
     r2_score,
     accuracy_score,
     classification_report,
-    confusion_matrix
+    confusion_matrix,
+    precision_score,
+    recall_score,
+    f1_score,
+    roc_auc_score
 )
 import xgboost as xgb
 
+from dataco_schema import FEATURES_ML_DTYPES, apply_schema
+from db import copy_columns, copy_dataframe, get_db_connection, track_db_usage
+from feature_artifact import current_manifest, is_fresh, read_columns
+from hyperparameter_search import SEARCH_SPACE, best_trial, is_maximized, run_search
+from training_data import (
+    DEFAULT_BATCH_ROWS,
+    KEY_COLUMNS,
+    artifact_batches,
+    predict_batches,
+    split_batches,
+    split_mask,
+    spool_batches,
+    table_batches,
+    training_matrix,
+)
+
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -31,17 +58,72 @@ logger = logging.getLogger(__name__)
 # Charger les variables d'environnement
 load_dotenv()
 
+# Sélection des features pour la régression (avec plus de features)
+REGRESSION_FEATURES = [
+    'order_month', 'order_quarter', 'order_day', 'order_year',
+    'days_for_shipment_scheduled',
+    'is_weekend', 'days_since_year_start',
+    'is_end_of_month', 'is_beginning_of_month',
+    'market_encoded', 'order_region_encoded',
+    'customer_total_orders', 'customer_avg_order_value',
+    'region_avg_sales',
+    'customer_late_delivery_rate', 'region_late_delivery_rate',
+    'is_high_value_order', 'profit_margin'
+]
 
-def get_db_connection():
-    """Créer une connexion à la base de données PostgreSQL"""
-    db_host = os.getenv('DB_HOST', 'localhost')
-    db_port = os.getenv('DB_PORT', '5432')
-    db_name = os.getenv('DB_NAME', 'supply_chain_dw')
-    db_user = os.getenv('DB_USER', 'postgres')
-    db_password = os.getenv('DB_PASSWORD', 'postgres')
-    
-    connection_string = f'postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}'
-    return create_engine(connection_string)
+# Sélection des features pour la classification (SANS delivery_status pour éviter data leakage)
+CLASSIFICATION_FEATURES = [
+    'order_month', 'order_quarter', 'order_day',
+    'days_for_shipment_scheduled',
+    'market_encoded', 'order_region_encoded',
+    'is_high_value_order', 'is_weekend',
+    'customer_total_orders', 'customer_avg_order_value',
+    'customer_late_delivery_rate',
+    'region_late_delivery_rate', 'profit_margin'
+]
+
+# Hyperparamètres XGBoost (communs aux modes 'memory' et 'external')
+REGRESSION_PARAMS = {
+    'n_estimators': 200,
+    'max_depth': 8,
+    'learning_rate': 0.05,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'min_child_weight': 3,
+    'gamma': 0.1,
+    'random_state': 42,
+    'n_jobs': -1,
+}
+CLASSIFICATION_PARAMS = {
+    'n_estimators': 200,
+    'max_depth': 6,
+    'learning_rate': 0.05,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'random_state': 42,
+    'n_jobs': -1,
+}
+
+# Métriques enregistrées dans analytics.ml_model_metrics, par type de modèle
+SAVED_METRICS = {
+    'regression': ['r2_score', 'mae', 'rmse'],
+    'classification': ['accuracy', 'precision', 'recall', 'f1_score', 'roc_auc'],
+}
+
+# Colonnes de analytics.ml_predictions
+PREDICTION_COLUMNS = [
+    'order_id', 'order_item_id', 'order_date',
+    'sales', 'predicted_sales',
+    'late_delivery_risk', 'predicted_late_risk', 'predicted_late_risk_proba'
+]
+
+MODELS_DIR = os.getenv('ML_MODELS_DIR', os.path.join(os.path.dirname(__file__), '..', 'ml_models'))
+
+# Colonnes lues par l'entraînement: features, cibles et clés des prédictions
+TRAINING_COLUMNS = list(dict.fromkeys(
+    ['order_id', 'order_item_id', 'order_date', 'sales', 'late_delivery_risk']
+    + REGRESSION_FEATURES + CLASSIFICATION_FEATURES
+))
 
 
 def create_analytics_schema(engine):
@@ -55,265 +137,715 @@ def create_analytics_schema(engine):
         raise
 
 
-def train_demand_prediction_model():
+def load_training_features(engine, columns: list = TRAINING_COLUMNS) -> pd.DataFrame:
+    """
+    Lire les colonnes d'entraînement de staging.features_ml
+    
+    L'artefact colonnaire publié par le feature engineering
+    (feature_artifact.py) est mappé en mémoire et seules `columns` sont
+    converties; PostgreSQL n'est lu que si l'artefact manque ou ne
+    correspond plus à la table (nouveau chargement, table réécrite), par
+    COPY binaire de ces seules colonnes vers des tableaux NumPy
+    (db.copy_columns).
+    """
+    manifest = current_manifest()
+    if manifest is not None:
+        with engine.connect() as conn:
+            fresh = is_fresh(manifest, conn)
+        if fresh:
+            logger.info(f"Lecture des features depuis l'artefact {manifest['version']}...")
+            return apply_schema(read_columns(manifest, columns), FEATURES_ML_DTYPES)
+    
+    logger.info("Lecture des features depuis staging.features_ml (COPY binaire)...")
+    df = copy_columns('features_ml', columns, FEATURES_ML_DTYPES, schema='staging', engine=engine)
+    return apply_schema(df, FEATURES_ML_DTYPES)
+
+
+def regression_metrics(y_true, y_pred) -> dict:
+    """R², MAE, RMSE et MAPE d'un modèle de régression"""
+    return {
+        'r2_score': r2_score(y_true, y_pred),
+        'mae': mean_absolute_error(y_true, y_pred),
+        'rmse': np.sqrt(mean_squared_error(y_true, y_pred)),
+        'mape': np.mean(np.abs((y_true - y_pred) / y_true)) * 100,
+    }
+
+
+def classification_metrics(y_true, y_pred, y_proba) -> dict:
+    """Accuracy, précision, rappel, F1 et ROC-AUC d'un modèle de classification"""
+    return {
+        'accuracy': accuracy_score(y_true, y_pred),
+        'precision': precision_score(y_true, y_pred),
+        'recall': recall_score(y_true, y_pred),
+        'f1_score': f1_score(y_true, y_pred),
+        'roc_auc': roc_auc_score(y_true, y_proba),
+    }
+
+
+def log_regression_metrics(metrics: dict) -> None:
+    logger.info(f"Métriques du modèle de régression:")
+    logger.info(f"  R² Score: {metrics['r2_score']:.4f}")
+    logger.info(f"  MAE: {metrics['mae']:.2f}")
+    logger.info(f"  RMSE: {metrics['rmse']:.2f}")
+    logger.info(f"  MAPE: {metrics['mape']:.2f}%")
+
+
+def log_classification_metrics(metrics: dict) -> None:
+    logger.info(f"Métriques du modèle de classification:")
+    logger.info(f"  Accuracy: {metrics['accuracy']:.4f}")
+    logger.info(f"  Precision: {metrics['precision']:.4f}")
+    logger.info(f"  Recall: {metrics['recall']:.4f}")
+    logger.info(f"  F1-Score: {metrics['f1_score']:.4f}")
+    logger.info(f"  ROC-AUC: {metrics['roc_auc']:.4f}")
+
+
+def log_feature_importance(features: list, importances, title: str) -> None:
+    feature_importance = pd.DataFrame({
+        'feature': features,
+        'importance': importances
+    }).sort_values('importance', ascending=False)
+    
+    logger.info(f"\nTop 5 features importantes ({title}):")
+    logger.info(feature_importance.head().to_string())
+
+
+def save_models(model_regression, model_classification) -> None:
+    """Sauvegarder les deux modèles (pickle) dans ml_models/"""
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    
+    # Sauvegarder modèle de régression
+    regression_model_path = os.path.join(MODELS_DIR, 'demand_prediction_model.pkl')
+    with open(regression_model_path, 'wb') as f:
+        pickle.dump(model_regression, f)
+    logger.info(f"Modèle de régression sauvegardé: {regression_model_path}")
+    
+    # Sauvegarder modèle de classification
+    classification_model_path = os.path.join(MODELS_DIR, 'late_delivery_risk_model.pkl')
+    with open(classification_model_path, 'wb') as f:
+        pickle.dump(model_classification, f)
+    logger.info(f"Modèle de classification sauvegardé: {classification_model_path}")
+
+
+def write_predictions(engine, frames) -> int:
+    """
+    Réécrire analytics.ml_predictions à partir d'un ou plusieurs blocs de prédictions
+    
+    Chaque bloc contient PREDICTION_COLUMNS; il est envoyé par COPY dès
+    qu'il est prêt (le mode 'external' n'a jamais toutes les lignes en mémoire).
+    """
+    # Supprimer la vue dépendante si elle existe avant de supprimer la table
+    with engine.begin() as conn:
+        try:
+            conn.execute(text("DROP VIEW IF EXISTS analytics_analytics.ml_predictions CASCADE"))
+            logger.info("Vue ml_predictions supprimée")
+        except Exception as e:
+            logger.warning(f"Erreur lors de la suppression de la vue: {e}")
+    
+    n_rows = 0
+    for i, predictions_df in enumerate(frames):
+        if i == 0:
+            predictions_df.head(0).to_sql(
+                'ml_predictions', engine, schema='analytics', if_exists='replace', index=False
+            )
+        n_rows += copy_dataframe(predictions_df, 'ml_predictions', schema='analytics', engine=engine)
+    
+    logger.info(f"Prédictions sauvegardées: {n_rows} lignes")
+    return n_rows
+
+
+def save_metrics(engine, metrics_data: list) -> None:
+    """
+    Remplacer, dans analytics.ml_model_metrics, les lignes des types de modèle de metrics_data
+    
+    Une ligne par métrique. Les lignes des autres types (entraînement
+    'regression' / 'classification', recherche d'hyperparamètres
+    'tuning_trial' / 'tuning_best') sont conservées: suppression et ajout
+    dans une même transaction, sans recréer la table ni la vue dbt qui la lit.
+    """
+    metrics_df = pd.DataFrame(metrics_data)
+    model_types = sorted(metrics_df['model_type'].unique())
+    
+    with engine.begin() as conn:
+        if inspect(conn).has_table('ml_model_metrics', schema='analytics'):
+            conn.execute(
+                text("DELETE FROM analytics.ml_model_metrics WHERE model_type = ANY(:model_types)"),
+                {'model_types': model_types},
+            )
+        metrics_df.to_sql('ml_model_metrics', conn, schema='analytics', if_exists='append', index=False)
+    
+    logger.info(f"Métriques des modèles sauvegardées ({', '.join(model_types)}): {len(metrics_df)} lignes")
+
+
+def metric_rows(model_name: str, model_type: str, metrics: dict, n_features: int, n_samples_train: int) -> list:
+    """Lignes de analytics.ml_model_metrics pour les métriques SAVED_METRICS d'un modèle"""
+    return [
+        {'model_name': model_name, 'model_type': model_type, 'metric_name': name,
+         'metric_value': metrics[name], 'training_date': datetime.now(),
+         'n_features': n_features, 'n_samples_train': n_samples_train}
+        for name in SAVED_METRICS[model_type]
+    ]
+
+
+def fit_regression(df: pd.DataFrame, n_jobs: int) -> dict:
+    """
+    Modèle de prédiction de la demande sur les features en mémoire
+    
+    Retourne le modèle, ses lignes de métriques et ses prédictions sur
+    l'ensemble complet (colonnes de analytics.ml_predictions).
+    """
+    logger.info("\n=== Entraînement du modèle de prédiction de demande ===")
+    
+    X_reg = df[REGRESSION_FEATURES].fillna(0)
+    y_reg = df['sales']
+    
+    # Split train/test
+    X_train_reg, X_test_reg, y_train_reg, y_test_reg = train_test_split(
+        X_reg, y_reg, test_size=0.2, random_state=42
+    )
+    
+    # Entraînement XGBoost Regressor avec meilleurs hyperparamètres
+    model_regression = xgb.XGBRegressor(**{**REGRESSION_PARAMS, 'n_jobs': n_jobs})
+    
+    logger.info(f"Entraînement du modèle de régression ({n_jobs} threads)...")
+    model_regression.fit(X_train_reg, y_train_reg)
+    
+    # Prédictions et métriques complètes
+    regression = regression_metrics(y_test_reg, model_regression.predict(X_test_reg))
+    log_regression_metrics(regression)
+    log_feature_importance(REGRESSION_FEATURES, model_regression.feature_importances_, 'régression')
+    
+    # Prédictions sur l'ensemble complet
+    predictions = {'predicted_sales': model_regression.predict(X_reg)}
+    
+    # Le modèle sauvegardé prédit avec tous les cœurs, comme avant le budget
+    model_regression.set_params(n_jobs=REGRESSION_PARAMS['n_jobs'])
+    return {
+        'model': model_regression,
+        'metrics': metric_rows('demand_prediction', 'regression', regression,
+                               len(REGRESSION_FEATURES), len(X_train_reg)),
+        'predictions': predictions,
+    }
+
+
+def fit_classification(df: pd.DataFrame, n_jobs: int) -> dict:
+    """Modèle de prédiction du risque de retard sur les features en mémoire (mêmes éléments que fit_regression)"""
+    logger.info("\n=== Entraînement du modèle de prédiction de retard ===")
+    
+    X_clf = df[CLASSIFICATION_FEATURES].fillna(0)
+    y_clf = df['late_delivery_risk']
+    
+    # Vérifier la distribution des classes
+    class_distribution = y_clf.value_counts()
+    logger.info(f"Distribution des classes:\n{class_distribution}")
+    
+    # Split train/test
+    X_train_clf, X_test_clf, y_train_clf, y_test_clf = train_test_split(
+        X_clf, y_clf, test_size=0.2, random_state=42, stratify=y_clf
+    )
+    
+    # Calculer scale_pos_weight pour gérer le déséquilibre
+    scale_pos_weight = (y_train_clf == 0).sum() / (y_train_clf == 1).sum()
+    
+    # Entraînement XGBoost Classifier avec meilleurs hyperparamètres
+    model_classification = xgb.XGBClassifier(
+        **{**CLASSIFICATION_PARAMS, 'n_jobs': n_jobs}, scale_pos_weight=scale_pos_weight
+    )
+    
+    logger.info(f"Entraînement du modèle de classification ({n_jobs} threads)...")
+    model_classification.fit(X_train_clf, y_train_clf)
+    
+    # Prédictions et métriques complètes
+    y_pred_clf = model_classification.predict(X_test_clf)
+    y_pred_proba_clf = model_classification.predict_proba(X_test_clf)[:, 1]
+    classification = classification_metrics(y_test_clf, y_pred_clf, y_pred_proba_clf)
+    log_classification_metrics(classification)
+    logger.info("\nClassification Report:")
+    logger.info(classification_report(y_test_clf, y_pred_clf))
+    log_feature_importance(CLASSIFICATION_FEATURES, model_classification.feature_importances_, 'classification')
+    
+    # Prédictions sur l'ensemble complet
+    predictions = {
+        'predicted_late_risk': model_classification.predict(X_clf),
+        'predicted_late_risk_proba': model_classification.predict_proba(X_clf)[:, 1],
+    }
+    
+    model_classification.set_params(n_jobs=CLASSIFICATION_PARAMS['n_jobs'])
+    return {
+        'model': model_classification,
+        'metrics': metric_rows('late_delivery_risk', 'classification', classification,
+                               len(CLASSIFICATION_FEATURES), len(X_train_clf)),
+        'predictions': predictions,
+    }
+
+
+def training_batches(engine, batch_rows: int = DEFAULT_BATCH_ROWS, spool_dir: str = None):
+    """
+    Source de blocs de features: artefact colonnaire s'il est à jour, sinon staging.features_ml
+    
+    Chaque passage sur la table est un nouveau parcours trié; avec spool_dir,
+    la table est lue une seule fois vers un fichier Arrow local (spool_batches)
+    que rejouent ensuite les deux modèles et les prédictions.
+    """
+    manifest = current_manifest()
+    if manifest is not None:
+        with engine.connect() as conn:
+            fresh = is_fresh(manifest, conn)
+        if fresh:
+            logger.info(f"Blocs de features lus depuis l'artefact {manifest['version']}")
+            return artifact_batches(manifest, TRAINING_COLUMNS, batch_rows=batch_rows)
+    logger.info("Blocs de features lus depuis staging.features_ml (curseur serveur)")
+    # Pas de moteur lié: la source est rejouée dans les processus forkés de
+    # train_concurrently, chacun avec son propre pool (db.get_engine par pid)
+    batches = table_batches(TRAINING_COLUMNS, batch_rows=batch_rows)
+    if spool_dir is None:
+        return batches
+    path = os.path.join(spool_dir, 'features_ml.arrow')
+    start = time.perf_counter()
+    batches = spool_batches(batches, path)
+    logger.info(f"Features copiées dans {path} en {time.perf_counter() - start:.2f}s (un seul parcours de la table)")
+    return batches
+
+
+def fit_regression_external(batches, n_jobs: int, cache_dir: str = None) -> dict:
+    """
+    Modèle de prédiction de la demande hors mémoire: xgboost.QuantileDMatrix
+    construite bloc par bloc (training_data.py), sans jamais charger toute la table
+    
+    Le découpage train/test (20 %) est un hachage de (order_id, order_item_id):
+    stable d'un passage à l'autre, sans copie des données. Seuls les bins
+    quantifiés sont gardés en mémoire; avec cache_dir, les pages de la
+    matrice sont elles-mêmes sur disque (DMatrix en mémoire externe).
+    Mêmes hyperparamètres que le mode en mémoire; les prédictions sur
+    l'ensemble complet sont faites ensuite, bloc par bloc (external_predictions).
+    """
+    logger.info("\n=== Entraînement du modèle de prédiction de demande (hors mémoire) ===")
+    model_regression = xgb.XGBRegressor(**{**REGRESSION_PARAMS, 'n_jobs': n_jobs})
+    dtrain = training_matrix(batches, REGRESSION_FEATURES, 'sales', 'train', cache_dir=cache_dir)
+    logger.info(f"Matrice d'entraînement: {dtrain.num_row()} lignes ({n_jobs} threads)")
+    booster = xgb.train(model_regression.get_xgb_params(), dtrain, num_boost_round=model_regression.n_estimators)
+    model_regression.load_model(booster.save_raw(raw_format='ubj'))
+    
+    y_test, y_pred = [], []
+    for batch, predicted in predict_batches(booster, batches, REGRESSION_FEATURES, subset='test'):
+        y_test.append(batch['sales'].to_numpy())
+        y_pred.append(predicted)
+    regression = regression_metrics(np.concatenate(y_test), np.concatenate(y_pred))
+    log_regression_metrics(regression)
+    log_feature_importance(REGRESSION_FEATURES, model_regression.feature_importances_, 'régression')
+    
+    model_regression.set_params(n_jobs=REGRESSION_PARAMS['n_jobs'])
+    return {
+        'model': model_regression,
+        'metrics': metric_rows('demand_prediction', 'regression', regression,
+                               len(REGRESSION_FEATURES), dtrain.num_row()),
+        'predictions': None,
+    }
+
+
+def fit_classification_external(batches, n_jobs: int, cache_dir: str = None) -> dict:
+    """Modèle de prédiction du risque de retard hors mémoire (voir fit_regression_external)"""
+    logger.info("\n=== Entraînement du modèle de prédiction de retard (hors mémoire) ===")
+    dtrain = training_matrix(batches, CLASSIFICATION_FEATURES, 'late_delivery_risk', 'train', cache_dir=cache_dir)
+    labels = dtrain.get_label()
+    scale_pos_weight = (labels == 0).sum() / (labels == 1).sum()
+    logger.info(f"Distribution des classes (train): {int((labels == 0).sum())} / {int((labels == 1).sum())}")
+    model_classification = xgb.XGBClassifier(
+        **{**CLASSIFICATION_PARAMS, 'n_jobs': n_jobs}, scale_pos_weight=scale_pos_weight
+    )
+    booster = xgb.train(
+        model_classification.get_xgb_params(), dtrain, num_boost_round=model_classification.n_estimators
+    )
+    model_classification.load_model(booster.save_raw(raw_format='ubj'))
+    
+    y_test, y_proba = [], []
+    for batch, predicted in predict_batches(booster, batches, CLASSIFICATION_FEATURES, subset='test'):
+        y_test.append(batch['late_delivery_risk'].to_numpy())
+        y_proba.append(predicted)
+    y_test, y_proba = np.concatenate(y_test), np.concatenate(y_proba)
+    classification = classification_metrics(y_test, (y_proba > 0.5).astype(int), y_proba)
+    log_classification_metrics(classification)
+    log_feature_importance(CLASSIFICATION_FEATURES, model_classification.feature_importances_, 'classification')
+    
+    model_classification.set_params(n_jobs=CLASSIFICATION_PARAMS['n_jobs'])
+    return {
+        'model': model_classification,
+        'metrics': metric_rows('late_delivery_risk', 'classification', classification,
+                               len(CLASSIFICATION_FEATURES), dtrain.num_row()),
+        'predictions': None,
+    }
+
+
+def in_memory_predictions(df: pd.DataFrame, results: dict):
+    """Bloc unique de analytics.ml_predictions: clés et cibles de df, prédictions calculées par chaque modèle"""
+    for result in results.values():
+        for column, values in result['predictions'].items():
+            df[column] = values
+    yield df[PREDICTION_COLUMNS]
+
+
+def external_fits(cache_dir: str = None) -> dict:
+    """
+    Fonctions d'entraînement hors mémoire de train_concurrently
+    
+    Chaque modèle a son sous-dossier de cache_dir: XGBoost nomme ses pages
+    '<préfixe>-<adresse de l'objet>', identique dans deux processus forkés.
+    """
+    fits = {'demand_prediction': fit_regression_external, 'late_delivery_risk': fit_classification_external}
+    return {
+        name: functools.partial(fit, cache_dir=os.path.join(cache_dir, name) if cache_dir else None)
+        for name, fit in fits.items()
+    }
+
+
+def external_predictions(batches, results: dict):
+    """Blocs de analytics.ml_predictions sur l'ensemble complet, les deux modèles appliqués à chaque bloc"""
+    booster = results['demand_prediction']['model'].get_booster()
+    booster_clf = results['late_delivery_risk']['model'].get_booster()
+    for batch in split_batches(batches):
+        batch = batch.copy()
+        batch['predicted_sales'] = booster.inplace_predict(batch[REGRESSION_FEATURES].fillna(0))
+        proba = booster_clf.inplace_predict(batch[CLASSIFICATION_FEATURES].fillna(0))
+        batch['predicted_late_risk'] = (proba > 0.5).astype(int)
+        batch['predicted_late_risk_proba'] = proba
+        yield batch[PREDICTION_COLUMNS]
+
+
+def thread_budgets(regression_threads: int = None, classification_threads: int = None) -> dict:
+    """
+    Threads XGBoost de chaque modèle entraîné en parallèle
+    
+    Par défaut les cœurs sont partagés en deux; la régression (arbres plus
+    profonds, plus de features) prend le cœur restant quand leur nombre est impair.
+    """
+    cpus = os.cpu_count() or 1
+    classification_threads = classification_threads or max(1, cpus // 2)
+    regression_threads = regression_threads or max(1, cpus - classification_threads)
+    return {'demand_prediction': regression_threads, 'late_delivery_risk': classification_threads}
+
+
+# Données d'entraînement des processus de train_concurrently, héritées par fork (sans copie ni pickle)
+_TRAINING_DATA = None
+
+
+def _inherit_training_data(data) -> None:
+    global _TRAINING_DATA
+    _TRAINING_DATA = data
+
+
+def fit_task(name: str, fit, n_jobs: int) -> dict:
+    """Exécuté dans un processus enfant: un modèle avec son budget de threads, durée et temps CPU mesurés"""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    result = fit(_TRAINING_DATA, n_jobs)
+    wall_seconds = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_seconds = (after.ru_utime - usage.ru_utime) + (after.ru_stime - usage.ru_stime)
+    return {**result, 'name': name, 'n_jobs': n_jobs, 'wall_seconds': wall_seconds, 'cpu_seconds': cpu_seconds}
+
+
+def train_concurrently(data, fits: dict, budgets: dict) -> dict:
+    """
+    Entraîner les modèles en parallèle, un processus par modèle
+    
+    fits associe un nom de modèle à une fonction fit(data, n_jobs) de niveau
+    module; budgets associe ce nom à son nombre de threads XGBoost. Les
+    features (data) sont chargées une seule fois par l'appelant et héritées
+    par les processus (fork), qui n'en copient que les colonnes de leur
+    modèle. Un processus par modèle isole les pools OpenMP (pas de
+    sursouscription des cœurs) et donne le temps CPU de chaque modèle.
+    """
+    start = time.perf_counter()
+    results = {}
+    with ProcessPoolExecutor(
+        max_workers=len(fits),
+        mp_context=multiprocessing.get_context('fork'),
+        initializer=_inherit_training_data,
+        initargs=(data,),
+    ) as executor:
+        futures = [executor.submit(fit_task, name, fit, budgets[name]) for name, fit in fits.items()]
+        for future in as_completed(futures):
+            result = future.result()
+            results[result['name']] = result
+            cores = result['cpu_seconds'] / max(result['wall_seconds'], 1e-9)
+            logger.info(
+                f"Modèle {result['name']} entraîné en {result['wall_seconds']:.2f}s, "
+                f"CPU {result['cpu_seconds']:.2f}s ({cores:.2f} cœurs, "
+                f"{100 * cores / result['n_jobs']:.0f} % de {result['n_jobs']} threads)"
+            )
+    logger.info(f"Entraînement concurrent de {len(fits)} modèles: {time.perf_counter() - start:.2f}s")
+    return results
+
+
+@track_db_usage
+def train_demand_prediction_model(
+    mode: str = 'memory',
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+    cache_dir: str = None,
+    regression_threads: int = None,
+    classification_threads: int = None,
+):
     """
     Entraîner un modèle de prédiction de la demande (régression)
     et un modèle de prédiction de risque de retard (classification)
+    
+    Les deux modèles, indépendants, sont entraînés en parallèle
+    (train_concurrently), chacun avec son budget de threads
+    (thread_budgets: cœurs partagés en deux par défaut).
+    
+    mode:
+    - 'memory' (par défaut): features chargées en mémoire une fois, train_test_split
+    - 'external': matrices XGBoost construites par blocs de batch_rows
+      lignes, découpage train/test par hachage des clés (fit_regression_external);
+      lue depuis staging, la table est d'abord copiée une fois dans un fichier
+      Arrow temporaire (sous cache_dir s'il est donné), que chaque modèle
+      parcourt plusieurs fois puis que les prédictions relisent
     """
+    spool_dir = None
     try:
         engine = get_db_connection()
         create_analytics_schema(engine)
-        
-        # Lire les features depuis staging
-        logger.info("Lecture des features depuis staging.features_ml...")
-        df = pd.read_sql("SELECT * FROM staging.features_ml", engine)
-        logger.info(f"Features chargées: {len(df)} lignes, {len(df.columns)} colonnes")
-        
-        # ===== MODÈLE 1: PRÉDICTION DE LA DEMANDE (RÉGRESSION) =====
-        logger.info("\n=== Entraînement du modèle de prédiction de demande ===")
-        
-        # Sélection des features pour la régression (avec plus de features)
-        feature_cols_regression = [
-            'order_month', 'order_quarter', 'order_day', 'order_year',
-            'days_for_shipment_scheduled',
-            'is_weekend', 'days_since_year_start',
-            'is_end_of_month', 'is_beginning_of_month',
-            'market_encoded', 'order_region_encoded',
-            'customer_total_orders', 'customer_avg_order_value',
-            'region_avg_sales',
-            'customer_late_delivery_rate', 'region_late_delivery_rate',
-            'is_high_value_order', 'profit_margin'
-        ]
-        
-        X_reg = df[feature_cols_regression].fillna(0)
-        y_reg = df['sales']
-        
-        # Split train/test
-        X_train_reg, X_test_reg, y_train_reg, y_test_reg = train_test_split(
-            X_reg, y_reg, test_size=0.2, random_state=42
-        )
-        
-        # Entraînement XGBoost Regressor avec meilleurs hyperparamètres
-        model_regression = xgb.XGBRegressor(
-            n_estimators=200,
-            max_depth=8,
-            learning_rate=0.05,
-            subsample=0.8,
-            colsample_bytree=0.8,
-            min_child_weight=3,
-            gamma=0.1,
-            random_state=42,
-            n_jobs=-1
-        )
-        
-        logger.info("Entraînement du modèle de régression...")
-        model_regression.fit(X_train_reg, y_train_reg)
-        
-        # Prédictions
-        y_pred_reg = model_regression.predict(X_test_reg)
-        
-        # Métriques complètes
-        r2 = r2_score(y_test_reg, y_pred_reg)
-        mae = mean_absolute_error(y_test_reg, y_pred_reg)
-        rmse = np.sqrt(mean_squared_error(y_test_reg, y_pred_reg))
-        mape = np.mean(np.abs((y_test_reg - y_pred_reg) / y_test_reg)) * 100
-        
-        logger.info(f"Métriques du modèle de régression:")
-        logger.info(f"  R² Score: {r2:.4f}")
-        logger.info(f"  MAE: {mae:.2f}")
-        logger.info(f"  RMSE: {rmse:.2f}")
-        logger.info(f"  MAPE: {mape:.2f}%")
-        
-        # Feature importance
-        feature_importance_reg = pd.DataFrame({
-            'feature': feature_cols_regression,
-            'importance': model_regression.feature_importances_
-        }).sort_values('importance', ascending=False)
-        
-        logger.info("\nTop 5 features importantes (régression):")
-        logger.info(feature_importance_reg.head().to_string())
-        
-        # ===== MODÈLE 2: PRÉDICTION DU RISQUE DE RETARD (CLASSIFICATION) =====
-        logger.info("\n=== Entraînement du modèle de prédiction de retard ===")
-        
-        # Sélection des features pour la classification (SANS delivery_status pour éviter data leakage)
-        feature_cols_classification = [
-            'order_month', 'order_quarter', 'order_day',
-            'days_for_shipment_scheduled',
-            'market_encoded', 'order_region_encoded',
-            'is_high_value_order', 'is_weekend',
-            'customer_total_orders', 'customer_avg_order_value',
-            'customer_late_delivery_rate',
-            'region_late_delivery_rate', 'profit_margin'
-        ]
-        
-        X_clf = df[feature_cols_classification].fillna(0)
-        y_clf = df['late_delivery_risk']
-        
-        # Vérifier la distribution des classes
-        class_distribution = y_clf.value_counts()
-        logger.info(f"Distribution des classes:\n{class_distribution}")
-        
-        # Split train/test
-        X_train_clf, X_test_clf, y_train_clf, y_test_clf = train_test_split(
-            X_clf, y_clf, test_size=0.2, random_state=42, stratify=y_clf
-        )
-        
-        # Calculer scale_pos_weight pour gérer le déséquilibre
-        scale_pos_weight = (y_train_clf == 0).sum() / (y_train_clf == 1).sum()
-        
-        # Entraînement XGBoost Classifier avec meilleurs hyperparamètres
-        model_classification = xgb.XGBClassifier(
-            n_estimators=200,
-            max_depth=6,
-            learning_rate=0.05,
-            subsample=0.8,
-            colsample_bytree=0.8,
-            scale_pos_weight=scale_pos_weight,
-            random_state=42,
-            n_jobs=-1
-        )
-        
-        logger.info("Entraînement du modèle de classification...")
-        model_classification.fit(X_train_clf, y_train_clf)
-        
-        # Prédictions
-        y_pred_clf = model_classification.predict(X_test_clf)
-        y_pred_proba_clf = model_classification.predict_proba(X_test_clf)[:, 1]
-        
-        # Métriques complètes
-        from sklearn.metrics import precision_score, recall_score, f1_score, roc_auc_score
-        
-        accuracy = accuracy_score(y_test_clf, y_pred_clf)
-        precision = precision_score(y_test_clf, y_pred_clf)
-        recall = recall_score(y_test_clf, y_pred_clf)
-        f1 = f1_score(y_test_clf, y_pred_clf)
-        roc_auc = roc_auc_score(y_test_clf, y_pred_proba_clf)
-        
-        logger.info(f"Métriques du modèle de classification:")
-        logger.info(f"  Accuracy: {accuracy:.4f}")
-        logger.info(f"  Precision: {precision:.4f}")
-        logger.info(f"  Recall: {recall:.4f}")
-        logger.info(f"  F1-Score: {f1:.4f}")
-        logger.info(f"  ROC-AUC: {roc_auc:.4f}")
-        logger.info("\nClassification Report:")
-        logger.info(classification_report(y_test_clf, y_pred_clf))
-        
-        # Feature importance
-        feature_importance_clf = pd.DataFrame({
-            'feature': feature_cols_classification,
-            'importance': model_classification.feature_importances_
-        }).sort_values('importance', ascending=False)
-        
-        logger.info("\nTop 5 features importantes (classification):")
-        logger.info(feature_importance_clf.head().to_string())
+        budgets = thread_budgets(regression_threads, classification_threads)
+        
+        if mode == 'external':
+            spool_dir = tempfile.mkdtemp(prefix='features-', dir=cache_dir)
+            batches = training_batches(engine, batch_rows, spool_dir)
+            results = train_concurrently(batches, external_fits(cache_dir), budgets)
+            predictions = external_predictions(batches, results)
+        else:
+            # Lire les features (artefact colonnaire, sinon staging)
+            df = load_training_features(engine)
+            logger.info(f"Features chargées: {len(df)} lignes, {len(df.columns)} colonnes")
+            results = train_concurrently(df, {
+                'demand_prediction': fit_regression,
+                'late_delivery_risk': fit_classification,
+            }, budgets)
+            predictions = in_memory_predictions(df, results)
         
         # ===== SAUVEGARDE DES MODÈLES =====
-        models_dir = os.path.join(os.path.dirname(__file__), '..', 'ml_models')
-        os.makedirs(models_dir, exist_ok=True)
-        
-        # Sauvegarder modèle de régression
-        regression_model_path = os.path.join(models_dir, 'demand_prediction_model.pkl')
-        with open(regression_model_path, 'wb') as f:
-            pickle.dump(model_regression, f)
-        logger.info(f"Modèle de régression sauvegardé: {regression_model_path}")
-        
-        # Sauvegarder modèle de classification
-        classification_model_path = os.path.join(models_dir, 'late_delivery_risk_model.pkl')
-        with open(classification_model_path, 'wb') as f:
-            pickle.dump(model_classification, f)
-        logger.info(f"Modèle de classification sauvegardé: {classification_model_path}")
+        save_models(results['demand_prediction']['model'], results['late_delivery_risk']['model'])
         
         # ===== SAUVEGARDE DES PRÉDICTIONS =====
         logger.info("\nSauvegarde des prédictions dans la base de données...")
-        
-        # Prédictions sur l'ensemble complet
-        df['predicted_sales'] = model_regression.predict(X_reg)
-        df['predicted_late_risk'] = model_classification.predict(X_clf)
-        df['predicted_late_risk_proba'] = model_classification.predict_proba(X_clf)[:, 1]
-        
-        # Sauvegarder dans PostgreSQL
-        # Supprimer la vue dépendante si elle existe avant de supprimer la table
-        with engine.begin() as conn:
-            try:
-                conn.execute(text("DROP VIEW IF EXISTS analytics_analytics.ml_predictions CASCADE"))
-                logger.info("Vue ml_predictions supprimée")
-            except Exception as e:
-                logger.warning(f"Erreur lors de la suppression de la vue: {e}")
-        
-        predictions_df = df[[
-            'order_id', 'order_item_id', 'order_date',
-            'sales', 'predicted_sales',
-            'late_delivery_risk', 'predicted_late_risk', 'predicted_late_risk_proba'
-        ]]
-        
-        predictions_df.to_sql(
-            'ml_predictions',
-            engine,
-            schema='analytics',
-            if_exists='replace',
-            index=False,
-            method='multi',
-            chunksize=1000
-        )
-        
-        logger.info(f"Prédictions sauvegardées: {len(predictions_df)} lignes")
+        write_predictions(engine, predictions)
         
         # Sauvegarder les métriques (plusieurs lignes pour toutes les métriques)
-        metrics_data = [
-            {'model_name': 'demand_prediction', 'model_type': 'regression', 'metric_name': 'r2_score', 
-             'metric_value': r2, 'training_date': datetime.now(), 
-             'n_features': len(feature_cols_regression), 'n_samples_train': len(X_train_reg)},
-            {'model_name': 'demand_prediction', 'model_type': 'regression', 'metric_name': 'mae', 
-             'metric_value': mae, 'training_date': datetime.now(), 
-             'n_features': len(feature_cols_regression), 'n_samples_train': len(X_train_reg)},
-            {'model_name': 'demand_prediction', 'model_type': 'regression', 'metric_name': 'rmse', 
-             'metric_value': rmse, 'training_date': datetime.now(), 
-             'n_features': len(feature_cols_regression), 'n_samples_train': len(X_train_reg)},
-            {'model_name': 'late_delivery_risk', 'model_type': 'classification', 'metric_name': 'accuracy', 
-             'metric_value': accuracy, 'training_date': datetime.now(), 
-             'n_features': len(feature_cols_classification), 'n_samples_train': len(X_train_clf)},
-            {'model_name': 'late_delivery_risk', 'model_type': 'classification', 'metric_name': 'precision', 
-             'metric_value': precision, 'training_date': datetime.now(), 
-             'n_features': len(feature_cols_classification), 'n_samples_train': len(X_train_clf)},
-            {'model_name': 'late_delivery_risk', 'model_type': 'classification', 'metric_name': 'recall', 
-             'metric_value': recall, 'training_date': datetime.now(), 
-             'n_features': len(feature_cols_classification), 'n_samples_train': len(X_train_clf)},
-            {'model_name': 'late_delivery_risk', 'model_type': 'classification', 'metric_name': 'f1_score', 
-             'metric_value': f1, 'training_date': datetime.now(), 
-             'n_features': len(feature_cols_classification), 'n_samples_train': len(X_train_clf)},
-            {'model_name': 'late_delivery_risk', 'model_type': 'classification', 'metric_name': 'roc_auc', 
-             'metric_value': roc_auc, 'training_date': datetime.now(), 
-             'n_features': len(feature_cols_classification), 'n_samples_train': len(X_train_clf)}
-        ]
-        
-        metrics_df = pd.DataFrame(metrics_data)
+        metrics_data = results['demand_prediction']['metrics'] + results['late_delivery_risk']['metrics']
+        save_metrics(engine, metrics_data)
         
-        # Supprimer la vue dépendante si elle existe avant de supprimer la table
-        with engine.begin() as conn:
-            try:
-                conn.execute(text("DROP VIEW IF EXISTS analytics_analytics.ml_model_metrics CASCADE"))
-                logger.info("Vue ml_model_metrics supprimée")
-            except Exception as e:
-                logger.warning(f"Erreur lors de la suppression de la vue: {e}")
+        metrics = {row['metric_name']: row['metric_value'] for row in metrics_data}
+        return f"Entraînement réussi - R²: {metrics['r2_score']:.4f}, Accuracy: {metrics['accuracy']:.4f}"
         
-        metrics_df.to_sql(
-            'ml_model_metrics',
-            engine,
-            schema='analytics',
-            if_exists='replace',
-            index=False
+    except Exception as e:
+        logger.exception(f"Erreur lors de l'entraînement du modèle: {e}")
+        raise
+    finally:
+        if spool_dir is not None:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+# Modèles couverts par la recherche d'hyperparamètres: features, cible, métrique de validation
+TUNING_TARGETS = {
+    'demand_prediction': (REGRESSION_FEATURES, 'sales', 'rmse'),
+    'late_delivery_risk': (CLASSIFICATION_FEATURES, 'late_delivery_risk', 'auc'),
+}
+
+
+def tuning_matrices(df: pd.DataFrame, features: list, label: str, valid_size: float = 0.2, seed: int = 42) -> tuple:
+    """
+    Matrices quantifiées de la recherche, construites une seule fois
+    
+    Seul le côté 'train' du découpage par hachage des clés (training_data.split_mask)
+    est utilisé; il est lui-même découpé en ajustement / validation (early
+    stopping) par un second hachage. Construites avec un seul thread: les
+    processus de la recherche en héritent par fork (voir hyperparameter_search).
+    """
+    train = df[~split_mask(df[KEY_COLUMNS], 0.2, seed)]
+    valid = split_mask(train[KEY_COLUMNS], valid_size, seed + 1)
+    dfit = xgb.QuantileDMatrix(
+        train.loc[~valid, features].fillna(0), label=train.loc[~valid, label], nthread=1
+    )
+    dvalid = xgb.QuantileDMatrix(
+        train.loc[valid, features].fillna(0), label=train.loc[valid, label], ref=dfit, nthread=1
+    )
+    return dfit, dvalid
+
+
+def tuning_base_params(model_name: str, dfit) -> dict:
+    """Paramètres fixes des essais: objectif et graine du modèle entraîné, métrique de validation"""
+    if model_name == 'demand_prediction':
+        params = xgb.XGBRegressor(**REGRESSION_PARAMS).get_xgb_params()
+    else:
+        labels = dfit.get_label()
+        params = xgb.XGBClassifier(
+            **CLASSIFICATION_PARAMS, scale_pos_weight=(labels == 0).sum() / (labels == 1).sum()
+        ).get_xgb_params()
+    params = {name: value for name, value in params.items() if value is not None and name != 'n_jobs'}
+    return {**params, 'tree_method': 'hist', 'eval_metric': TUNING_TARGETS[model_name][2]}
+
+
+def tuning_rows(model_name: str, records: list, best: dict, n_features: int, n_samples_train: int,
+                search_seconds: float) -> list:
+    """
+    Lignes de analytics.ml_model_metrics d'une recherche
+    
+    - 'tuning_trial': un groupe de lignes par essai et par palier, model_name
+      '<modèle>/trial_<n>/rung_<k>' (hyperparamètres, tours, score de
+      validation, durée et temps CPU)
+    - 'tuning_best': meilleure configuration, n_estimators = meilleure
+      itération + 1
+    """
+    metric = TUNING_TARGETS[model_name][2]
+    training_date = datetime.now()
+    rows = []
+    
+    def add(name, model_type, values):
+        rows.extend(
+            {'model_name': name, 'model_type': model_type, 'metric_name': metric_name,
+             'metric_value': float(value), 'training_date': training_date,
+             'n_features': n_features, 'n_samples_train': n_samples_train}
+            for metric_name, value in values.items()
         )
+    
+    for record in records:
+        if record['status'] == 'skipped':
+            continue
+        add(f"{model_name}/trial_{record['trial']:03d}/rung_{record['rung']}", 'tuning_trial', {
+            **{name: record['params'][name] for name in SEARCH_SPACE},
+            'num_boost_round': record['num_boost_round'],
+            'rounds': record['rounds'],
+            'best_iteration': record['best_iteration'],
+            f'valid_{metric}': record['score'],
+            'wall_seconds': record['wall_seconds'],
+            'cpu_seconds': record['cpu_seconds'],
+            'stopped_by_deadline': record['status'] == 'deadline',
+        })
+    if best is not None:
+        add(model_name, 'tuning_best', {
+            **{name: best['params'][name] for name in SEARCH_SPACE},
+            'n_estimators': best['best_iteration'] + 1,
+            f'valid_{metric}': best['score'],
+            'trials': sum(record['status'] != 'skipped' for record in records),
+            'search_seconds': search_seconds,
+        })
+    return rows
+
+
+@track_db_usage
+def tune_hyperparameters(
+    search: str = 'halving',
+    n_trials: int = 27,
+    max_rounds: int = 400,
+    time_budget: float = None,
+    workers: int = None,
+    threads_per_trial: int = None,
+    early_stopping_rounds: int = 20,
+    models: tuple = tuple(TUNING_TARGETS),
+):
+    """
+    Recherche d'hyperparamètres des modèles de demande et de retard
+    
+    Recherche aléatoire ('random') ou par divisions successives ('halving')
+    sur un pool de processus (hyperparameter_search.run_search), avec early
+    stopping sur une partie de validation. Les features sont lues une fois;
+    les matrices quantifiées de chaque modèle sont construites une fois et
+    partagées par tous les essais. time_budget (secondes) borne la durée
+    totale, répartie entre les modèles restants.
+    
+    Le tableau des essais et la meilleure configuration de chaque modèle
+    remplacent ceux de la recherche précédente dans analytics.ml_model_metrics;
+    les métriques d'entraînement sont conservées.
+    """
+    try:
+        engine = get_db_connection()
+        create_analytics_schema(engine)
         
-        logger.info("Métriques des modèles sauvegardées")
+        df = load_training_features(engine)
+        logger.info(f"Features chargées: {len(df)} lignes, {len(df.columns)} colonnes")
         
-        return f"Entraînement réussi - R²: {r2:.4f}, Accuracy: {accuracy:.4f}"
+        start = time.perf_counter()
+        rows, summary = [], []
+        for i, model_name in enumerate(models):
+            features, label, metric = TUNING_TARGETS[model_name]
+            logger.info(f"\n=== Recherche d'hyperparamètres: {model_name} ({search}, {n_trials} configurations) ===")
+            dfit, dvalid = tuning_matrices(df, features, label)
+            logger.info(f"Matrices quantifiées: {dfit.num_row()} lignes d'ajustement, {dvalid.num_row()} de validation")
+            
+            budget = None
+            if time_budget is not None:
+                budget = max(0.0, time_budget - (time.perf_counter() - start)) / (len(models) - i)
+            model_start = time.perf_counter()
+            base_params = tuning_base_params(model_name, dfit)
+            records = run_search(
+                dfit, dvalid, base_params,
+                method=search, n_trials=n_trials, max_rounds=max_rounds,
+                early_stopping_rounds=early_stopping_rounds, workers=workers,
+                threads_per_trial=threads_per_trial, time_budget=budget,
+            )
+            search_seconds = time.perf_counter() - model_start
+            best = best_trial(records, is_maximized(base_params))
+            
+            for record in records:
+                if record['status'] == 'skipped':
+                    continue
+                logger.info(
+                    f"  essai {record['trial']:3d} palier {record['rung']}: {metric} {record['score']:.4f} "
+                    f"en {record['rounds']}/{record['num_boost_round']} tours, {record['wall_seconds']:.2f}s "
+                    f"(CPU {record['cpu_seconds']:.2f}s, {record['status']})"
+                )
+            skipped = sum(record['status'] == 'skipped' for record in records)
+            if skipped:
+                logger.warning(f"{skipped} essais non exécutés: budget de temps atteint")
+            if best is None:
+                logger.warning(f"Aucun essai terminé pour {model_name}")
+            else:
+                best_params = {name: round(best['params'][name], 4) for name in SEARCH_SPACE}
+                logger.info(f"Meilleure configuration ({metric} {best['score']:.4f}, "
+                            f"{best['best_iteration'] + 1} arbres): {best_params}")
+                summary.append(f"{model_name}: {metric} {best['score']:.4f}")
+            
+            rows += tuning_rows(model_name, records, best, len(features), dfit.num_row(), search_seconds)
+        
+        if rows:
+            save_metrics(engine, rows)
+        logger.info(f"Recherche terminée en {time.perf_counter() - start:.2f}s")
+        return f"Recherche terminée - {', '.join(summary) or 'aucun essai terminé'}"
         
     except Exception as e:
-        logger.exception(f"Erreur lors de l'entraînement du modèle: {e}")
+        logger.exception(f"Erreur lors de la recherche d'hyperparamètres: {e}")
         raise
 
 
 if __name__ == "__main__":
-    result = train_demand_prediction_model()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Entraînement des modèles de demande et de retard")
+    parser.add_argument('--mode', choices=['memory', 'external', 'tune'], default='memory',
+                        help="tune: recherche d'hyperparamètres au lieu de l'entraînement")
+    parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS, help="lignes par bloc (mode external)")
+    parser.add_argument('--cache-dir', default=None, help="pages de la matrice sur disque (mode external)")
+    parser.add_argument('--regression-threads', type=int, default=None, help="threads du modèle de régression")
+    parser.add_argument('--classification-threads', type=int, default=None, help="threads du modèle de classification")
+    parser.add_argument('--search', choices=['random', 'halving'], default='halving', help="stratégie (mode tune)")
+    parser.add_argument('--trials', type=int, default=27, help="configurations essayées (mode tune)")
+    parser.add_argument('--max-rounds', type=int, default=400, help="tours de boosting maximum par essai (mode tune)")
+    parser.add_argument('--time-budget', type=float, default=None, help="durée maximale en secondes (mode tune)")
+    parser.add_argument('--workers', type=int, default=None, help="essais en parallèle (mode tune)")
+    args = parser.parse_args()
+    
+    if args.mode == 'tune':
+        result = tune_hyperparameters(
+            search=args.search,
+            n_trials=args.trials,
+            max_rounds=args.max_rounds,
+            time_budget=args.time_budget,
+            workers=args.workers,
+        )
+    else:
+        result = train_demand_prediction_model(
+            mode=args.mode,
+            batch_rows=args.batch_rows,
+            cache_dir=args.cache_dir,
+            regression_threads=args.regression_threads,
+            classification_threads=args.classification_threads,
+        )
     print(result)
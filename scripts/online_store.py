@@ -0,0 +1,178 @@
+"""
+Feature store en ligne pour le scoring en temps réel
+
+Les features par client et par région d'un calcul de features sont
+publiées dans un répertoire versionné de tableaux NumPy:
+
+    <root>/<version>/meta.json             entités, noms des features, infos du calcul
+    <root>/<version>/<entity>.keys.npy     clés int64 triées (ou .keys.json pour des clés texte)
+    <root>/<version>/<entity>.values.npy   matrice float64, une ligne par clé
+    <root>/CURRENT                         nom de la version à servir
+
+Les lecteurs projettent les matrices de valeurs en mémoire (mmap): ouvrir
+une version ne coûte aucun temps de chargement et plusieurs processus de
+scoring partagent les mêmes pages. Les recherches par lot (get_many) sont
+un searchsorted sur les clés triées plus une indexation de la matrice:
+quelques microsecondes pour des lots courants. Les clés inconnues ont des
+features NaN.
+
+Une nouvelle version est écrite à côté de celle servie et CURRENT est
+basculé de façon atomique; les plus anciennes versions au-delà de `keep`
+sont supprimées.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = os.getenv(
+    "ONLINE_STORE_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "ml_models", "online_features"),
+)
+CURRENT = "CURRENT"
+
+# entité -> (colonne clé, features)
+ENTITIES = {
+    "customer": (
+        "customer_id",
+        ["customer_total_orders", "customer_total_sales", "customer_avg_order_value", "customer_late_delivery_rate"],
+    ),
+    "region": ("order_region", ["region_late_delivery_rate", "region_avg_sales"]),
+}
+
+
+def publish(
+    frames: dict[str, pd.DataFrame],
+    root: str = DEFAULT_ROOT,
+    version: str | None = None,
+    info: dict | None = None,
+    keep: int = 3,
+) -> str:
+    """
+    Écrire une version du store et en faire la version courante
+    
+    `frames` associe à chaque entité un DataFrame indexé par clé, une colonne
+    par feature. `info` (par exemple le mode de calcul, le watermark de
+    chargement) est enregistré dans meta.json. Retourne le nom de la version.
+    """
+    version = version or time.strftime("%Y%m%dT%H%M%S")
+    target = os.path.join(root, version)
+    tmp = f"{target}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    entities = {}
+    for entity, frame in frames.items():
+        frame = frame[frame.index.notna()]
+        if pd.api.types.is_integer_dtype(frame.index.dtype):
+            frame = frame.sort_index()
+            np.save(os.path.join(tmp, f"{entity}.keys.npy"), frame.index.to_numpy(dtype=np.int64))
+            key_kind = "int"
+        else:
+            with open(os.path.join(tmp, f"{entity}.keys.json"), "w", encoding="utf-8") as f:
+                json.dump([str(k) for k in frame.index], f)
+            key_kind = "text"
+        np.save(os.path.join(tmp, f"{entity}.values.npy"), np.ascontiguousarray(frame.to_numpy(dtype=np.float64)))
+        entities[entity] = {
+            "key": frame.index.name,
+            "key_kind": key_kind,
+            "features": [str(c) for c in frame.columns],
+            "rows": len(frame),
+        }
+
+    meta = {"version": version, "created_at": time.time(), "entities": entities, "info": info or {}}
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, default=str)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    pointer = os.path.join(root, f"{CURRENT}.tmp")
+    with open(pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(root, CURRENT))
+
+    for old in list_versions(root)[:-keep]:
+        if old != version:
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    logger.info("Features en ligne %s publiées: %s", version, {e: m["rows"] for e, m in entities.items()})
+    return version
+
+
+def list_versions(root: str = DEFAULT_ROOT) -> list[str]:
+    """Versions publiées, de la plus ancienne à la plus récente"""
+    if not os.path.isdir(root):
+        return []
+    versions = [
+        name for name in os.listdir(root)
+        if not name.endswith(".tmp") and os.path.isfile(os.path.join(root, name, "meta.json"))
+    ]
+    return sorted(versions, key=lambda name: (os.path.getmtime(os.path.join(root, name, "meta.json")), name))
+
+
+@dataclass
+class _Entity:
+    features: list[str]
+    values: np.ndarray
+    keys: np.ndarray | None = None
+    positions: dict | None = None
+
+    def rows(self, keys) -> tuple[np.ndarray, np.ndarray]:
+        """(ligne de chaque clé, masque des clés trouvées)"""
+        if self.positions is not None:
+            rows = np.fromiter((self.positions.get(str(k), -1) for k in keys), dtype=np.int64)
+            return rows, rows >= 0
+        keys = np.asarray(keys, dtype=np.int64)
+        if not len(self.keys):
+            return np.zeros(len(keys), dtype=np.int64), np.zeros(len(keys), dtype=bool)
+        rows = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return rows, self.keys[rows] == keys
+
+
+class OnlineFeatureStore:
+    """Côté lecture: recherches en mémoire projetée dans une version publiée"""
+
+    def __init__(self, root: str = DEFAULT_ROOT, version: str | None = None) -> None:
+        if version is None:
+            with open(os.path.join(root, CURRENT), encoding="utf-8") as f:
+                version = f.read().strip()
+        path = os.path.join(root, version)
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.version = version
+        self._entities = {}
+        for entity, spec in self.meta["entities"].items():
+            values = np.load(os.path.join(path, f"{entity}.values.npy"), mmap_mode="r")
+            if spec["key_kind"] == "int":
+                keys = np.load(os.path.join(path, f"{entity}.keys.npy"), mmap_mode="r")
+                self._entities[entity] = _Entity(spec["features"], values, keys=keys)
+            else:
+                with open(os.path.join(path, f"{entity}.keys.json"), encoding="utf-8") as f:
+                    positions = {key: i for i, key in enumerate(json.load(f))}
+                self._entities[entity] = _Entity(spec["features"], values, positions=positions)
+
+    def features(self, entity: str) -> list[str]:
+        return self._entities[entity].features
+
+    def get_many(self, entity: str, keys) -> np.ndarray:
+        """Matrice de features (len(keys) x n_features) de `keys`; lignes NaN pour les clés inconnues"""
+        e = self._entities[entity]
+        rows, found = e.rows(keys)
+        out = np.full((len(rows), len(e.features)), np.nan)
+        out[found] = e.values[rows[found]]
+        return out
+
+    def get(self, entity: str, key) -> dict[str, float] | None:
+        """Features d'une clé, None si elle est inconnue"""
+        e = self._entities[entity]
+        rows, found = e.rows([key])
+        return dict(zip(e.features, e.values[rows[0]].tolist())) if found[0] else None
@@ -0,0 +1,108 @@
+"""
+Cache en colonnes des fichiers CSV analysés
+
+Le DataFrame analysé et typé est stocké dans un fichier Arrow IPC (Feather v2)
+non compressé, indexé par le hachage du contenu du fichier source et les
+options d'analyse: un CSV inchangé est projeté en mémoire au lieu d'être
+réanalysé depuis le texte. pyarrow est optionnel: sans lui, chaque lecture
+revient à pd.read_csv.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - depends on the environment
+    feather = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "PARSE_CACHE_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "dataset", ".parse_cache"),
+)
+DEFAULT_MAX_BYTES = int(os.getenv("PARSE_CACHE_MAX_MB", "2048")) * 1024 * 1024
+CACHE_SUFFIX = ".arrow"
+
+
+def file_content_hash(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 du contenu du fichier, lu par blocs"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(path: str, read_options: dict) -> str:
+    """Clé de cache combinant le hachage du contenu et les options d'analyse"""
+    options = json.dumps(read_options, sort_keys=True, default=str)
+    return hashlib.sha256(f"{file_content_hash(path)}:{options}".encode()).hexdigest()
+
+
+def evict(cache_dir: str, max_bytes: int) -> list[str]:
+    """Supprimer les fichiers du cache les moins récemment utilisés jusqu'à tenir dans max_bytes"""
+    entries = sorted(Path(cache_dir).glob(f"*{CACHE_SUFFIX}"), key=lambda p: p.stat().st_mtime)
+    total = sum(p.stat().st_size for p in entries)
+    removed = []
+    for entry in entries:
+        if total <= max_bytes:
+            break
+        total -= entry.stat().st_size
+        entry.unlink(missing_ok=True)
+        removed.append(entry.name)
+    if removed:
+        logger.info("Cache d'analyse: %d fichier(s) évincé(s) pour rester sous %d octets", len(removed), max_bytes)
+    return removed
+
+
+def read_csv_cached(
+    path: str,
+    cache_dir: str | None = None,
+    max_bytes: int | None = None,
+    **read_options,
+) -> pd.DataFrame:
+    """
+    Lire un CSV à travers le cache en colonnes
+    
+    Si le fichier est en cache, le fichier Arrow est projeté en mémoire;
+    sinon, le CSV est analysé avec pd.read_csv(path, **read_options) et le
+    résultat est écrit dans le cache, puis les entrées les plus anciennes
+    sont évincées pour respecter max_bytes.
+    """
+    if feather is None:
+        logger.warning("Cache d'analyse désactivé (pyarrow non installé)")
+        return pd.read_csv(path, **read_options)
+
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    max_bytes = DEFAULT_MAX_BYTES if max_bytes is None else max_bytes
+    key = cache_key(path, read_options)
+    cached = Path(cache_dir) / f"{key}{CACHE_SUFFIX}"
+
+    if cached.exists():
+        logger.info("Cache d'analyse trouvé: %s -> %s", path, cached.name)
+        os.utime(cached)  # rafraîchir la position LRU
+        table = feather.read_table(str(cached), memory_map=True)
+        return table.to_pandas(split_blocks=True)
+
+    logger.info("Cache d'analyse absent: %s", path)
+    df = pd.read_csv(path, **read_options)
+
+    try:
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_suffix(".tmp")
+        feather.write_feather(df, str(tmp), compression="uncompressed")
+        os.replace(tmp, cached)
+        evict(cache_dir, max_bytes)
+    except Exception as e:  # un échec d'écriture du cache ne doit pas faire échouer la lecture
+        logger.warning("Cache d'analyse: impossible de stocker %s: %s", path, e)
+
+    return df
@@ -0,0 +1,104 @@
+"""
+Agrégats par client et par région à date (point-in-time)
+
+Les agrégats de create_features décrivent chaque client / région sur
+toutes les commandes, futures comprises, ce qui fait fuiter le futur dans
+les lignes d'entraînement. Ici, chaque commande reçoit les statistiques de
+son client et de sa région à sa date de commande: seules comptent les
+commandes passées strictement avant cette date (celles du même jour sont
+exclues, leur issue n'est pas encore connue).
+
+Les lignes sont triées une fois par (clé, date). Des sommes cumulées par
+groupe donnent ensuite à chaque ligne les totaux au début de son bloc
+(clé, date): le calcul entier est en O(n log n) au lieu d'un parcours de
+l'historique par ligne. Les moyennes et taux sans commande antérieure
+prennent la valeur globale à date (toutes les commandes avant cette date,
+toutes clés confondues).
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+# Colonnes sommées par asof_totals, avec leurs nombres de valeurs non nulles
+ASOF_COLUMNS = ("sales", "late_delivery_risk")
+
+
+def asof_totals(
+    df: pd.DataFrame,
+    key: str | None,
+    time: str = "order_date",
+    columns: tuple[str, ...] = ASOF_COLUMNS,
+) -> pd.DataFrame:
+    """
+    Par ligne, totaux sur les lignes de même `key` à un `time` strictement antérieur
+    
+    Retourne un DataFrame aligné sur df.index avec "orders" (lignes ayant un
+    order_id) et, par colonne, "<column>_n" (valeurs non nulles) et
+    "<column>_sum". key=None agrège sur toutes les lignes; les lignes dont
+    la clé est NULL reçoivent NaN.
+    """
+    n = len(df)
+    codes = np.zeros(n, dtype=np.int64) if key is None else pd.factorize(df[key])[0]
+    times = pd.to_datetime(df[time]).to_numpy(dtype="datetime64[ns]").astype(np.int64)
+
+    # un seul tri par (clé, date): lexsort trie d'abord sur la dernière clé
+    order = np.lexsort((times, codes))
+    sorted_codes, sorted_times = codes[order], times[order]
+    position = np.arange(n)
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = sorted_codes[1:] != sorted_codes[:-1]
+    new_block = new_group.copy()
+    new_block[1:] |= sorted_times[1:] != sorted_times[:-1]
+    group_start = np.maximum.accumulate(np.where(new_group, position, 0))
+    block_start = np.maximum.accumulate(np.where(new_block, position, 0))
+
+    def before(values: np.ndarray) -> np.ndarray:
+        """Somme de `values` (ordre trié) sur les blocs antérieurs du groupe, dans l'ordre d'origine"""
+        cumulative = np.concatenate([[0.0], np.cumsum(values[order])])
+        result = np.empty(n)
+        result[order] = cumulative[block_start] - cumulative[group_start]
+        return result
+
+    totals = {"orders": before(df["order_id"].notna().to_numpy(dtype=np.float64))}
+    for column in columns:
+        values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        present = ~np.isnan(values)
+        totals[f"{column}_n"] = before(present.astype(np.float64))
+        totals[f"{column}_sum"] = before(np.where(present, values, 0.0))
+    result = pd.DataFrame(totals, index=df.index)
+    if key is not None:
+        result[codes < 0] = np.nan
+    return result
+
+
+def _ratio(total: pd.Series, count: pd.Series, fallback: pd.Series) -> pd.Series:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = total / count.where(count > 0)
+    return ratio.fillna(fallback)
+
+
+def asof_features(df: pd.DataFrame, time: str = "order_date") -> pd.DataFrame:
+    """Versions à date des features customer_* et region_* de create_features"""
+    overall = asof_totals(df, None, time)
+    customer = asof_totals(df, "customer_id", time)
+    region = asof_totals(df, "order_region", time)
+    overall_avg = _ratio(overall["sales_sum"], overall["sales_n"], np.nan)
+    overall_late = _ratio(overall["late_delivery_risk_sum"], overall["late_delivery_risk_n"], np.nan)
+    return pd.DataFrame({
+        "customer_total_orders": customer["orders"],
+        "customer_total_sales": customer["sales_sum"],
+        "customer_avg_order_value": _ratio(customer["sales_sum"], customer["sales_n"], overall_avg),
+        "customer_late_delivery_rate": _ratio(
+            customer["late_delivery_risk_sum"], customer["late_delivery_risk_n"], overall_late
+        ),
+        "region_late_delivery_rate": _ratio(region["late_delivery_risk_sum"], region["late_delivery_risk_n"], overall_late),
+        "region_avg_sales": _ratio(region["sales_sum"], region["sales_n"], overall_avg),
+    }, index=df.index)
+
+
+def asof_overrides(df: pd.DataFrame, time: str = "order_date") -> dict:
+    """Remplacements de compute_features substituant aux agrégats sur tout l'historique leurs valeurs à date"""
+    features = asof_features(df, time)
+    return {name: (lambda ctx, name=name: features[name].to_numpy()) for name in features.columns}
@@ -0,0 +1,284 @@
+"""
+Sketches probabilistes fusionnables pour les entrées trop grandes pour des ensembles exacts
+
+- BloomFilter: test d'appartenance en flux ("cette clé a-t-elle déjà été
+  vue ?"), utilisé pour la détection approchée des clés en double. Aucun
+  faux négatif; le taux de faux positifs est borné par l'`error_rate` pour
+  lequel le filtre a été dimensionné.
+- HyperLogLog: comptage des valeurs distinctes dans un nombre fixe de
+  registres, avec une erreur type relative d'environ 1.04 / sqrt(2 ** precision).
+
+Les deux sont mis à jour par colonnes entières (NumPy, sans boucle Python
+sur les lignes) et se fusionnent exactement: des sketches construits sur
+des blocs ou des processus séparés avec les mêmes paramètres se combinent
+en le sketch de l'union. Les clés sont hachées avec hash_pandas_object de
+pandas: on peut ajouter toute Series ou tout DataFrame de colonnes clés.
+"""
+
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import pandas as pd
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def hash_keys(keys: pd.Series | pd.DataFrame) -> np.ndarray:
+    """Hachage 64 bits par ligne d'une Series ou d'un DataFrame de colonnes clés"""
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy(dtype=np.uint64)
+
+
+def _mix64(h: np.ndarray) -> np.ndarray:
+    """Finaliseur splitmix64: un second hachage, d'apparence indépendante, tiré du premier"""
+    with np.errstate(over="ignore"):
+        z = h + _GOLDEN
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def _bit_length(w: np.ndarray) -> np.ndarray:
+    """
+    Longueur exacte en bits de chaque uint64
+    
+    frexp n'est exact que sur les entiers inférieurs à 2 ** 53: les parties
+    haute et basse sont donc mesurées séparément.
+    """
+    high = np.frexp((w >> np.uint64(11)).astype(np.float64))[1]
+    low = np.frexp((w & np.uint64(0x7FF)).astype(np.float64))[1]
+    return np.where(high > 0, high + 11, low)
+
+
+class BloomFilter:
+    """
+    Filtre de Bloom dimensionné pour `capacity` clés à un taux de faux positifs cible
+    
+    Utilise m = -n ln(p) / ln(2)^2 bits et k = (m / n) ln(2) sondes dérivées
+    par double hachage (h1 + i * h2).
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 1e-7) -> None:
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError("capacity doit être > 0 et 0 < error_rate < 1")
+        self.capacity = int(capacity)
+        self.error_rate = float(error_rate)
+        self.n_bits = max(64, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        if self.n_bits >= 1 << 32:
+            raise ValueError("Filtre de Bloom de plus de 2**32 bits: découper l'entrée ou augmenter error_rate")
+        self.n_hashes = max(1, int(round(self.n_bits / capacity * math.log(2))))
+        self.bits = np.zeros((self.n_bits + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, hashes: np.ndarray) -> np.ndarray:
+        h2 = _mix64(hashes) | np.uint64(1)
+        probes = np.arange(self.n_hashes, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            positions = hashes[:, None] + probes[None, :] * h2[:, None]
+        # réduction d'intervalle par multiplication-décalage des 32 bits de poids fort (sans division)
+        return ((positions >> np.uint64(32)) * np.uint64(self.n_bits)) >> np.uint64(32)
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        positions = self._positions(hashes).ravel()
+        offsets = (positions & np.uint64(7)).astype(np.uint8)
+        byte_index = positions >> np.uint64(3)
+        # Une passe par position de bit: les indices d'octet en double écrivent
+        # alors tous la même valeur, l'affectation indexée est donc sûre (ufunc.at est lent)
+        for offset in range(8):
+            selected = byte_index[offsets == offset]
+            self.bits[selected] |= np.uint8(1 << offset)
+        self.count += len(hashes)
+
+    def contains_hashes(self, hashes: np.ndarray) -> np.ndarray:
+        positions = self._positions(hashes)
+        bits = (self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return bits.all(axis=1)
+
+    def add(self, keys: pd.Series | pd.DataFrame) -> None:
+        self.add_hashes(hash_keys(keys))
+
+    def contains(self, keys: pd.Series | pd.DataFrame) -> np.ndarray:
+        """Tableau booléen: True si la clé a (probablement) été ajoutée, False si elle ne l'a certainement pas été"""
+        return self.contains_hashes(hash_keys(keys))
+
+    def merge(self, other: "BloomFilter") -> "BloomFilter":
+        """Union sur place avec un filtre de même taille"""
+        if (self.n_bits, self.n_hashes) != (other.n_bits, other.n_hashes):
+            raise ValueError("Impossible de fusionner des filtres de Bloom de paramètres différents")
+        np.bitwise_or(self.bits, other.bits, out=self.bits)
+        self.count += other.count
+        return self
+
+    def false_positive_rate(self) -> float:
+        """Taux de faux positifs attendu au remplissage actuel"""
+        return (1 - math.exp(-self.n_hashes * self.count / self.n_bits)) ** self.n_hashes
+
+
+class HyperLogLog:
+    """
+    Compteur de valeurs distinctes HyperLogLog à 2 ** precision registres d'un octet
+    
+    À construire à partir d'une erreur relative cible avec HyperLogLog.for_error(0.01).
+    """
+
+    def __init__(self, precision: int = 14) -> None:
+        if not 4 <= precision <= 18:
+            raise ValueError("precision doit être entre 4 et 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @classmethod
+    def for_error(cls, relative_error: float) -> "HyperLogLog":
+        precision = math.ceil(2 * math.log2(1.04 / relative_error))
+        return cls(min(max(precision, 4), 18))
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        rest = hashes << p
+        # rang = zéros de tête des 64 - p bits restants, plus un
+        rank = 65 - np.maximum(_bit_length(rest), self.precision)
+        # Affecter les rangs par ordre croissant pour que chaque registre finisse
+        # à son maximum (une passe masquée par valeur de rang; ufunc.at est lent)
+        rank = rank.astype(np.uint8)
+        updated = np.zeros_like(self.registers)
+        for r in range(1, int(rank.max(initial=0)) + 1):
+            updated[index[rank == r]] = r
+        np.maximum(self.registers, updated, out=self.registers)
+
+    def add(self, values: pd.Series | pd.DataFrame, dropna: bool = True) -> None:
+        """Ajouter des valeurs; les valeurs nulles sont ignorées par défaut, comme Series.nunique()"""
+        if dropna:
+            values = values.dropna()
+        self.add_hashes(hash_keys(values))
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if self.precision != other.precision:
+            raise ValueError("Impossible de fusionner des sketches HyperLogLog de précisions différentes")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # correction des petites valeurs (comptage linéaire)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class QuantileSketch:
+    """
+    Sketch de quantiles en flux de type KLL
+    
+    Les valeurs sont gardées dans des niveaux de compacteurs: quand un niveau
+    dépasse sa capacité, il est trié et un élément sur deux (décalage
+    aléatoire) passe au niveau suivant avec un poids double. L'erreur de
+    rang est en O(1/k); avec k=400 par défaut, les quantiles sont en général
+    à ~1 % de rang près. La fusion concatène les niveaux puis compacte à nouveau.
+    """
+
+    def __init__(self, k: int = 400, seed: int | None = None) -> None:
+        self.k = k
+        self.n = 0
+        self.levels: list[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                items = np.sort(items)
+                # un élément impair restant reste à ce niveau
+                keep, items = items[len(items) - len(items) % 2:], items[:len(items) - len(items) % 2]
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def add(self, values) -> None:
+        """Ajouter un lot de valeurs; les NaN sont ignorés"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.n += len(values)
+            self._compress()
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantiles(self, qs) -> np.ndarray:
+        """Quantiles approchés (NaN quand le sketch est vide)"""
+        qs = np.asarray(qs, dtype=np.float64)
+        values = np.concatenate(self.levels)
+        if not len(values):
+            return np.full(qs.shape, np.nan)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values)
+        values, cumulative = values[order], np.cumsum(weights[order])
+        # rangs aux points milieux, interpolés linéairement comme par défaut dans pandas
+        positions = (cumulative - weights[order] / 2) / cumulative[-1]
+        return np.interp(qs, positions, values)
+
+
+class FrequentItems:
+    """
+    Valeurs fréquentes de Misra-Gries: comptes des valeurs les plus fréquentes
+    
+    Garde au plus `max_items` compteurs. Les comptes sont des bornes
+    inférieures, à au plus n / max_items près: la valeur la plus fréquente et
+    sa fréquence sont exactes pour toute valeur plus fréquente que cela.
+    Fusionnable.
+    """
+
+    def __init__(self, max_items: int = 1000) -> None:
+        self.max_items = max_items
+        self.counts = pd.Series(dtype=np.int64)
+
+    def _trim(self) -> None:
+        if len(self.counts) > self.max_items:
+            threshold = self.counts.nlargest(self.max_items + 1).iloc[-1]
+            counts = self.counts - threshold
+            self.counts = counts[counts > 0]
+
+    def add(self, values: pd.Series) -> None:
+        counts = values.value_counts(dropna=True)
+        # value_counts() d'une catégorielle liste aussi les catégories inutilisées
+        counts = counts[counts > 0]
+        counts.index = counts.index.astype(object)
+        self.merge_counts(counts)
+
+    def merge_counts(self, counts: pd.Series) -> None:
+        self.counts = self.counts.add(counts.astype(np.int64), fill_value=0).astype(np.int64)
+        self._trim()
+
+    def merge(self, other: "FrequentItems") -> "FrequentItems":
+        self.merge_counts(other.counts)
+        return self
+
+    def top(self) -> tuple:
+        """(valeur la plus fréquente, son compte), ou (None, None) si vide"""
+        if self.counts.empty:
+            return None, None
+        return self.counts.idxmax(), int(self.counts.max())
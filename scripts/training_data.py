@@ -0,0 +1,218 @@
+"""
+Données d'entraînement par blocs pour XGBoost en mémoire externe
+
+Une source de lots est un appelable retournant un nouvel itérateur de
+DataFrames de features: des tranches des lots d'enregistrements de
+l'artefact Arrow projeté en mémoire (artifact_batches) ou des blocs d'un
+curseur côté serveur sur staging.features_ml (table_batches). XGBoost
+parcourt une source plusieurs fois (sketch, puis construction de la
+matrice quantifiée): elle doit rejouer les mêmes lignes. Chaque passe sur
+une source table est un nouveau parcours trié de la table: spool_batches
+la lit une fois dans un fichier Arrow local et rejoue celui-ci.
+
+L'appartenance à l'entraînement ou au test est un hachage de la clé de la
+ligne (split_mask) plutôt qu'une copie mélangée: chaque passe et chaque
+taille de lot place une ligne du même côté, et rien n'est matérialisé.
+FeatureBatchIter fournit un côté du découpage à xgboost.QuantileDMatrix,
+qui ne garde que les intervalles quantifiés (environ un octet par valeur),
+ou à une DMatrix en mémoire externe dont les pages sont mises en cache sur
+disque (training_matrix).
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Callable, Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import xgboost as xgb
+
+from dataco_schema import FEATURES_ML_DTYPES, apply_schema, conform_frame
+from db import read_sql_chunks
+from feature_artifact import DEFAULT_ARTIFACT_DIR
+from sketches import _mix64, hash_keys
+
+KEY_COLUMNS = ["order_id", "order_item_id"]
+DEFAULT_BATCH_ROWS = 200_000
+
+BatchSource = Callable[[], Iterator[pd.DataFrame]]
+
+
+def split_mask(keys: pd.DataFrame, test_size: float = 0.2, seed: int = 42) -> np.ndarray:
+    """True pour les lignes du côté test: un hachage uniforme des colonnes clés inférieur à test_size"""
+    mixed = _mix64(hash_keys(keys) ^ np.uint64(seed))
+    return (mixed >> np.uint64(11)).astype(np.float64) / float(1 << 53) < test_size
+
+
+def artifact_batches(
+    manifest: dict,
+    columns: list[str],
+    root: str = DEFAULT_ARTIFACT_DIR,
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+) -> BatchSource:
+    """Tranches sans copie des lots d'enregistrements de l'artefact, colonnes `columns` seulement"""
+    path = os.path.join(root, manifest["version"])
+
+    def batches() -> Iterator[pd.DataFrame]:
+        for name in manifest["files"]:
+            yield from _file_batches(os.path.join(path, name), columns, batch_rows)
+
+    return batches
+
+
+def _file_batches(path: str, columns: list[str] | None = None, batch_rows: int | None = None) -> Iterator[pd.DataFrame]:
+    """DataFrames des lots d'enregistrements d'un fichier Arrow, découpés en batch_rows (lots entiers si None)"""
+    with pa.memory_map(path) as source:
+        reader = ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if columns is not None:
+                batch = batch.select(columns)
+            step = batch_rows or max(batch.num_rows, 1)
+            for start in range(0, batch.num_rows, step):
+                yield apply_schema(batch.slice(start, step).to_pandas(), FEATURES_ML_DTYPES)
+
+
+def table_batches(
+    columns: list[str],
+    engine=None,
+    table_name: str = "features_ml",
+    schema: str = "staging",
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+) -> BatchSource:
+    """
+    Blocs de `columns` par curseur côté serveur, dans l'ordre des clés pour que chaque passe rejoue les mêmes lots
+    
+    Sans engine, chaque passe utilise l'engine du processus qui la rejoue
+    (db.get_engine): une source confiée à des workers forkés ne partage
+    jamais les connexions du pool du parent.
+    """
+    query = f"SELECT {', '.join(columns)} FROM {schema}.{table_name} ORDER BY {', '.join(KEY_COLUMNS)}"
+
+    def batches() -> Iterator[pd.DataFrame]:
+        for chunk in read_sql_chunks(query, engine, chunksize=batch_rows):
+            yield apply_schema(chunk, FEATURES_ML_DTYPES)
+
+    return batches
+
+
+def spool_batches(batches: BatchSource, path: str) -> BatchSource:
+    """
+    Lire une source une fois dans un fichier Arrow non compressé à `path` et rejouer ce fichier
+    
+    Un lot d'enregistrements par lot de la source: les lots rejoués sont les
+    mêmes. Les processus forkés après l'écriture partagent ses pages via le
+    cache de pages.
+    """
+    writer = None
+    with pa.OSFile(path, "wb") as sink:
+        for df in batches():
+            table = pa.Table.from_pandas(conform_frame(df.copy(deep=False), FEATURES_ML_DTYPES), preserve_index=False)
+            if writer is None:
+                writer = ipc.new_file(sink, table.schema)
+            writer.write_table(table)
+        if writer is not None:
+            writer.close()
+
+    def replay() -> Iterator[pd.DataFrame]:
+        if writer is not None:
+            yield from _file_batches(path)
+
+    return replay
+
+
+def split_batches(
+    batches: BatchSource,
+    subset: str | None = None,
+    test_size: float = 0.2,
+    seed: int = 42,
+) -> Iterator[pd.DataFrame]:
+    """Lignes d'un côté du découpage ("train" ou "test"), ou toutes les lignes si subset vaut None"""
+    for df in batches():
+        if subset is not None:
+            test = split_mask(df[KEY_COLUMNS], test_size, seed)
+            df = df[test if subset == "test" else ~test]
+        if len(df):
+            yield df
+
+
+class FeatureBatchIter(xgb.DataIter):
+    """DataIter xgboost sur un côté d'une source de lots (NaN des features remplacés par 0, comme à l'entraînement)"""
+
+    def __init__(
+        self,
+        batches: BatchSource,
+        features: list[str],
+        label: str,
+        subset: str | None = "train",
+        test_size: float = 0.2,
+        seed: int = 42,
+        cache_prefix: str | None = None,
+    ) -> None:
+        self.batches = batches
+        self.features = list(features)
+        self.label = label
+        self.subset = subset
+        self.test_size = test_size
+        self.seed = seed
+        self._iterator: Iterator[pd.DataFrame] | None = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data: Callable) -> int:
+        if self._iterator is None:
+            self._iterator = split_batches(self.batches, self.subset, self.test_size, self.seed)
+        df = next(self._iterator, None)
+        if df is None:
+            return 0
+        input_data(data=df[self.features].fillna(0), label=df[self.label].to_numpy())
+        return 1
+
+    def reset(self) -> None:
+        if self._iterator is not None:
+            self._iterator.close()
+        self._iterator = None
+
+
+def training_matrix(
+    batches: BatchSource,
+    features: list[str],
+    label: str,
+    subset: str | None = "train",
+    test_size: float = 0.2,
+    seed: int = 42,
+    max_bin: int = 256,
+    cache_dir: str | None = None,
+    ref: xgb.DMatrix | None = None,
+) -> xgb.DMatrix:
+    """
+    Matrice quantifiée d'un côté du découpage, construite lot par lot
+    
+    Sans cache_dir: une QuantileDMatrix gardant les intervalles en mémoire.
+    Avec cache_dir: une DMatrix en mémoire externe paginant dans ce répertoire.
+    `ref` réutilise les bornes des intervalles d'une matrice d'entraînement
+    (jeux de validation).
+    """
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        iterator = FeatureBatchIter(
+            batches, features, label, subset, test_size, seed, cache_prefix=os.path.join(cache_dir, subset or "all")
+        )
+        return xgb.DMatrix(iterator)
+    iterator = FeatureBatchIter(batches, features, label, subset, test_size, seed)
+    return xgb.QuantileDMatrix(iterator, max_bin=max_bin, ref=ref)
+
+
+def predict_batches(
+    booster: xgb.Booster,
+    batches: BatchSource,
+    features: list[str],
+    subset: str | None = None,
+    test_size: float = 0.2,
+    seed: int = 42,
+) -> Iterator[tuple[pd.DataFrame, np.ndarray]]:
+    """Paires (lot, prédictions) sur un côté du découpage"""
+    for df in split_batches(batches, subset, test_size, seed):
+        yield df, booster.inplace_predict(df[features].fillna(0))
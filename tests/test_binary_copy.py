@@ -0,0 +1,80 @@
+import struct
+
+import pytest
+
+
+def _payload(np, pd, rows, float_format=">f", extension=b""):
+    """Binary COPY stream of (smallint, real or double, timestamp) rows, None for NULL replaced by its sentinel."""
+    from scripts.db import _PG_EPOCH_US
+
+    out = bytearray(b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, len(extension)) + extension)
+    for a, b, d in rows:
+        out += struct.pack(">h", 3)
+        out += struct.pack(">ih", 2, -2 ** 15 if a is None else a)
+        out += struct.pack(">i", struct.calcsize(float_format)) + struct.pack(float_format, np.nan if b is None else b)
+        us = -2 ** 63 if d is None else pd.Timestamp(d).value // 1000 - _PG_EPOCH_US
+        out += struct.pack(">iq", 8, us)
+    return bytes(out + b"\xff\xff")
+
+
+def test_reader_decodes_rows_split_across_writes():
+    np = pytest.importorskip("numpy")
+    pd = pytest.importorskip("pandas")
+    from scripts.db import BinaryCopyReader
+
+    rows = [(i % 7, i / 4, f"2017-01-{i % 28 + 1:02d} 10:30") for i in range(200)]
+    rows[5] = (None, None, None)
+    payload = _payload(np, pd, rows, extension=b"xyz")
+    dtypes = {"a": "int8", "b": "float32", "d": "datetime64[ns]"}
+    reader = BinaryCopyReader(["a", "b", "d"], dtypes, n_rows=len(rows), buffer_bytes=64)
+    for start in range(0, len(payload), 13):
+        reader.write(payload[start:start + 13])
+    df = reader.frame()
+
+    assert len(df) == 200
+    # integer column with a NULL comes back as float64, like read_sql
+    assert df["a"].dtype == np.float64 and np.isnan(df.loc[5, "a"])
+    assert df["b"].dtype == np.float32 and np.isnan(df.loc[5, "b"])
+    assert df["d"].dtype == "datetime64[ns]" and pd.isna(df.loc[5, "d"])
+    assert df.loc[6, "a"] == 6 and df.loc[6, "b"] == np.float32(1.5)
+    assert df.loc[199, "d"] == pd.Timestamp("2017-01-04 10:30")
+    # the frame wraps the preallocated arrays
+    assert np.shares_memory(df["b"].to_numpy(), reader.arrays["b"])
+
+
+def test_reader_keeps_integer_dtype_without_nulls_and_rejects_bad_streams():
+    np = pytest.importorskip("numpy")
+    pd = pytest.importorskip("pandas")
+    from scripts.db import BinaryCopyReader
+
+    dtypes = {"a": "int16", "b": "float64", "d": "datetime64[ns]"}
+    payload = _payload(np, pd, [(1, 0.5, "2016-02-29"), (-2, 1.0, "2018-12-31")], float_format=">d")
+    reader = BinaryCopyReader(["a", "b", "d"], dtypes, n_rows=2)
+    reader.write(payload)
+    assert reader.frame()["a"].tolist() == [1, -2]
+    assert reader.frame()["a"].dtype == np.int16
+
+    too_many = BinaryCopyReader(["a", "b", "d"], dtypes, n_rows=1, buffer_bytes=1)
+    with pytest.raises(ValueError):
+        too_many.write(payload)
+
+    truncated = BinaryCopyReader(["a", "b", "d"], dtypes, n_rows=2)
+    truncated.write(payload[:-5])
+    with pytest.raises(ValueError):
+        truncated.frame()
+
+
+def test_binary_copy_select_casts_and_replaces_nulls():
+    pytest.importorskip("numpy")
+    from scripts.db import binary_copy_select
+
+    sql = binary_copy_select("staging.features_ml", ["sales", "is_weekend", "order_date"], {
+        "sales": "float32", "is_weekend": "int8", "order_date": "datetime64[ns]",
+    })
+    assert sql == (
+        "SELECT COALESCE(\"sales\"::float4, 'NaN'::float4), "
+        "COALESCE(\"is_weekend\"::int2, '-32768'::int2), "
+        "COALESCE(\"order_date\"::timestamp, '-infinity'::timestamp) FROM staging.features_ml"
+    )
+    with pytest.raises(ValueError):
+        binary_copy_select("t", ["market"], {"market": "category"})
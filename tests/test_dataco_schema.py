@@ -0,0 +1,53 @@
+import pytest
+
+from scripts.dataco_schema import FEATURES_ML_DTYPES, RAW_DTYPES, apply_schema, conform_frame, header_read_options
+
+
+def test_header_read_options_matches_stripped_names():
+    options = header_read_options([" order_id ", "market", "order_date_dateorders", "unknown"])
+
+    assert options["dtype"] == {" order_id ": "int32", "market": "category"}
+    assert options["parse_dates"] == ["order_date_dateorders"]
+
+
+def test_apply_schema_compacts_and_keeps_uncastable_columns():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    df = pd.DataFrame({
+        "order_id": [1, 2, 3],
+        "market": ["Europe", "LATAM", "Europe"],
+        "sales": [10.5, 20.25, 30.0],
+        "order_date_dateorders": ["2017-01-01", "2017-01-02", "2017-01-03"],
+        "customer_id": [1.0, np.nan, 3.0],  # int32 declared, but has a NaN
+    })
+    inferred_bytes = df.memory_usage(deep=True).sum()
+
+    apply_schema(df, RAW_DTYPES)
+
+    assert df["order_id"].dtype == "int32"
+    assert df["market"].dtype == "category"
+    assert df["sales"].dtype == "float32"
+    assert df["order_date_dateorders"].dtype == "datetime64[ns]"
+    assert df["customer_id"].dtype == "float64"
+    assert df.memory_usage(deep=True).sum() < inferred_bytes
+
+
+def test_conform_frame_keeps_integer_columns_with_nulls_integral():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    # a partition whose shipping days are missing on one row: featurized as float64
+    df = pd.DataFrame({
+        "order_id": [1, 2],
+        "days_for_shipping_real": [4.0, np.nan],
+        "sales": [10.5, 20.25],
+    })
+
+    conform_frame(df, FEATURES_ML_DTYPES)
+
+    assert df["order_id"].dtype == "int32"
+    assert df["days_for_shipping_real"].dtype == "Int8"
+    assert df["sales"].dtype == "float32"
+    # COPY csv: an integer and an empty field (NULL), never "4.0"
+    assert df.to_csv(index=False, header=False).splitlines() == ["1,4,10.5", "2,,20.25"]
+    with pytest.raises((TypeError, ValueError)):
+        conform_frame(pd.DataFrame({"order_id": ["a"]}), FEATURES_ML_DTYPES)
@@ -0,0 +1,17 @@
+import re
+from pathlib import Path
+
+from scripts.dataco_schema import FEATURES_ML_DTYPES
+
+MODEL = Path(__file__).resolve().parents[1] / "dbt" / "models" / "features" / "features_ml.sql"
+
+
+def test_dbt_feature_model_produces_every_features_ml_column():
+    sql = MODEL.read_text(encoding="utf-8")
+    encoded = re.search(r"set encoded_columns = \[(.*?)\]", sql).group(1)
+    # aliased expressions, plus columns passed through on their own line
+    aliases = set(re.findall(r"\bAS (\w+)", sql)) | set(re.findall(r"(?m)^\s+(\w+),?$", sql))
+    aliases |= {f"{c.strip(chr(39) + ' ')}_encoded" for c in encoded.split(",")}
+
+    missing = [c for c in FEATURES_ML_DTYPES if c not in aliases]
+    assert not missing
@@ -0,0 +1,31 @@
+import pytest
+
+
+def test_charts_rendered_in_pool_then_cached(tmp_path):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("matplotlib")
+    pytest.importorskip("seaborn")
+    from scripts.eda_charts import render_charts
+    from scripts.eda_profile import profile_dataframe
+
+    df = pd.DataFrame({
+        "order_region": pd.Categorical(["Oceania", "South Asia", "Oceania", "East Africa"] * 50),
+        "late_delivery_risk": [0, 1, 1, 0] * 50,
+        "sales": [10.0, 25.5, 40.0, 12.0] * 50,
+        "order_item_total": [9.0, 25.0, 38.0, 11.0] * 50,
+        "order_profit_per_order": [1.0, -2.0, 5.0, 0.5] * 50,
+        "days_for_shipping_real": [2, 5, 3, 1] * 50,
+        "days_for_shipment_scheduled": [2, 4, 2, 1] * 50,
+    })
+    profile = profile_dataframe(df)
+
+    first = render_charts(profile, tmp_path, workers=2)
+    assert not any(t["cached"] for t in first.values())
+    assert all((tmp_path / name).exists() for name in first)
+
+    second = render_charts(profile, tmp_path, workers=2)
+    assert all(t["cached"] for t in second.values())
+
+    profile.region_sales = profile.region_sales * 2
+    third = render_charts(profile, tmp_path, workers=2)
+    assert [name for name, t in third.items() if not t["cached"]] == ["sales_by_region.png"]
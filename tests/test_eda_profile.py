@@ -0,0 +1,33 @@
+import pytest
+
+from scripts.eda_profile import _describe_from_row, profile_sql
+
+
+def test_profile_sql_is_one_scan_with_correlations():
+    sql = profile_sql({"sales": "numeric", "order_item_total": "numeric", "market": "text"}, "raw_data.t")
+
+    assert sql.count("FROM") == 1
+    assert "CORR(\"sales\", \"order_item_total\") AS corr_0_1" in sql
+    assert "mode() WITHIN GROUP" in sql
+    assert "percentile_cont(ARRAY[0.25, 0.5, 0.75])" in sql
+
+
+def test_describe_rebuilt_from_sql_aggregates_matches_pandas():
+    pd = pytest.importorskip("pandas")
+    df = pd.DataFrame({
+        "sales": [10.0, 12.5, None, 40.0, 7.0],
+        "market": ["Europe", "LATAM", "Europe", None, "Europe"],
+    })
+    sales = df["sales"].dropna()
+    # the aggregate row PostgreSQL would return for this frame
+    row = {
+        "c0__count": 4, "c0__unique": 4, "c0__mean": sales.mean(), "c0__std": sales.std(),
+        "c0__min": sales.min(), "c0__max": sales.max(), "c0__quantiles": list(sales.quantile([0.25, 0.5, 0.75])),
+        "c1__count": 4, "c1__unique": 2, "c1__top": "Europe",
+    }
+
+    rebuilt = _describe_from_row(row, {"sales": "numeric", "market": "text"}, {"market": 3})
+    expected = df.describe(include="all")
+
+    assert list(rebuilt.index) == list(expected.index)
+    pd.testing.assert_frame_equal(rebuilt.astype(object), expected.astype(object), check_dtype=False)
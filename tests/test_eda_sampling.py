@@ -0,0 +1,64 @@
+import pytest
+
+
+def test_reservoir_is_uniform_and_bounded():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    from scripts.eda_sampling import ReservoirSampler
+
+    n, size, trials = 1000, 100, 300
+    frame = pd.DataFrame({"row": np.arange(n)})
+    hits = np.zeros(n)
+    for seed in range(trials):
+        sampler = ReservoirSampler(size, seed=seed)
+        for start in range(0, n, 64):
+            sampler.update(frame.iloc[start:start + 64])
+        assert len(sampler.sample) == size and sampler.seen == n
+        assert sampler.sample["row"].is_unique
+        hits[sampler.sample["row"].to_numpy()] += 1
+
+    inclusion = hits / trials
+    # every row kept with probability size / n = 0.1, early and late rows alike
+    assert abs(inclusion[:500].mean() - 0.1) < 0.01
+    assert abs(inclusion[500:].mean() - 0.1) < 0.01
+
+
+def test_confidence_intervals():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    from scripts.eda_sampling import group_total_ci, mean_ci, proportion_ci
+
+    rate, low, high = proportion_ci(30, 100)
+    assert rate == 0.3
+    assert low == pytest.approx(0.2189, abs=1e-4) and high == pytest.approx(0.3958, abs=1e-4)
+
+    values = pd.Series(np.arange(100, dtype=float))
+    mean, low, high = mean_ci(values)
+    assert low < mean == 49.5 < high
+    # sampling the whole population leaves no uncertainty
+    assert mean_ci(values, population=100)[1:] == (49.5, 49.5)
+
+    sample = pd.DataFrame({"region": ["A", "A", "B", "B"] * 25, "sales": [1.0, 3.0, 10.0, 10.0] * 25})
+    totals = group_total_ci(sample, "region", "sales", population=1000)
+    assert list(totals.index) == ["B", "A"]
+    assert totals.loc["B", "estimate"] == pytest.approx(5000.0)
+    assert totals.loc["A", "estimate"] == pytest.approx(1000.0)
+    assert (totals["ci_low"] < totals["estimate"]).all() and (totals["estimate"] < totals["ci_high"]).all()
+
+
+def test_tablesample_query():
+    from scripts.eda_sampling import tablesample_query
+
+    assert tablesample_query("raw_data.t", 0.01) == "SELECT * FROM raw_data.t TABLESAMPLE BERNOULLI (1.000000)"
+    assert tablesample_query("raw_data.t", 0.5, "system", seed=7).endswith("TABLESAMPLE SYSTEM (50.000000) REPEATABLE (7)")
+
+
+def test_reservoir_rejects_a_time_budget():
+    pytest.importorskip("pandas")
+    from scripts.eda_sampling import read_sample
+
+    # a scan cut short by the budget would be a prefix of the table, not a uniform sample
+    with pytest.raises(ValueError):
+        read_sample(None, method="reservoir", time_budget=5.0)
+    with pytest.raises(ValueError):
+        read_sample(None, method="reservoir", fraction=0.1, time_budget=5.0)
@@ -0,0 +1,61 @@
+import pytest
+
+
+def _raw(pd, np, n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "order_region": pd.Categorical(rng.choice(["Oceania", "South Asia", "East Africa"], n)),
+        "late_delivery_risk": rng.integers(0, 2, n).astype("int8"),
+        "order_date_dateorders": pd.Timestamp("2017-01-01") + pd.to_timedelta(rng.integers(0, 700, n), unit="D"),
+        "sales": rng.gamma(2.0, 100.0, n).astype("float32"),
+        "order_item_total": rng.gamma(2.0, 90.0, n).astype("float32"),
+        "order_profit_per_order": rng.normal(20.0, 50.0, n).astype("float32"),
+        "days_for_shipping_real": rng.integers(0, 7, n).astype("int8"),
+        "days_for_shipment_scheduled": rng.integers(0, 5, n).astype("int8"),
+    })
+
+
+def test_merged_state_matches_exact_profile():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    from scripts.eda_profile import profile_dataframe
+    from scripts.eda_state import ProfileState
+
+    old, new = _raw(pd, np, 6000, 0), _raw(pd, np, 4000, 1)
+    df = pd.concat([old, new], ignore_index=True)
+
+    # previous run's state, then a run that only sees the new rows
+    state, delta = ProfileState(), ProfileState()
+    state.update(old)
+    delta.update(new)
+    profile = state.merge(delta).to_profile()
+    exact = profile_dataframe(df)
+
+    assert profile.n_rows == len(df)
+    pd.testing.assert_frame_equal(profile.correlation, exact.correlation, atol=1e-9)
+    assert profile.late_delivery_counts.to_dict() == exact.late_delivery_counts.to_dict()
+    assert np.allclose(profile.region_sales.sort_index(), exact.region_sales.sort_index(), rtol=1e-5)
+    for stat in ["count", "mean", "std", "min", "max"]:
+        assert profile.describe.loc[stat, "sales"] == pytest.approx(exact.describe.loc[stat, "sales"], rel=1e-5)
+    assert profile.describe.loc["50%", "sales"] == pytest.approx(exact.describe.loc["50%", "sales"], rel=0.05)
+    assert profile.describe.loc["top", "order_region"] == exact.describe.loc["top", "order_region"]
+    assert profile.nunique["order_region"] == 3
+
+
+def test_std_is_stable_for_large_values_with_small_spread():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    from scripts.eda_state import ColumnState
+
+    rng = np.random.default_rng(3)
+    values = pd.Series(1.5e9 + rng.normal(0.0, 0.01, 30_000))
+    column, other = ColumnState("numeric"), ColumnState("numeric")
+    for start in range(0, len(values), 4_500):
+        column.update(values.iloc[start:start + 4_500])
+    other.update(values.iloc[:10])
+    column.merge(ColumnState("numeric")).merge(other)
+
+    expected = pd.concat([values, values.iloc[:10]])
+    stats = column.describe()
+    assert stats["mean"] == pytest.approx(expected.mean(), rel=1e-12)
+    assert stats["std"] == pytest.approx(expected.std(), rel=1e-6)
@@ -0,0 +1,41 @@
+import pytest
+
+
+def _write_csv(tmp_path, n_rows):
+    path = tmp_path / "orders.csv"
+    lines = ["order_id, order_item_id ,sales"]
+    lines += [f"{i},{i * 10},{i}.5" for i in range(n_rows)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def test_split_csv_byte_ranges_aligned_on_lines(tmp_path):
+    pytest.importorskip("sqlalchemy")
+    pytest.importorskip("dotenv")
+    from scripts.extract_data import split_csv_byte_ranges
+
+    path = _write_csv(tmp_path, 1000)
+    columns, ranges = split_csv_byte_ranges(str(path), 7)
+
+    assert columns == ["order_id", "order_item_id", "sales"]
+    assert len(ranges) == 7
+    data = path.read_bytes()
+    rows = []
+    for start, end in ranges:
+        chunk = data[start:end]
+        assert data[start - 1:start] == b"\n"
+        assert chunk.endswith(b"\n")
+        rows += chunk.decode("utf-8").splitlines()
+    assert rows == [f"{i},{i * 10},{i}.5" for i in range(1000)]
+
+
+def test_split_csv_byte_ranges_more_partitions_than_rows(tmp_path):
+    pytest.importorskip("sqlalchemy")
+    pytest.importorskip("dotenv")
+    from scripts.extract_data import split_csv_byte_ranges
+
+    path = _write_csv(tmp_path, 2)
+    _, ranges = split_csv_byte_ranges(str(path), 8)
+
+    assert 1 <= len(ranges) <= 2
+    assert ranges[-1][1] == path.stat().st_size
@@ -0,0 +1,72 @@
+import pytest
+
+
+def _features(pd, np, n, regions, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "order_item_id": np.arange(n, dtype=np.int32) + 1,
+        "order_date": pd.Timestamp("2017-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D"),
+        "order_region": pd.Categorical(rng.choice(regions, n)),
+        "sales": rng.gamma(2, 100, n).astype(np.float32),
+        "is_weekend": rng.integers(0, 2, n).astype(np.int8),
+    })
+
+
+def test_parts_with_different_categories_read_back_as_one_frame(tmp_path):
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("pyarrow")
+    from scripts.feature_artifact import begin, commit, current_manifest, read_columns, write_part
+
+    # a few categories in one part, more than 127 in the other (int8 vs int16 codes in pandas)
+    first = _features(pd, np, 300, ["West", "East"], seed=1)
+    second = _features(pd, np, 500, [f"Region {i}" for i in range(200)], seed=2)
+    path = begin(str(tmp_path), version="v1")
+    write_part(first, path, "part-0")
+    write_part(second, path, "part-1")
+    manifest = commit(path, source={"watermark": 12, "mode": "partitioned"})
+
+    assert current_manifest(str(tmp_path)) == manifest
+    assert manifest["rows"] == 800
+    assert manifest["files"] == ["part-0.arrow", "part-1.arrow"]
+    assert [f["name"] for f in manifest["schema"]] == list(first.columns)
+    assert manifest["source"] == {"watermark": 12, "mode": "partitioned"}
+
+    result = read_columns(manifest, ["order_region", "sales"], str(tmp_path))
+    expected = pd.concat([first, second], ignore_index=True)
+    assert list(result.columns) == ["order_region", "sales"]
+    assert result["sales"].dtype == np.float32
+    assert result["order_region"].astype(str).tolist() == expected["order_region"].astype(str).tolist()
+    np.testing.assert_array_equal(result["sales"].to_numpy(), expected["sales"].to_numpy())
+
+
+def test_mismatched_part_schemas_are_rejected(tmp_path):
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("pyarrow")
+    from scripts.feature_artifact import begin, commit, current_manifest, write_part
+
+    df = _features(pd, np, 10, ["West"], seed=3)
+    path = begin(str(tmp_path), version="v1")
+    write_part(df, path, "part-0")
+    write_part(df.drop(columns="sales"), path, "part-1")
+    with pytest.raises(ValueError):
+        commit(path)
+    assert current_manifest(str(tmp_path)) is None
+
+
+def test_invalidate_and_pruning(tmp_path):
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("pyarrow")
+    from scripts.feature_artifact import current_manifest, invalidate, publish_frame
+
+    df = _features(pd, np, 10, ["West"], seed=4)
+    for i in range(3):
+        publish_frame(df, root=str(tmp_path), version=f"v{i}", source={"watermark": i}, keep=2)
+    assert current_manifest(str(tmp_path))["version"] == "v2"
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_dir()) == ["v1", "v2"]
+
+    invalidate(str(tmp_path))
+    assert current_manifest(str(tmp_path)) is None
+    invalidate(str(tmp_path))
@@ -0,0 +1,60 @@
+import pytest
+
+
+def _facts(pd):
+    return pd.DataFrame({
+        "order_id": [1, 1, 2, 3],
+        "order_date": ["2017-01-01", "2017-02-28", "2017-03-04", "2017-12-31"],
+        "customer_id": [7, 7, 8, 8],
+        "order_quarter": [1, 1, 1, 4],
+        "days_for_shipping_real": [1, 3, 0, 4],
+        "days_for_shipment_scheduled": [2, 2, 1, 1],
+        "shipping_delay_days": [-1, 1, -1, 9],
+        "late_delivery_risk": [0, 1, 0, 1],
+        "delivery_status": ["Advance", "Late", "Advance", "Late"],
+        "market": ["Europe", "LATAM", "Europe", "USCA"],
+        "order_region": pd.Categorical(["West", "South", "West", None]),
+        "performance_score": ["Good", "Poor", "Good", "Poor"],
+        "sales": [100.0, 0.0, 50.0, 300.0],
+        "order_profit_per_order": [10.0, 5.0, -5.0, 30.0],
+    })
+
+
+def test_kernels_compute_vectorized_features():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    from scripts.feature_kernels import compute_features
+
+    df = compute_features(_facts(pd))
+
+    # 2017-01-01, 2017-03-04 and 2017-12-31 fall on a weekend
+    assert df["is_weekend"].tolist() == [1, 0, 1, 1]
+    assert df["days_since_year_start"].tolist() == [1, 59, 63, 365]
+    assert df["is_end_of_month"].tolist() == [0, 1, 0, 1]
+    assert df["is_beginning_of_month"].tolist() == [1, 0, 1, 0]
+    assert df["profit_margin"].tolist() == [10.0, 0.0, -10.0, 10.0]
+    assert df["is_severe_delay"].tolist() == [0, 0, 0, 1]
+    assert df["market_encoded"].tolist() == [0, 1, 0, 2]
+    assert df["customer_total_orders"].tolist() == [2, 2, 2, 2]
+    assert df["customer_total_sales"].tolist() == [100.0, 100.0, 350.0, 350.0]
+    # rows without a region get no region aggregate
+    assert df["region_avg_sales"].iloc[:3].tolist() == [75.0, 0.0, 75.0]
+    assert np.isnan(df["region_avg_sales"].iloc[3])
+    assert df["market_season_interaction"].tolist() == [0, 1, 0, 8]
+
+
+def test_kernel_dtypes_follow_feature_schema():
+    pytest.importorskip("pandas")
+    from scripts.dataco_schema import FEATURE_DTYPES
+    from scripts.feature_kernels import KERNELS
+
+    assert {name: k.dtype for name, k in KERNELS.items()} == FEATURE_DTYPES
+    assert list(KERNELS) == list(FEATURE_DTYPES)
+
+
+def test_missing_input_column_is_reported():
+    pd = pytest.importorskip("pandas")
+    from scripts.feature_kernels import compute_features
+
+    with pytest.raises(KeyError, match="customer_id"):
+        compute_features(_facts(pd).drop(columns="customer_id"), ["customer_total_orders"])
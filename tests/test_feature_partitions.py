@@ -0,0 +1,81 @@
+import pytest
+
+
+def _facts(pd, np, n, seed):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2017-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D")
+    delay = rng.integers(-2, 10, n)
+    return pd.DataFrame({
+        "order_id": np.arange(n) // 2 + 1,
+        "order_item_id": np.arange(n) + 1,
+        "order_date": dates,
+        "customer_id": rng.integers(1, 200, n),
+        "order_quarter": dates.quarter,
+        "days_for_shipping_real": rng.integers(0, 7, n),
+        "days_for_shipment_scheduled": rng.integers(0, 5, n),
+        "shipping_delay_days": delay,
+        "late_delivery_risk": (delay > 0).astype(int),
+        "delivery_status": rng.choice(["Late delivery", "Advance shipping", "Shipping on time"], n),
+        "order_region": rng.choice(["West", "South", "East", "North"], n),
+        "market": rng.choice(["Europe", "LATAM", "USCA"], n),
+        "sales": np.round(rng.gamma(2, 100, n), 2),
+        "order_profit_per_order": np.round(rng.normal(20, 50, n), 2),
+        "performance_score": rng.choice(["Excellent", "Good", "Poor"], n),
+    })
+
+
+def _partitioned(pd, np, facts, n_partitions, quantiles=None, chunksize=700):
+    from scripts.feature_partitions import GLOBAL_COLUMNS, GlobalFeatureState, featurize_partition
+    from scripts.sketches import hash_keys
+
+    state = GlobalFeatureState()
+    for start in range(0, len(facts), chunksize):
+        state.update(facts[list(GLOBAL_COLUMNS)].iloc[start:start + chunksize])
+    partition = hash_keys(facts["customer_id"]) % np.uint64(n_partitions)
+    parts = [
+        featurize_partition(facts[partition == p].copy(), state, quantiles)
+        for p in range(n_partitions)
+    ]
+    return state, pd.concat(parts).sort_values("order_item_id").reset_index(drop=True)
+
+
+def test_partitions_with_exact_thresholds_match_whole_table():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    from scripts.feature_kernels import compute_features
+    from scripts.feature_store import frame_thresholds
+
+    facts = _facts(pd, np, 4000, seed=3)
+    expected = compute_features(facts.copy())
+    _, result = _partitioned(pd, np, facts, n_partitions=5, quantiles=frame_thresholds(facts))
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-6)
+
+
+def test_sketch_thresholds_only_move_flags_near_the_threshold():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    from scripts.feature_kernels import compute_features
+    from scripts.feature_store import THRESHOLD_FLAGS, frame_thresholds
+
+    facts = _facts(pd, np, 20000, seed=4)
+    expected = compute_features(facts.copy())
+    state, result = _partitioned(pd, np, facts, n_partitions=3)
+
+    exact = frame_thresholds(facts)
+    for (column, q), value in state.quantiles().items():
+        rank = (facts[column] <= value).mean()
+        assert abs(rank - q) < 0.01, (column, q, value, exact[(column, q)])
+    for name in THRESHOLD_FLAGS:
+        assert (result[name] != expected[name]).mean() < 0.01
+    unaffected = [c for c in expected.columns if c not in THRESHOLD_FLAGS and c != "high_value_late_risk"]
+    pd.testing.assert_frame_equal(result[unaffected], expected[unaffected], check_exact=False, rtol=1e-6)
+
+
+def test_partitions_for_budget():
+    from scripts.feature_partitions import partitions_for_budget
+
+    # 10M rows of 200 bytes, x4 while featurizing: 8 GB over 4 workers with 1 GB
+    assert partitions_for_budget(10_000_000, 200, 1000, workers=4, expansion=4) == 32
+    # small tables still give every worker a partition
+    assert partitions_for_budget(1000, 200, 1000, workers=4) == 4
+    assert partitions_for_budget(0, 200, 1000, workers=1) == 1
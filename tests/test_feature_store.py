@@ -0,0 +1,136 @@
+import pytest
+
+
+def _facts(pd, np, n, seed):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2017-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D")
+    delay = rng.integers(-2, 10, n)
+    return pd.DataFrame({
+        "order_id": np.arange(n) // 2 + 1,
+        "order_item_id": np.arange(n) + 1,
+        "order_date": dates,
+        "customer_id": rng.integers(1, 60, n),
+        "order_quarter": dates.quarter,
+        "days_for_shipping_real": rng.integers(0, 7, n),
+        "days_for_shipment_scheduled": rng.integers(0, 5, n),
+        "shipping_delay_days": delay,
+        "late_delivery_risk": (delay > 0).astype(int),
+        "delivery_status": rng.choice(["Late delivery", "Advance shipping", "Shipping on time"], n),
+        "order_region": rng.choice(["West", "South", "East"], n),
+        "market": rng.choice(["Europe", "LATAM", "USCA"], n),
+        "sales": np.round(rng.gamma(2, 100, n), 2),
+        "order_profit_per_order": np.round(rng.normal(20, 50, n), 2),
+        "performance_score": rng.choice(["Excellent", "Good", "Poor"], n),
+    })
+
+
+def test_incremental_updates_match_full_rebuild():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    from scripts.dataco_schema import FACT_DTYPES, apply_schema
+    from scripts.feature_kernels import compute_features
+    from scripts.feature_store import FeatureStore, apply_to_frame, frame_thresholds
+
+    old = _facts(pd, np, 3000, seed=1)
+    new = _facts(pd, np, 400, seed=2)
+    new["order_item_id"] += len(old)
+    # new customers, a new region and a new category value arrive with the delta
+    new.loc[:49, "customer_id"] += 1000
+    new.loc[:9, "order_region"] = "North"
+    new.loc[:4, "market"] = "Africa"
+    new.loc[5, "order_region"] = None
+    full = apply_schema(pd.concat([old, new], ignore_index=True), FACT_DTYPES)
+    old, new = full.iloc[:len(old)].copy(), full.iloc[len(old):].copy()
+
+    rebuilt = FeatureStore().update(full.copy(), frame_thresholds(full)).rows
+
+    store = FeatureStore()
+    table = store.update(old, frame_thresholds(old)).rows
+    delta = store.update(new, frame_thresholds(full))
+    assert delta.thresholds  # the new rows moved the quantiles
+    assert len(delta.aggregates["customer_id"]) < full["customer_id"].nunique()
+    incremental = apply_to_frame(table, delta)
+
+    pd.testing.assert_frame_equal(incremental, rebuilt)
+    # a fresh store computes the same features as the kernels on the full frame
+    pd.testing.assert_frame_equal(rebuilt, compute_features(full.copy()))
+
+
+def test_threshold_updates_only_touch_rows_between_thresholds():
+    pd = pytest.importorskip("pandas")
+    from scripts.feature_store import FeatureDelta, threshold_updates_sql
+
+    delta = FeatureDelta(pd.DataFrame(), {}, {("sales", 0.75): (120.0, 110.0)})
+    [(statement, params)] = threshold_updates_sql(delta, "staging.features_ml")
+
+    assert statement.startswith('UPDATE staging.features_ml SET "is_high_value_order" = ')
+    assert '"high_value_late_risk" = (' in statement
+    assert statement.endswith('WHERE "sales" BETWEEN %(low)s AND %(high)s')
+    assert params == {"new": 110.0, "low": 110.0, "high": 120.0}
+
+
+class _Cursor:
+    def __init__(self, sent):
+        self.sent, self.rowcount = sent, 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params=None):
+        pass
+
+    def copy_expert(self, statement, buffer):
+        self.sent.append((statement, buffer.read()))
+
+
+class _Engine:
+    def __init__(self):
+        self.sent = []
+
+    def begin(self):
+        return _Cursor(self.sent)
+
+    def raw_connection(self):
+        engine = self
+
+        class _Raw:
+            def cursor(self):
+                return _Cursor(engine.sent)
+
+            def commit(self):
+                pass
+
+            def rollback(self):
+                pass
+
+            def close(self):
+                pass
+
+        return _Raw()
+
+
+def test_apply_to_table_copies_aggregates_with_the_table_types():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    from scripts.dataco_schema import FACT_DTYPES, apply_schema
+    from scripts.feature_store import FeatureStore, apply_to_table, frame_thresholds
+
+    facts = apply_schema(_facts(pd, np, 200, seed=3), FACT_DTYPES)
+    store = FeatureStore()
+    store.update(facts.iloc[:100].copy(), frame_thresholds(facts))
+    delta = store.update(facts.iloc[100:].copy(), frame_thresholds(facts))
+
+    engine = _Engine()
+    apply_to_table(engine, delta)
+
+    copies = {statement.split()[1]: payload for statement, payload in engine.sent}
+    customers = copies["pg_temp.features_customer_id_delta"].splitlines()
+    assert len(customers) == len(delta.aggregates["customer_id"])
+    # customer_id, customer_total_orders: INTEGER columns, so no "1.0"
+    for line in customers:
+        customer_id, total_orders = line.split(",")[:2]
+        assert customer_id.isdigit() and total_orders.isdigit()
+    assert len(copies["staging.features_ml"].splitlines()) == len(delta.rows)
@@ -0,0 +1,66 @@
+import pytest
+
+
+def _matrices(np, xgb, n, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 4)).astype(np.float32)
+    y = 3 * X[:, 0] - X[:, 1] ** 2 + rng.normal(scale=0.3, size=n)
+    dtrain = xgb.QuantileDMatrix(X[: n * 3 // 4], label=y[: n * 3 // 4], nthread=1)
+    dvalid = xgb.QuantileDMatrix(X[n * 3 // 4:], label=y[n * 3 // 4:], ref=dtrain, nthread=1)
+    return dtrain, dvalid
+
+
+def test_sampling_and_rungs():
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("xgboost")
+    from scripts.hyperparameter_search import SEARCH_SPACE, halving_rungs, is_maximized, sample_params
+
+    draws = [sample_params(np.random.default_rng(7)) for _ in range(2)]
+    assert draws[0] == draws[1]
+    for params in (sample_params(np.random.default_rng(seed)) for seed in range(50)):
+        for name, (kind, low, high) in SEARCH_SPACE.items():
+            assert low <= params[name] <= high
+            assert isinstance(params[name], int) == (kind == "int")
+
+    assert halving_rungs(27, 400) == [(27, 44), (9, 133), (3, 400)]
+    assert halving_rungs(9, 120) == [(9, 40), (3, 120)]
+    assert halving_rungs(4, 30) == [(4, 30)]
+    assert is_maximized({"eval_metric": "auc"}) and not is_maximized({"eval_metric": "rmse"})
+
+
+def test_successive_halving_promotes_the_best_trials():
+    np = pytest.importorskip("numpy")
+    xgb = pytest.importorskip("xgboost")
+    from scripts.hyperparameter_search import best_trial, run_search
+
+    dtrain, dvalid = _matrices(np, xgb, 2_000)
+    records = run_search(
+        dtrain, dvalid, {"objective": "reg:squarederror", "eval_metric": "rmse", "tree_method": "hist"},
+        method="halving", n_trials=9, max_rounds=90, eta=3, min_rounds=10,
+        early_stopping_rounds=10, workers=2, threads_per_trial=1,
+    )
+    assert [(r["rung"], r["num_boost_round"]) for r in records] == [(0, 10)] * 9 + [(1, 30)] * 3 + [(2, 90)]
+    first = sorted((r for r in records if r["rung"] == 0), key=lambda r: r["score"])
+    assert [r["trial"] for r in records if r["rung"] == 1] == [r["trial"] for r in first[:3]]
+    for record in records:
+        assert record["status"] in ("completed", "early_stopped")
+        assert 0 < record["rounds"] <= record["num_boost_round"]
+        assert record["wall_seconds"] > 0 and record["params"]["nthread"] == 1
+
+    best = best_trial(records, maximize=False)
+    assert best["rung"] == 2 and best["num_boost_round"] == 90
+
+
+def test_exhausted_time_budget_skips_trials():
+    np = pytest.importorskip("numpy")
+    xgb = pytest.importorskip("xgboost")
+    from scripts.hyperparameter_search import best_trial, run_search
+
+    dtrain, dvalid = _matrices(np, xgb, 500, seed=1)
+    records = run_search(
+        dtrain, dvalid, {"eval_metric": "rmse"}, method="random", n_trials=3, workers=1, time_budget=0,
+    )
+    assert [r["status"] for r in records] == ["skipped"] * 3
+    assert best_trial(records, maximize=False) is None
+    with pytest.raises(ValueError):
+        run_search(dtrain, dvalid, {}, method="grid")
@@ -0,0 +1,39 @@
+import io
+
+import pytest
+
+
+def _write_csv(tmp_path):
+    path = tmp_path / "orders.csv"
+    path.write_text(
+        "order_id,order_item_id,market,sales,order_date_dateorders,late_delivery_risk\n"
+        "1,10,Europe,327.75,1/31/2018 22:56,0\n"
+        "1,11,LATAM,11.1,1/13/2018 12:27,1\n"
+        "2,12,Europe,0.3,2/1/2018 9:05,0\n",
+        encoding="utf-8",
+    )
+    return path
+
+
+def test_full_load_manifest_leaves_no_delta_for_the_next_incremental_load(tmp_path):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("sqlalchemy")
+    pytest.importorskip("dotenv")
+    from scripts.dataco_schema import RAW_DTYPES, apply_schema, csv_read_options
+    from scripts.extract_data import changed_rows, manifest_rows
+
+    path = _write_csv(tmp_path)
+    df = pd.read_csv(path, **csv_read_options(str(path)))
+
+    # copy / insert: manifest hashed from the loaded frame
+    assert changed_rows(df, manifest_rows(df, 1)).empty
+    # stream / parallel: manifest hashed from the table read back with the declared types
+    table = apply_schema(pd.read_csv(io.StringIO(df.to_csv(index=False))), RAW_DTYPES)
+    assert changed_rows(df, manifest_rows(table, 1)).empty
+
+    updated = pd.read_csv(path, **csv_read_options(str(path)))
+    updated.loc[1, "sales"] = 12.5
+    updated = pd.concat([updated, updated.iloc[[0]].assign(order_item_id=13)], ignore_index=True)
+    delta = changed_rows(updated, manifest_rows(df, 1))
+    assert delta["order_item_id"].tolist() == [11, 13]
+    assert list(delta.index) == [1, 3]
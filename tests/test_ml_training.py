@@ -0,0 +1,155 @@
+import pytest
+
+
+def _training_frame(pd, np, n, seed=0):
+    from scripts.ml_modeling import CLASSIFICATION_FEATURES, REGRESSION_FEATURES
+
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        feature: rng.normal(size=n).astype(np.float32)
+        for feature in dict.fromkeys(REGRESSION_FEATURES + CLASSIFICATION_FEATURES)
+    })
+    df.insert(0, "order_id", np.arange(n, dtype=np.int32) + 1)
+    df.insert(1, "order_item_id", np.arange(n, dtype=np.int32) + 1)
+    df.insert(2, "order_date", pd.Timestamp("2017-01-01"))
+    df["sales"] = (100 + 20 * df["profit_margin"] + rng.normal(size=n)).astype(np.float32)
+    df["late_delivery_risk"] = (df["days_for_shipment_scheduled"] + rng.normal(scale=0.5, size=n) > 0).astype(np.int8)
+    return df
+
+
+def _fit_total(data, n_jobs):
+    return {"total": float(data["x"].sum())}
+
+
+def _fit_fails(data, n_jobs):
+    raise ValueError("échec du modèle")
+
+
+def test_concurrent_fits_see_the_shared_frame_and_report_timings():
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("xgboost")
+    from scripts.ml_modeling import thread_budgets, train_concurrently
+
+    budgets = thread_budgets(regression_threads=3, classification_threads=1)
+    assert budgets == {"demand_prediction": 3, "late_delivery_risk": 1}
+    assert all(n >= 1 for n in thread_budgets().values())
+
+    data = pd.DataFrame({"x": [1.0, 2.0, 3.5]})
+    results = train_concurrently(data, {"demand_prediction": _fit_total, "late_delivery_risk": _fit_total}, budgets)
+    assert set(results) == {"demand_prediction", "late_delivery_risk"}
+    for name, result in results.items():
+        assert result["total"] == 6.5
+        assert result["n_jobs"] == budgets[name]
+        assert result["wall_seconds"] >= 0 and result["cpu_seconds"] >= 0
+
+    with pytest.raises(ValueError):
+        train_concurrently(data, {"demand_prediction": _fit_fails, "late_delivery_risk": _fit_total}, budgets)
+
+
+def test_models_trained_concurrently_predict_the_full_table():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("xgboost")
+    pytest.importorskip("sklearn")
+    from scripts.ml_modeling import (
+        PREDICTION_COLUMNS, fit_classification, fit_regression, in_memory_predictions, train_concurrently,
+    )
+
+    df = _training_frame(pd, np, 1_500)
+    results = train_concurrently(df, {
+        "demand_prediction": fit_regression,
+        "late_delivery_risk": fit_classification,
+    }, {"demand_prediction": 1, "late_delivery_risk": 1})
+
+    metrics = {row["metric_name"]: row["metric_value"] for result in results.values() for row in result["metrics"]}
+    assert metrics["r2_score"] > 0.5 and metrics["accuracy"] > 0.7
+    # the thread budget only applies to training; saved models predict with all cores
+    assert results["demand_prediction"]["model"].n_jobs == -1
+    assert results["late_delivery_risk"]["model"].n_jobs == -1
+
+    (predictions,) = in_memory_predictions(df, results)
+    assert list(predictions.columns) == PREDICTION_COLUMNS and len(predictions) == len(df)
+    model = results["demand_prediction"]["model"]
+    np.testing.assert_allclose(predictions["predicted_sales"], model.predict(df[model.feature_names_in_]), rtol=1e-6)
+
+
+@pytest.mark.parametrize("spooled", [False, True])
+def test_table_fed_external_fits_open_their_own_connections(tmp_path, monkeypatch, spooled):
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("xgboost")
+    sqlalchemy = pytest.importorskip("sqlalchemy")
+    import db  # the module the scripts import by name
+    from scripts import ml_modeling
+    from scripts.dataco_schema import FEATURES_ML_DTYPES, apply_schema
+    from scripts.ml_modeling import (
+        TRAINING_COLUMNS, external_predictions, fit_classification_external, fit_regression_external,
+        train_concurrently, training_batches,
+    )
+
+    df = _training_frame(pd, np, 1_500)
+    staging = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'staging.db'}")
+    df[TRAINING_COLUMNS].sample(frac=1, random_state=0).to_sql("features_ml", staging, index=False)
+
+    def get_engine():
+        engine = sqlalchemy.create_engine("sqlite://")
+        sqlalchemy.event.listen(engine, "connect", lambda conn, _: conn.execute(
+            f"ATTACH DATABASE '{tmp_path / 'staging.db'}' AS staging"
+        ))
+        return engine
+
+    monkeypatch.setattr(db, "get_engine", get_engine)
+    monkeypatch.setattr(ml_modeling, "current_manifest", lambda: None)
+    # the parent's engine must not reach the forked workers
+    batches = training_batches(object(), batch_rows=400, spool_dir=str(tmp_path) if spooled else None)
+    results = train_concurrently(batches, {
+        "demand_prediction": fit_regression_external,
+        "late_delivery_risk": fit_classification_external,
+    }, {"demand_prediction": 1, "late_delivery_risk": 1})
+
+    # same batches as read in the workers: declared dtypes, key order
+    table = apply_schema(df[TRAINING_COLUMNS].copy(), FEATURES_ML_DTYPES)
+    local = lambda: (table.iloc[start:start + 400] for start in range(0, len(table), 400))
+    for name, fit in (("demand_prediction", fit_regression_external), ("late_delivery_risk", fit_classification_external)):
+        expected = {row["metric_name"]: row["metric_value"] for row in fit(local, 1)["metrics"]}
+        assert {row["metric_name"]: row["metric_value"] for row in results[name]["metrics"]} == expected
+    predictions = pd.concat(external_predictions(batches, results))
+    assert len(predictions) == len(df) and predictions["order_item_id"].is_monotonic_increasing
+
+
+def test_external_fits_page_to_their_own_cache_directories(tmp_path):
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("xgboost")
+    from scripts.ml_modeling import TRAINING_COLUMNS, external_fits, train_concurrently
+
+    df = _training_frame(pd, np, 3_000)[TRAINING_COLUMNS]
+    source = lambda: (df.iloc[start:start + 500] for start in range(0, len(df), 500))
+    # forked workers allocate their matrices at the same address, hence the same page file names
+    results = train_concurrently(source, external_fits(str(tmp_path)), {"demand_prediction": 1, "late_delivery_risk": 1})
+
+    metrics = {row["metric_name"]: row["metric_value"] for result in results.values() for row in result["metrics"]}
+    assert metrics["r2_score"] > 0.5 and metrics["accuracy"] > 0.7
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["demand_prediction", "late_delivery_risk"]
+
+
+def test_tuning_rows_keep_the_metrics_table_layout():
+    pytest.importorskip("pandas")
+    pytest.importorskip("xgboost")
+    from scripts.hyperparameter_search import SEARCH_SPACE
+    from scripts.ml_modeling import tuning_rows
+
+    params = {name: 1 for name in SEARCH_SPACE}
+    trial = {"trial": 4, "rung": 1, "params": params, "num_boost_round": 90, "rounds": 61, "status": "early_stopped",
+             "best_iteration": 40, "score": 0.75, "wall_seconds": 2.0, "cpu_seconds": 3.5}
+    skipped = {"trial": 5, "rung": 1, "params": params, "num_boost_round": 90, "status": "skipped"}
+    rows = tuning_rows("late_delivery_risk", [trial, skipped], trial, 13, 1000, search_seconds=9.0)
+
+    assert {tuple(sorted(row)) for row in rows} == {(
+        "metric_name", "metric_value", "model_name", "model_type", "n_features", "n_samples_train", "training_date",
+    )}
+    trial_rows = {r["metric_name"]: r["metric_value"] for r in rows if r["model_type"] == "tuning_trial"}
+    assert {r["model_name"] for r in rows if r["model_type"] == "tuning_trial"} == {"late_delivery_risk/trial_004/rung_1"}
+    assert trial_rows["valid_auc"] == 0.75 and trial_rows["stopped_by_deadline"] == 0.0
+    best = {r["metric_name"]: r["metric_value"] for r in rows if r["model_type"] == "tuning_best"}
+    assert best["n_estimators"] == 41 and best["trials"] == 1 and best["search_seconds"] == 9.0
@@ -0,0 +1,74 @@
+import pytest
+
+
+def test_get_many_returns_published_rows_and_nan_for_unknown_keys(tmp_path):
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    from scripts.online_store import OnlineFeatureStore, publish
+
+    customers = pd.DataFrame(
+        {"customer_total_orders": [3, 1, 7], "customer_total_sales": [30.0, 5.5, 80.0]},
+        index=pd.Index([42, 7, 19], name="customer_id"),
+    )
+    regions = pd.DataFrame({"region_avg_sales": [10.0, 20.0]}, index=pd.Index(["West", "East"], name="order_region"))
+    publish({"customer": customers, "region": regions}, root=str(tmp_path), version="v1", info={"mode": "pandas"})
+
+    store = OnlineFeatureStore(str(tmp_path))
+    assert store.version == "v1"
+    assert store.meta["info"] == {"mode": "pandas"}
+    assert store.features("customer") == ["customer_total_orders", "customer_total_sales"]
+
+    got = store.get_many("customer", [19, 8, 42, 100])
+    np.testing.assert_array_equal(got[0], [7.0, 80.0])
+    np.testing.assert_array_equal(got[2], [3.0, 30.0])
+    assert np.isnan(got[[1, 3]]).all()
+
+    assert store.get("region", "East") == {"region_avg_sales": 20.0}
+    assert store.get("region", "North") is None
+    assert store.get("customer", 0) is None
+
+
+def test_publish_switches_current_and_prunes_old_versions(tmp_path):
+    pd = pytest.importorskip("pandas")
+    from scripts.online_store import CURRENT, OnlineFeatureStore, list_versions, publish
+
+    frame = pd.DataFrame({"region_avg_sales": [1.0]}, index=pd.Index(["West"], name="order_region"))
+    for i in range(4):
+        publish({"region": frame * (i + 1)}, root=str(tmp_path), version=f"v{i}", keep=2)
+
+    assert (tmp_path / CURRENT).read_text() == "v3"
+    assert list_versions(str(tmp_path)) == ["v2", "v3"]
+    assert OnlineFeatureStore(str(tmp_path)).get("region", "West") == {"region_avg_sales": 4.0}
+    # a reader can still pin an older version
+    assert OnlineFeatureStore(str(tmp_path), version="v2").get("region", "West") == {"region_avg_sales": 3.0}
+
+
+def test_feature_store_entity_frames_match_kernel_aggregates():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    from scripts.feature_kernels import compute_features
+    from scripts.feature_store import FeatureStore
+    from scripts.online_store import ENTITIES
+
+    rng = np.random.default_rng(0)
+    n = 500
+    df = pd.DataFrame({
+        "order_id": np.arange(n) // 2 + 1,
+        "customer_id": rng.integers(1, 40, n),
+        "order_region": rng.choice(["West", "South", "East"], n),
+        "sales": np.round(rng.gamma(2, 100, n), 2),
+        "late_delivery_risk": rng.integers(0, 2, n),
+    })
+    store = FeatureStore()
+    store.customers.update(df)
+    store.regions.update(df)
+    frames = store.entity_frames()
+
+    names = [name for _, features in ENTITIES.values() for name in features]
+    expected = compute_features(df.copy(), names=names)
+    for entity, (key, features) in ENTITIES.items():
+        assert list(frames[entity].columns) == features
+        rows = expected.drop_duplicates(key).set_index(key)[features].sort_index()
+        np.testing.assert_allclose(
+            frames[entity].sort_index().to_numpy(dtype=float), rows.to_numpy(dtype=float), rtol=1e-6
+        )
@@ -0,0 +1,53 @@
+import pytest
+
+
+def _write_csv(tmp_path, name, rows):
+    path = tmp_path / name
+    path.write_text("order_id,market,sales\n" + "".join(f"{i},EU,{i}.5\n" for i in range(rows)))
+    return path
+
+
+def test_read_csv_cached_hit_returns_same_frame(tmp_path, caplog):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    from scripts.parse_cache import read_csv_cached
+
+    path = _write_csv(tmp_path, "orders.csv", 10)
+    cache_dir = tmp_path / "cache"
+
+    with caplog.at_level("INFO"):
+        first = read_csv_cached(str(path), cache_dir=str(cache_dir), encoding="utf-8")
+        second = read_csv_cached(str(path), cache_dir=str(cache_dir), encoding="utf-8")
+
+    pd.testing.assert_frame_equal(first, second)
+    assert "Cache d'analyse absent" in caplog.text
+    assert "Cache d'analyse trouvé" in caplog.text
+    assert len(list(cache_dir.glob("*.arrow"))) == 1
+
+
+def test_read_csv_cached_key_depends_on_content_and_options(tmp_path):
+    pytest.importorskip("pyarrow")
+    from scripts.parse_cache import cache_key
+
+    path = _write_csv(tmp_path, "orders.csv", 10)
+    key = cache_key(str(path), {"encoding": "utf-8"})
+
+    assert cache_key(str(path), {"encoding": "latin-1"}) != key
+    path.write_text(path.read_text() + "10,EU,10.5\n")
+    assert cache_key(str(path), {"encoding": "utf-8"}) != key
+
+
+def test_evict_removes_oldest_entries(tmp_path):
+    pytest.importorskip("pyarrow")
+    import os
+    from scripts.parse_cache import evict
+
+    for i, name in enumerate(["old", "mid", "new"]):
+        entry = tmp_path / f"{name}.arrow"
+        entry.write_bytes(b"x" * 100)
+        os.utime(entry, (1000 + i, 1000 + i))
+
+    removed = evict(str(tmp_path), max_bytes=150)
+
+    assert removed == ["old.arrow", "mid.arrow"]
+    assert [p.name for p in tmp_path.glob("*.arrow")] == ["new.arrow"]
@@ -0,0 +1,55 @@
+import pytest
+
+
+def test_asof_features_only_count_earlier_days():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    from scripts.point_in_time import asof_features
+
+    df = pd.DataFrame({
+        "order_id": [1, 2, 3, 4, 5, 6],
+        "order_date": pd.to_datetime(
+            ["2017-01-03", "2017-01-01", "2017-01-03", "2017-01-02", "2017-01-01", "2017-01-05"]
+        ),
+        "customer_id": [7, 7, 7, 7, 8, 8],
+        "order_region": ["West", "West", "East", "West", "East", None],
+        "sales": [10.0, 20.0, 30.0, np.nan, 50.0, 60.0],
+        "late_delivery_risk": [1, 0, 1, 1, 0, 1],
+    })
+
+    features = asof_features(df)
+
+    # customer 7: orders of 01-01 and 01-02 precede both orders of 01-03, which do not see each other
+    assert features["customer_total_orders"].tolist() == [2, 0, 2, 1, 0, 1]
+    assert features["customer_total_sales"].tolist() == [20.0, 0.0, 20.0, 20.0, 0.0, 50.0]
+    assert features["customer_avg_order_value"].iloc[[0, 2, 3, 5]].tolist() == [20.0, 20.0, 20.0, 50.0]
+    assert features["customer_late_delivery_rate"].iloc[[0, 2, 3]].tolist() == [0.5, 0.5, 0.0]
+    # no earlier order at all: no value; no earlier order of the key: global as-of value
+    assert np.isnan(features["customer_avg_order_value"].iloc[1])
+    assert features["region_avg_sales"].iloc[2] == 50.0
+    assert features["region_late_delivery_rate"].iloc[5] == pytest.approx(3 / 5)
+
+
+def test_asof_totals_match_naive_scan():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    from scripts.point_in_time import asof_totals
+
+    rng = np.random.default_rng(0)
+    n = 300
+    df = pd.DataFrame({
+        "order_id": np.arange(n),
+        "order_date": pd.Timestamp("2017-01-01") + pd.to_timedelta(rng.integers(0, 20, n), unit="D"),
+        "customer_id": rng.integers(0, 15, n),
+        "sales": rng.gamma(2, 10, n),
+        "late_delivery_risk": rng.integers(0, 2, n),
+    })
+
+    totals = asof_totals(df, "customer_id")
+
+    for i in rng.choice(n, 40, replace=False):
+        row = df.iloc[i]
+        prior = df[(df["customer_id"] == row["customer_id"]) & (df["order_date"] < row["order_date"])]
+        assert totals["orders"].iloc[i] == len(prior)
+        assert totals["sales_sum"].iloc[i] == pytest.approx(prior["sales"].sum())
+        assert totals["late_delivery_risk_sum"].iloc[i] == prior["late_delivery_risk"].sum()
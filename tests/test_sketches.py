@@ -0,0 +1,63 @@
+import pytest
+
+from scripts.sketches import BloomFilter, HyperLogLog
+
+
+def test_hyperloglog_within_error_bound_and_mergeable():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(0)
+    values = pd.Series(rng.integers(0, 300_000, 200_000))
+    exact = values.nunique()
+
+    whole = HyperLogLog.for_error(0.01)
+    whole.add(values)
+    # chunks as they would be sketched by separate workers
+    merged = HyperLogLog.for_error(0.01)
+    for part in (values.iloc[i::4] for i in range(4)):
+        sketch = HyperLogLog.for_error(0.01)
+        sketch.add(part)
+        merged.merge(sketch)
+
+    assert abs(whole.count() - exact) / exact < 3 * whole.relative_error
+    assert merged.count() == whole.count()
+
+
+def test_hyperloglog_small_cardinalities_are_near_exact():
+    pd = pytest.importorskip("pandas")
+    sketch = HyperLogLog(14)
+    sketch.add(pd.Series(["a", "b", "c", None, "a"]))
+    assert sketch.count() == 3
+
+
+def test_bloom_filter_no_false_negatives_and_bounded_false_positives():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    seen = pd.Series(np.arange(100_000))
+    unseen = pd.Series(np.arange(100_000, 300_000))
+
+    bloom = BloomFilter(capacity=100_000, error_rate=0.01)
+    for part in (seen.iloc[:50_000], seen.iloc[50_000:]):
+        half = BloomFilter(capacity=100_000, error_rate=0.01)
+        half.add(part)
+        bloom.merge(half)
+
+    assert bloom.contains(seen).all()
+    assert bloom.contains(unseen).mean() < 2 * 0.01
+
+
+def test_quantile_sketch_rank_error_and_merge():
+    np = pytest.importorskip("numpy")
+    from scripts.sketches import QuantileSketch
+
+    rng = np.random.default_rng(1)
+    values = rng.gamma(2.0, 100.0, 200_000)
+    first, second = QuantileSketch(seed=0), QuantileSketch(seed=1)
+    first.add(values[:120_000])
+    second.add(values[120_000:])
+    first.merge(second)
+
+    estimates = first.quantiles([0.1, 0.25, 0.5, 0.75, 0.9])
+    ranks = [(values < e).mean() for e in estimates]
+    assert first.n == len(values)
+    assert np.allclose(ranks, [0.1, 0.25, 0.5, 0.75, 0.9], atol=0.01)
@@ -0,0 +1,111 @@
+import pytest
+
+
+def _features(pd, np, n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=n).astype(np.float32)
+    return pd.DataFrame({
+        "order_id": np.arange(n, dtype=np.int32) // 3 + 1,
+        "order_item_id": np.arange(n, dtype=np.int32) + 1,
+        "x": x,
+        "z": np.where(rng.random(n) < 0.1, np.nan, rng.normal(size=n)).astype(np.float32),
+        "sales": (3 * x + rng.normal(scale=0.1, size=n)).astype(np.float32),
+    })
+
+
+def _source(df, batch_rows):
+    return lambda: (df.iloc[start:start + batch_rows] for start in range(0, len(df), batch_rows))
+
+
+def test_split_is_deterministic_and_independent_of_batching():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("xgboost")
+    from scripts.training_data import KEY_COLUMNS, split_batches, split_mask
+
+    df = _features(pd, np, 20_000)
+    test = split_mask(df[KEY_COLUMNS], test_size=0.2, seed=42)
+    assert abs(test.mean() - 0.2) < 0.01
+    np.testing.assert_array_equal(test, split_mask(df[KEY_COLUMNS], test_size=0.2, seed=42))
+    assert (test != split_mask(df[KEY_COLUMNS], test_size=0.2, seed=7)).any()
+
+    for batch_rows in (1_000, 7_777):
+        train_ids = pd.concat(split_batches(_source(df, batch_rows), "train"))["order_item_id"]
+        test_ids = pd.concat(split_batches(_source(df, batch_rows), "test"))["order_item_id"]
+        np.testing.assert_array_equal(test_ids, df["order_item_id"][test])
+        assert len(train_ids) + len(test_ids) == len(df)
+
+
+def test_quantile_matrix_from_batches_matches_in_memory_training():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    xgb = pytest.importorskip("xgboost")
+    from scripts.training_data import KEY_COLUMNS, predict_batches, split_mask, training_matrix
+
+    df = _features(pd, np, 6_000, seed=1)
+    dtrain = training_matrix(_source(df, 1_000), ["x", "z"], "sales", "train")
+    train = df[~split_mask(df[KEY_COLUMNS])]
+    assert dtrain.num_row() == len(train)
+    np.testing.assert_array_equal(dtrain.get_label(), train["sales"].to_numpy())
+
+    params = {"max_depth": 4, "learning_rate": 0.3, "nthread": 1}
+    booster = xgb.train(params, dtrain, num_boost_round=30)
+    reference = xgb.train(params, xgb.DMatrix(train[["x", "z"]].fillna(0), label=train["sales"]), num_boost_round=30)
+
+    pairs = list(predict_batches(booster, _source(df, 1_000), ["x", "z"], subset="test"))
+    y_test = np.concatenate([batch["sales"].to_numpy() for batch, _ in pairs])
+    y_pred = np.concatenate([predicted for _, predicted in pairs])
+    y_ref = reference.inplace_predict(df[split_mask(df[KEY_COLUMNS])][["x", "z"]].fillna(0))
+    assert len(y_test) == len(df) - len(train)
+    assert np.sqrt(np.mean((y_pred - y_test) ** 2)) < 1.2 * np.sqrt(np.mean((y_ref - y_test) ** 2))
+
+
+def test_artifact_batches_slice_record_batches(tmp_path):
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("pyarrow")
+    pytest.importorskip("xgboost")
+    from scripts.feature_artifact import begin, commit, write_part
+    from scripts.training_data import artifact_batches
+
+    df = _features(pd, np, 2_500, seed=2)
+    path = begin(str(tmp_path), version="v1")
+    write_part(df.iloc[:1_000], path, "part-0")
+    write_part(df.iloc[1_000:], path, "part-1")
+    manifest = commit(path)
+
+    batches = list(artifact_batches(manifest, ["order_item_id", "sales"], str(tmp_path), batch_rows=600)())
+    assert [len(b) for b in batches] == [600, 400, 600, 600, 300]
+    result = pd.concat(batches, ignore_index=True)
+    assert list(result.columns) == ["order_item_id", "sales"]
+    np.testing.assert_array_equal(result["sales"].to_numpy(), df["sales"].to_numpy())
+
+
+def test_spooled_source_reads_once_and_replays_the_same_batches(tmp_path):
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("pyarrow")
+    pytest.importorskip("xgboost")
+    from scripts.training_data import spool_batches
+
+    df = _features(pd, np, 2_500, seed=3)
+    # a later chunk of an integer column with NULLs comes back as float64
+    df["late_delivery_risk"] = pd.array([0, 1] * 1_250, dtype="Int8")
+    df.loc[2_000, "late_delivery_risk"] = pd.NA
+    chunks = [df.iloc[start:start + 1_000] for start in range(0, len(df), 1_000)]
+    chunks[2] = chunks[2].astype({"late_delivery_risk": "float64"})
+    passes = []
+
+    def source():
+        passes.append(1)
+        return iter(chunks)
+
+    replay = spool_batches(source, str(tmp_path / "features.arrow"))
+    for _ in range(2):
+        batches = list(replay())
+        assert [len(b) for b in batches] == [1_000, 1_000, 500]
+        result = pd.concat(batches, ignore_index=True)
+        np.testing.assert_array_equal(result["order_item_id"].to_numpy(), df["order_item_id"].to_numpy())
+        np.testing.assert_array_equal(result["z"].to_numpy(), df["z"].to_numpy())
+        assert result["late_delivery_risk"].isna().sum() == 1
+    assert len(passes) == 1
@@ -40,3 +40,36 @@ def test_validate_features_valid_passes():
     })
 
     validate_features_dataframe(df, required)
+
+
+def test_validate_features_counts_inf_as_missing():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    required = ["order_month", "profit_margin"]
+    df = pd.DataFrame({
+        "order_month": [1, 2, 3, 4],
+        "profit_margin": [np.inf, -np.inf, 30.0, np.nan],
+    })
+
+    report = validate_features_dataframe(df, required, fail_fast=False)
+
+    assert [r.name for r in report.failures] == ["profit_margin_finite"]
+    assert report.failures[0].offending == 3
+    # the frame is not modified by the check
+    assert np.isinf(df["profit_margin"]).sum() == 2
+
+
+def test_validate_features_counts_na_of_nullable_dtypes():
+    pd = pytest.importorskip("pandas")
+    required = ["order_month", "market_encoded", "profit_margin"]
+    # conform_frame turns integer columns with missing values into nullable integers
+    df = pd.DataFrame({
+        "order_month": pd.array([1, 2, 3, 4], dtype="Int8"),
+        "market_encoded": pd.array([None, None, 1, 2], dtype="Int8"),
+        "profit_margin": pd.array([10.0, None, 30.0, 40.0], dtype="Float32"),
+    })
+
+    report = validate_features_dataframe(df, required, fail_fast=False)
+
+    offending = {r.name: r.offending for r in report.failures}
+    assert offending == {"market_encoded_finite": 2, "profit_margin_finite": 1}
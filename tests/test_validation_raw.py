@@ -1,6 +1,6 @@
 import pytest
 
-from scripts.validation import validate_raw_dataframe
+from scripts.validation import RawDataValidator, validate_raw_dataframe
 
 
 def test_validate_raw_dataframe_missing_column_raises():
@@ -55,3 +55,82 @@ def test_validate_raw_dataframe_valid_passes():
 
     # Should not raise
     validate_raw_dataframe(df)
+
+
+def _raw_chunk(pd, order_ids, item_ids, order_dates=None):
+    n = len(order_ids)
+    return pd.DataFrame({
+        "order_id": order_ids,
+        "order_item_id": item_ids,
+        "order_date_dateorders": order_dates or ["2017-01-01"] * n,
+        "shipping_date_dateorders": ["2017-01-03"] * n,
+        "order_customer_id": [100] * n,
+        "order_country": ["France"] * n,
+        "sales": [10.0] * n,
+        "order_item_total": [10.0] * n,
+        "order_profit_per_order": [2.0] * n,
+    })
+
+
+def test_raw_validator_duplicate_across_chunks_raises():
+    pd = pytest.importorskip("pandas")
+    validator = RawDataValidator()
+    validator.update(_raw_chunk(pd, [1, 2], [10, 20]))
+
+    with pytest.raises(ValueError):
+        validator.update(_raw_chunk(pd, [3, 2], [30, 20]))
+
+
+def test_raw_validator_date_ratio_is_checked_over_all_chunks():
+    pd = pytest.importorskip("pandas")
+    validator = RawDataValidator()
+    # 1 bad date in the first chunk (50%), diluted below 1% by later chunks
+    validator.update(_raw_chunk(pd, [1, 2], [10, 20], ["2017-01-02", "not a date"]))
+    validator.update(_raw_chunk(pd, list(range(3, 203)), list(range(30, 230))))
+
+    assert validator.rows == 202
+    assert validator.unparseable_date_ratio("order_date_dateorders") < 0.01
+    validator.finalize()
+
+
+def test_validate_raw_dataframe_report_mode_evaluates_every_rule():
+    pd = pytest.importorskip("pandas")
+    df = _raw_chunk(pd, [1, 1], [10, 10])
+    df["sales"] = [-1.0, 10.0]
+
+    report = validate_raw_dataframe(df, fail_fast=False)
+
+    assert not report.passed
+    failed = {r.name: r.offending for r in report.failures}
+    assert failed == {"primary_key_unique": 1, "sales_non_negative": 1}
+    assert len(report.to_frame()) == len(report.results)
+    with pytest.raises(ValueError, match="duplicate"):
+        report.raise_for_failures()
+
+
+def test_raw_rules_sql_is_one_aggregate_query():
+    pytest.importorskip("pandas")
+    from scripts.validation import RAW_RULES, raw_rules_sql
+
+    types = {"order_date_dateorders": "timestamp without time zone", "shipping_date_dateorders": "text"}
+    sql = raw_rules_sql(RAW_RULES, "supply_chain_raw_staging", "raw_data", types)
+
+    assert sql.count("SELECT") == 1
+    assert "FROM raw_data.supply_chain_raw_staging" in sql
+    for rule in RAW_RULES:
+        if rule.kind != "required":
+            assert f'"{rule.name}__offending"' in sql
+    # typed dates only count NULLs, text dates are pattern-checked
+    assert '"order_date_dateorders" IS NULL)' in sql
+    assert '"shipping_date_dateorders"::text !~' in sql
+
+
+def test_raw_validator_approximate_keys_detects_duplicates():
+    pd = pytest.importorskip("pandas")
+    validator = RawDataValidator(approximate_keys=True, expected_rows=1000)
+    validator.update(_raw_chunk(pd, [1, 2], [10, 20]))
+    validator.update(_raw_chunk(pd, [3, 4], [30, 40]))
+
+    with pytest.raises(ValueError):
+        validator.update(_raw_chunk(pd, [5, 2], [50, 20]))
+    assert validator.duplicate_keys == 1